@@ -4,9 +4,10 @@
 echo "=== Configuration Dual Screen LTC Interface ==="
 echo
 
-# Détection des écrans connectés
+# Détection des écrans connectés (une seule interrogation, qui sonde les sorties)
 echo "Détection des écrans connectés..."
-xrandr --query | grep " connected"
+CONNECTED=$(xrandr --query | grep " connected")
+echo "$CONNECTED"
 
 echo
 echo "Configuration recommandée:"
@@ -15,37 +16,31 @@ echo "2. Écran HDMI : Affichage timecode grand format"
 echo
 
 # Configuration automatique si deux écrans détectés
-SCREENS=$(xrandr --query | grep " connected" | wc -l)
+SCREENS=$(echo "$CONNECTED" | grep -c " connected")
 
 if [ $SCREENS -ge 2 ]; then
     echo "Deux écrans ou plus détectés. Configuration automatique..."
     
     # Récupération des noms des écrans
-    SCREEN1=$(xrandr --query | grep " connected" | head -1 | cut -d' ' -f1)
-    SCREEN2=$(xrandr --query | grep " connected" | head -2 | tail -1 | cut -d' ' -f1)
+    SCREEN1=$(echo "$CONNECTED" | sed -n 1p | cut -d' ' -f1)
+    SCREEN2=$(echo "$CONNECTED" | sed -n 2p | cut -d' ' -f1)
     
     echo "Écran principal : $SCREEN1"
     echo "Écran secondaire : $SCREEN2"
     
-    # Configuration dual screen
+    # Configuration dual screen, les deux sorties en un seul changement de mode
     echo "Configuration en dual screen..."
-    xrandr --output $SCREEN1 --mode 800x480 --pos 0x0 --primary
-    xrandr --output $SCREEN2 --mode 1920x1080 --pos 800x0
+    xrandr --output $SCREEN1 --mode 800x480 --pos 0x0 --primary \
+           --output $SCREEN2 --mode 1920x1080 --pos 800x0
     
     echo "✓ Configuration dual screen appliquée"
     
-    # Sauvegarde de la configuration
-    cat > /home/$(whoami)/.config/autostart/dual-screen-setup.desktop << EOF
-[Desktop Entry]
-Type=Application
-Name=Dual Screen Setup
-Exec=bash -c 'sleep 5 && xrandr --output $SCREEN1 --mode 800x480 --pos 0x0 --primary && xrandr --output $SCREEN2 --mode 1920x1080 --pos 800x0'
-Hidden=false
-NoDisplay=false
-X-GNOME-Autostart-enabled=true
-EOF
+    # L'interface relira la nouvelle disposition des écrans
+    rm -f /home/$(whoami)/.config/ltc-interface/displays.json
     
-    echo "✓ Configuration sauvegardée pour le démarrage automatique"
+    # Ancienne réapplication différée au démarrage : elle déplaçait les
+    # fenêtres déjà ouvertes ; le script de démarrage s'en charge avant
+    rm -f /home/$(whoami)/.config/autostart/dual-screen-setup.desktop
     
 else
     echo "Un seul écran détecté. L'affichage HDMI fonctionnera en fenêtre."
@@ -60,23 +55,29 @@ cat > /home/$(whoami)/start_ltc_interface.sh << 'EOF'
 #!/bin/bash
 # Script de démarrage LTC Interface avec gestion dual screen
 
-# Attendre que X soit prêt
-sleep 3
+# Attendre que X soit prêt (10 s au plus)
+for i in $(seq 50); do
+    xrandr --current > /dev/null 2>&1 && break
+    sleep 0.2
+done
 
-# Vérifier les écrans
-SCREENS=$(xrandr --query | grep " connected" | wc -l)
+# Vérifier les écrans : disposition actuelle, sans sonder les sorties
+CONNECTED=$(xrandr --current | grep " connected")
+SCREENS=$(echo "$CONNECTED" | grep -c " connected")
 
 if [ $SCREENS -ge 2 ]; then
     # Configuration dual screen
-    SCREEN1=$(xrandr --query | grep " connected" | head -1 | cut -d' ' -f1)
-    SCREEN2=$(xrandr --query | grep " connected" | head -2 | tail -1 | cut -d' ' -f1)
-    
-    # Appliquer la configuration
-    xrandr --output $SCREEN1 --mode 800x480 --pos 0x0 --primary
-    xrandr --output $SCREEN2 --mode 1920x1080 --pos 800x0
+    SCREEN1=$(echo "$CONNECTED" | sed -n 1p | cut -d' ' -f1)
+    SCREEN2=$(echo "$CONNECTED" | sed -n 2p | cut -d' ' -f1)
     
-    # Attendre un peu
-    sleep 2
+    # Appliquer la configuration si elle ne l'est pas déjà (un changement de
+    # mode fait clignoter les écrans) ; l'interface relira alors les écrans
+    if ! echo "$CONNECTED" | grep -q "^$SCREEN1 connected primary 800x480+0+0" \
+       || ! echo "$CONNECTED" | grep -q "^$SCREEN2 connected 1920x1080+800+0"; then
+        xrandr --output $SCREEN1 --mode 800x480 --pos 0x0 --primary \
+               --output $SCREEN2 --mode 1920x1080 --pos 800x0
+        rm -f /home/$(whoami)/.config/ltc-interface/displays.json
+    fi
 fi
 
 # Démarrer l'interface LTC
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Boucle asyncio unique du moteur LTC et pont vers Tk
+Capture, génération, minuteries et sorties réseau tournent dans une seule
+boucle asyncio (un thread) ; Tk reste maître du thread principal. Les deux
+ne communiquent que par EngineLoop.call()/submit() (Tk → moteur) et
+TkBridge.post() (moteur → Tk).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import tkinter as tk
+
+SHUTDOWN_TIMEOUT = 3.0  # Attente maximale de l'arrêt propre des tâches (s)
+
+
+class TkBridge:
+    """Passage d'appels du moteur vers le thread Tk
+
+    Les appels sont déposés dans une boîte aux lettres ; un seul octet écrit
+    dans un tube réveille Tk (gestionnaire de fichier), qui vide la boîte en
+    une fois. Pour une même clé, seul le dernier appel déposé est exécuté :
+    un flux de trames à 25 i/s ou en shuttle ne peut pas engorger Tk.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        root.tk.createfilehandler(self._read_fd, tk.READABLE, self._drain)
+
+    def post(self, key, function, *args):
+        """Exécute function(*args) dans Tk ; remplace un appel en attente de même clé"""
+        with self._lock:
+            wake = not self._pending
+            self._pending[key] = (function, args)
+        if wake:
+            try:
+                os.write(self._write_fd, b'\0')
+            except BlockingIOError:
+                pass  # Tube plein : Tk a déjà de quoi se réveiller
+
+    def call(self, function, *args):
+        """Exécute function(*args) dans Tk, sans regroupement"""
+        self.post(object(), function, *args)
+
+    def _drain(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for function, args in pending.values():
+            function(*args)
+
+    def close(self):
+        self.root.tk.deletefilehandler(self._read_fd)
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+
+
+class EngineLoop:
+    """Boucle asyncio du moteur, dans son propre thread"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        if sys.version_info < (3, 12) and hasattr(os, 'pidfd_open'):
+            # Fin d'arecord/aplay surveillée par la boucle (pidfd) plutôt que
+            # par un thread bloqué dans waitpid() pour chaque processus
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(self.loop)
+            asyncio.set_child_watcher(watcher)
+        self.thread = threading.Thread(target=self._run, name='ltc-engine', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """Lance une coroutine dans la boucle ; retourne un Future annulable"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, function, *args):
+        """Appelle function(*args) dans la boucle"""
+        self.loop.call_soon_threadsafe(function, *args)
+
+    def stop(self):
+        """Annule toutes les tâches, attend leur nettoyage et arrête la boucle"""
+        if not self.thread.is_alive():
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks()
+                     if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.loop.shutdown_asyncgens()
+            await self.loop.shutdown_default_executor()
+
+        try:
+            self.submit(shutdown()).result(SHUTDOWN_TIMEOUT)
+        except Exception as e:
+            print(f"Arrêt incomplet du moteur: {e!r}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(SHUTDOWN_TIMEOUT)
+        if not self.thread.is_alive():
+            self.loop.close()
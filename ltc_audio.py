@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Entrées/sorties audio pour l'interface LTC
+PCM 16 bits brut échangé avec arecord/aplay par des tubes, pilotés depuis la
+boucle asyncio du moteur. Le lecteur peut aussi décoder un tube nommé,
+l'entrée standard, un fichier WAV ou brut (au rythme réel ou aussi vite que
+possible) ou un flux UDP/RTP : chaque source livre ses blocs au décodeur
+sans recopie (tampon réutilisé, projection mémoire, datagramme reçu).
+"""
+
+import asyncio
+import fcntl
+import os
+import stat
+import struct
+import subprocess
+import time
+from collections import deque
+
+import numpy as np
+
+from ltc_codec import SAMPLE_RATE
+from ltc_wav import WavLayout
+
+# Fréquences de capture d'arecord : 96 kHz double la marge du décodeur en
+# shuttle (jusqu'à 10x au lieu de 8x environ)
+CAPTURE_RATES = (SAMPLE_RATE, 96000)
+
+# Tampon ALSA demandé à aplay, en échantillons : connu, il sert à estimer
+# l'instant de sortie de chaque échantillon écrit
+ALSA_BUFFER = 4096
+ALSA_PERIOD = 1024
+
+# Flux réseau : datagrammes gardés en attente du décodeur, au-delà les plus
+# anciens sont perdus ; en-tête RTP minimal (RFC 3550)
+UDP_QUEUE = 64
+RTP_HEADER = 12
+
+# Taille minimale du tube vers aplay (une page) pour limiter la latence
+PIPE_SIZE = 4096
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
+F_GETPIPE_SZ = getattr(fcntl, 'F_GETPIPE_SZ', 1032)
+
+
+def pcm_format(sample_rate=SAMPLE_RATE, channels=1):
+    """Options arecord/aplay pour du PCM S16_LE brut"""
+    return ['-q', '-t', 'raw', '-f', 'S16_LE', '-c', str(channels),
+            '-r', str(sample_rate)]
+
+
+class PipeReader:
+    """Lecture d'un descripteur non bloquant dans un tampon réutilisé
+
+    read() rend une vue sur ce tampon, en échantillons entiers (un octet
+    isolé attend le suivant) : le décodeur lit les octets tels que le
+    noyau les a copiés, sans passer par un StreamReader. La vue n'est
+    valable que jusqu'à la lecture suivante.
+    """
+
+    sample_rate = SAMPLE_RATE
+    period = None
+    finite = False      # Fin de flux = producteur arrêté, pas fin des données
+    may_stall = True    # Le producteur peut se taire sans fermer le flux
+
+    def __init__(self):
+        self._fd = None
+        self._buffer = bytearray()
+        self._odd = None
+
+    def _attach(self, fd):
+        os.set_blocking(fd, False)
+        self._fd = fd
+
+    async def read(self, size):
+        """Jusqu'à `size` octets dès qu'ils sont disponibles ; b'' en fin de flux
+
+        OSError si la source n'est pas ouverte (ouverture ratée).
+        """
+        if self._fd is None:
+            raise OSError(f"{self} : source fermée")
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        view = memoryview(self._buffer)
+        carry = 0
+        if self._odd is not None:
+            view[0], carry, self._odd = self._odd, 1, None
+        while True:
+            try:
+                count = os.readv(self._fd, [view[carry:size]])
+            except BlockingIOError:
+                try:
+                    await self._readable()
+                except asyncio.CancelledError:
+                    # Lecture abandonnée (délai) : l'octet isolé reste dû
+                    if carry:
+                        self._odd = view[0]
+                    raise
+                continue
+            if not count:
+                return b''
+            carry += count
+            if carry > 1:
+                break
+        if carry & 1:
+            self._odd = view[carry - 1]
+        return view[:carry & ~1]
+
+    async def _readable(self):
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(self._fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(self._fd)
+
+    def _detach(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._odd = None
+
+
+class ArecordSource(PipeReader):
+    """Capture audio via arecord
+
+    `period` (échantillons) fixe la période ALSA, donc la cadence à laquelle
+    arecord écrit dans le tube ; None garde celle choisie par arecord.
+    """
+
+    may_stall = False   # La carte son livre une période à cadence fixe
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=1, device=None, period=None):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.period = period
+        self.process = None
+
+    async def open(self):
+        """Lance arecord, sa sortie dans un tube lu directement"""
+        cmd = ['arecord'] + pcm_format(self.sample_rate, self.channels)
+        if self.period:
+            cmd += [f'--buffer-size={self.period * 4}', f'--period-size={self.period}']
+        if self.device:
+            cmd += ['-D', self.device]
+        read_fd, write_fd = os.pipe()
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=write_fd,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self._attach(read_fd)
+        return self
+
+    async def close(self):
+        """Arrête arecord et attend sa fin"""
+        await _terminate(self.process)
+        self.process = None
+        self._detach()
+
+    def __str__(self):
+        return f"arecord {self.device or 'défaut'}"
+
+
+class PipeSource(PipeReader):
+    """PCM brut lu dans un tube nommé ou un périphérique caractère
+
+    Le producteur (autre programme, carte d'acquisition) cadence le flux ;
+    un fichier ordinaire est refusé, il serait lu d'un coup (FileSource).
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    async def open(self):
+        """Ouvre le tube sans bloquer la boucle"""
+        self._open_fd(os.open(self.path, os.O_RDONLY | os.O_NONBLOCK))
+        return self
+
+    def _open_fd(self, fd):
+        if stat.S_ISREG(os.fstat(fd).st_mode):
+            os.close(fd)
+            raise OSError(f"{self} : tube ou périphérique attendu")
+        self._attach(fd)
+
+    async def close(self):
+        self._detach()
+
+    def __str__(self):
+        return self.path
+
+
+class StdinSource(PipeSource):
+    """PCM brut sur l'entrée standard (… | ltc_interface.py --input -)"""
+
+    def __init__(self):
+        super().__init__('-')
+
+    async def open(self):
+        self._open_fd(os.dup(0))
+        return self
+
+    def __str__(self):
+        return "entrée standard"
+
+
+class FileSource:
+    """Fichier WAV (PCM 16/24/32 bits ou flottant, un canal choisi) ou PCM
+    S16_LE mono brut à 48 kHz, projeté en mémoire et livré par vues
+
+    Au rythme réel, chaque bloc est livré à l'instant où une carte son
+    l'aurait capturé ; sinon aussi vite que le décodeur le demande (mesures,
+    essais). Un WAV mono 16 bits est livré sans aucune copie ; les autres
+    formats passent par une conversion en 16 bits du seul canal lu.
+    """
+
+    period = None
+    finite = True
+    may_stall = False   # Données toujours prêtes, au pire attendues jusqu'à leur instant
+
+    def __init__(self, path, realtime=True, channel=0):
+        self.path = path
+        self.realtime = realtime
+        self.channel = channel
+        self.sample_rate = SAMPLE_RATE
+        self.samples = 0
+        self._audio = None
+        self._convert = None
+        self._position = 0
+        self._started = None
+
+    async def open(self):
+        try:
+            with open(self.path, 'rb') as f:
+                riff = f.read(4) == b'RIFF'
+            if riff:
+                layout = WavLayout(self.path)
+                if self.channel >= layout.channels:
+                    raise ValueError(f"{self.path} : {layout.channels} canaux, "
+                                     f"canal {self.channel + 1} absent")
+                self.sample_rate = layout.sample_rate
+                self._audio = layout.audio()
+                if layout.channels == 1 and layout.bits == 16:
+                    self._audio = self._audio.reshape(-1)
+                else:
+                    self._convert = (_float_to_pcm16 if layout.float
+                                     else _pcm_to_pcm16)
+            else:
+                self._audio = np.memmap(self.path, np.uint8, 'r')
+                self._audio = self._audio[:len(self._audio) & ~1]
+        except ValueError as e:
+            raise OSError(str(e)) from e
+        self.samples = (len(self._audio) if self._convert else len(self._audio) // 2)
+        self._position = 0
+        self._started = time.monotonic()
+        return self
+
+    async def read(self, size):
+        """Bloc suivant (`size` octets de PCM 16 bits) ; b'' en fin de fichier"""
+        if self._audio is None:
+            raise OSError(f"{self} : fichier fermé")
+        count = min(size // 2, self.samples - self._position)
+        if count <= 0:
+            return b''
+        start = self._position
+        self._position += count
+        if self.realtime:
+            await asyncio.sleep(self._started + self._position / self.sample_rate
+                                - time.monotonic())
+        else:
+            await asyncio.sleep(0)   # Laisse tourner la boucle entre deux blocs
+        if self._convert:
+            return memoryview(self._convert(self._audio[start:self._position, self.channel]))
+        return memoryview(self._audio[2 * start:2 * self._position])
+
+    @property
+    def progress(self):
+        """Fraction du fichier livrée"""
+        return self._position / self.samples if self.samples else 1.0
+
+    async def close(self):
+        self._audio = None
+
+    def __str__(self):
+        return self.path
+
+
+def _pcm_to_pcm16(block):
+    """Octets de poids fort de chaque échantillon PCM (16 à 32 bits)"""
+    return np.ascontiguousarray(block[:, -2:]).view('<i2').reshape(-1)
+
+
+def _float_to_pcm16(block):
+    samples = np.ascontiguousarray(block).view('<f4').reshape(-1)
+    return np.clip(samples * 32768, -32768, 32767).astype(np.int16)
+
+
+class UDPSource:
+    """PCM S16_LE mono à 48 kHz reçu par UDP, un bloc par datagramme
+
+    En RTP (`rtp`), l'en-tête est retiré, les échantillons L16 (gros-boutiste,
+    RFC 3551) remis dans l'ordre de la machine et les paquets manquants
+    comptés d'après le numéro de séquence. Les datagrammes PCM brut sont
+    livrés tels que reçus.
+    """
+
+    sample_rate = SAMPLE_RATE
+    period = None
+    finite = False
+    may_stall = True    # L'émetteur peut s'arrêter sans prévenir
+
+    def __init__(self, port, host='0.0.0.0', rtp=False):
+        self.port = port
+        self.host = host
+        self.rtp = rtp
+        self.lost = 0           # Paquets RTP manquants
+        self.overruns = 0       # Datagrammes jetés, décodeur trop lent
+        self._queue = deque()
+        self._ready = None
+        self._transport = None
+        self._sequence = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramQueue(self), local_addr=(self.host, self.port))
+        self.port = self._transport.get_extra_info('sockname')[1]
+        return self
+
+    def _received(self, data):
+        if self.rtp:
+            data = self._payload(data)
+            if data is None:
+                return
+        if len(self._queue) >= UDP_QUEUE:
+            self._queue.popleft()
+            self.overruns += 1
+        self._queue.append(data)
+        self._ready.set()
+
+    def _payload(self, data):
+        """Échantillons d'un paquet RTP, ou None s'il est invalide"""
+        if len(data) < RTP_HEADER or data[0] >> 6 != 2:
+            return None
+        sequence, = struct.unpack_from('!H', data, 2)
+        if self._sequence is not None:
+            self.lost += (sequence - self._sequence - 1) & 0xFFFF
+        self._sequence = sequence
+        start = RTP_HEADER + 4 * (data[0] & 0x0F)
+        if data[0] & 0x10 and len(data) >= start + 4:
+            start += 4 + 4 * struct.unpack_from('!H', data, start + 2)[0]
+        end = len(data) - (data[-1] if data[0] & 0x20 else 0)
+        payload = memoryview(data)[start:end]
+        return memoryview(np.frombuffer(payload[:len(payload) & ~1], '>i2').astype('<i2'))
+
+    async def read(self, size):
+        """Datagramme suivant, quelle que soit `size` ; jamais de fin de flux"""
+        if self._transport is None:
+            raise OSError(f"{self} : port fermé")
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+    async def close(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    def __str__(self):
+        return f"{'rtp' if self.rtp else 'udp'}:{self.host}:{self.port}"
+
+
+class _DatagramQueue(asyncio.DatagramProtocol):
+    def __init__(self, source):
+        self.source = source
+
+    def datagram_received(self, data, addr):
+        self.source._received(data)
+
+
+def make_source(spec, realtime=True, period=None, capture_rate=SAMPLE_RATE):
+    """Source du lecteur décrite par `spec` ; ValueError si elle est invalide
+
+    « alsa » ou « alsa:PÉRIPHÉRIQUE » (arecord, à `capture_rate`), « - »
+    (entrée standard), « udp:[HÔTE:]PORT » ou « rtp:[HÔTE:]PORT », sinon un
+    chemin : fichier WAV ou brut (au rythme réel si `realtime`), tube nommé
+    ou périphérique.
+    """
+    spec = spec or 'alsa'
+    kind, _, rest = spec.partition(':')
+    if kind == 'alsa':
+        return ArecordSource(capture_rate, device=rest or None, period=period)
+    if spec == '-':
+        return StdinSource()
+    if kind in ('udp', 'rtp'):
+        host, _, port = rest.rpartition(':')
+        if not port.isdigit():
+            raise ValueError(f"Source invalide : {spec} ({kind}:[HÔTE:]PORT)")
+        return UDPSource(int(port), host or '0.0.0.0', rtp=kind == 'rtp')
+    if os.path.isfile(spec):
+        return FileSource(spec, realtime)
+    if os.path.exists(spec):
+        return PipeSource(spec)
+    raise ValueError(f"Source introuvable : {spec}")
+
+
+class AplaySink:
+    """Sortie audio via aplay, cadencée par le remplissage du tube"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=1, device=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.process = None
+        self.latency = 0.0
+        self.underruns = 0
+        self._drain_at = None     # Instant (monotone) où la sortie serait vide
+
+    async def open(self):
+        """Lance aplay et estime la latence de sortie"""
+        cmd = ['aplay'] + pcm_format(self.sample_rate, self.channels) + [
+            f'--buffer-size={ALSA_BUFFER}', f'--period-size={ALSA_PERIOD}']
+        if self.device:
+            cmd += ['-D', self.device]
+        self.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        # drain() ne rend la main qu'une fois tout le bloc passé dans le tube,
+        # comme une écriture bloquante
+        transport = self.process.stdin.transport
+        transport.set_write_buffer_limits(0)
+        pipe = transport.get_extra_info('pipe')
+        try:
+            fcntl.fcntl(pipe, F_SETPIPE_SZ, PIPE_SIZE)
+            pipe_bytes = fcntl.fcntl(pipe, F_GETPIPE_SZ)
+        except OSError:
+            pipe_bytes = 65536  # Taille par défaut sous Linux
+
+        # Quand l'écriture rend la main, tube et tampon ALSA sont pleins
+        queued = pipe_bytes // (2 * self.channels) + ALSA_BUFFER + ALSA_PERIOD
+        self.latency = queued / self.sample_rate
+        return self
+
+    async def write(self, samples):
+        """Écrit un bloc ; rend la main quand la sortie l'a accepté"""
+        view = memoryview(samples).cast('B')
+        duration = len(view) / (2 * self.channels * self.sample_rate)
+        before = time.monotonic()
+        if self._drain_at is not None and before > self._drain_at:
+            self.underruns += 1  # Tout ce qui avait été écrit est déjà sorti
+        self.process.stdin.write(view)
+        await self.process.stdin.drain()
+
+        # Écriture bloquante : la sortie est pleine ; sinon elle se remplit
+        after = time.monotonic()
+        if after - before > duration / 2:
+            self._drain_at = after + self.latency
+        else:
+            self._drain_at = max(self._drain_at or after, after) + duration
+
+    def buffer_fill(self):
+        """Remplissage estimé de la sortie (tube + tampon ALSA), de 0 à 1"""
+        if self._drain_at is None or not self.latency:
+            return 0.0
+        return min(1.0, max(0.0, (self._drain_at - time.monotonic()) / self.latency))
+
+    async def close(self):
+        """Arrête aplay et attend sa fin"""
+        await _terminate(self.process)
+        self.process = None
+
+
+async def _terminate(process):
+    if process is None or process.returncode is not None:
+        return
+    try:
+        process.terminate()
+    except ProcessLookupError:
+        return
+    await process.wait()
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Codec LTC (SMPTE 12M) en Python pur
+Encode et décode le signal biphase du timecode LTC sans carte son ni ltc-tools
+"""
+
+import re
+from array import array
+from collections import deque
+from fractions import Fraction
+
+SAMPLE_RATE = 48000
+BITS_PER_FRAME = 80
+
+# Phase de l'encodeur arrondie en fin de trame (décimales d'échantillon) :
+# à vitesse nominale, elle ne dépend plus que du numéro de trame, sans
+# dérive des additions flottantes (29,97 i/s : 1601,6 échantillons par trame)
+PHASE_DIGITS = 9
+
+# Plage de vitesses suivie par le décodeur (shuttle/varispeed). La limite
+# haute dépend de la fréquence d'échantillonnage : il faut au moins deux
+# échantillons par demi-bit, soit environ 8x à 48 kHz en 25 i/s
+MIN_SPEED = 0.08
+
+# Mot de synchronisation (bits 64 à 79), vu dans le sens de lecture normal
+# puis dans le sens inverse
+SYNC_WORD = 0xBFFC
+SYNC_WORD_REVERSE = 0x3FFD
+
+# Drapeaux de groupe binaire, BGF2 BGF1 BGF0 (SMPTE 12M)
+BGF_UNSPECIFIED = 0b000  # Bits utilisateur sans format défini
+BGF_CHARSET = 0b001      # Caractères 8 bits (ISO 646)
+BGF_CLOCK = 0b010        # Timecode verrouillé sur une horloge externe
+BGF_DATE = 0b100         # Date et fuseau horaire (SMPTE 309M)
+BGF_PAGE_LINE = 0b101    # Multiplexage page/ligne
+_BGF_FORMAT = BGF_CHARSET | BGF_DATE
+
+# Tables précalculées pour les bits utilisateur : l'octet k (UB 2k+1 et
+# 2k+2) est réparti sur les quartets hauts des octets 2k et 2k+1 de la trame
+_UB_SPREAD = [[(byte & 0xF) << (16 * k + 4) | (byte >> 4) << (16 * k + 12)
+               for byte in range(256)] for k in range(4)]
+_NIBBLE_HIGH_TO_LOW = bytes(b >> 4 for b in range(256))
+_NIBBLE_HIGH = bytes(b & 0xF0 for b in range(256))
+_BCD_VALUE = [(b >> 4) * 10 + (b & 0xF) if b >> 4 < 10 and b & 0xF < 10 else None
+              for b in range(256)]
+_BCD_CODE = [(v // 10) << 4 | v % 10 for v in range(100)]
+_PRINTABLE = bytes(b if 0x20 <= b < 0x7F else 0x2E for b in range(256))
+
+# Fuseaux horaires SMPTE 309M (codes BCD) → décalage en minutes par rapport à UTC
+_TIMEZONE_OFFSETS = {0x00: 0}
+_TIMEZONE_OFFSETS.update({_BCD_CODE[h]: -h * 60 for h in range(1, 13)})
+_TIMEZONE_OFFSETS.update({_BCD_CODE[26 - h]: h * 60 for h in range(1, 14)})
+_TIMEZONE_CODES = {offset: code for code, offset in _TIMEZONE_OFFSETS.items()}
+
+USER_BITS_FORMATS = ('hex', 'date', 'chars')
+
+# Signe d'un échantillon 16 bits little-endian d'après son octet de poids fort
+_SIGN_TABLE = bytes(0x2B if b < 0x80 else 0x2D for b in range(256))
+_RUNS = re.compile(rb'\++|-+')
+
+
+class FrameRate:
+    """Cadence de timecode : base entière, débit réel et drop-frame"""
+
+    def __init__(self, name, base, rate, drop_frame=False):
+        self.name = name
+        self.base = base
+        self.rate = rate
+        self.drop_frame = drop_frame
+
+    def __repr__(self):
+        return f"FrameRate({self.name!r})"
+
+
+FRAME_RATES = {
+    '24': FrameRate('24', 24, 24.0),
+    '25': FrameRate('25', 25, 25.0),
+    '29.97': FrameRate('29.97', 30, 30000 / 1001),
+    '29.97df': FrameRate('29.97df', 30, 30000 / 1001, drop_frame=True),
+    '30': FrameRate('30', 30, 30.0),
+}
+
+
+def get_frame_rate(name):
+    """Retourne la cadence correspondant à un nom ('25', '29.97df'...)"""
+    if isinstance(name, FrameRate):
+        return name
+    key = str(name).lower()
+    if key not in FRAME_RATES:
+        raise ValueError(f"Cadence inconnue: {name}")
+    return FRAME_RATES[key]
+
+
+def frames_per_day(fps=25, drop_frame=False):
+    """Nombre de trames dans 24 heures de timecode"""
+    if drop_frame:
+        return 24 * 6 * (fps * 600 - 9 * (fps // 15))
+    return fps * 86400
+
+
+def timecode_to_frames(timecode, fps=25, drop_frame=False):
+    """Convertit un timecode HH:MM:SS:FF en nombre de trames depuis minuit
+
+    ValueError si le numéro de trame n'existe pas à `fps` ou est sauté en
+    drop-frame : il désignerait en silence une autre trame.
+    """
+    h, m, s, f = map(int, re.split(r'[:;.]', timecode))
+    if f >= fps:
+        raise ValueError(f"Timecode {timecode} : trame {f:02d} absente à {fps} i/s")
+    if drop_frame and f < fps // 15 and s == 0 and m % 10:
+        raise ValueError(f"Timecode {timecode} : numéro sauté en drop-frame")
+    total = (h * 3600 + m * 60 + s) * fps + f
+    if drop_frame:
+        # Les numéros 00 et 01 sont sautés chaque minute sauf les dizaines
+        total_minutes = h * 60 + m
+        total -= (fps // 15) * (total_minutes - total_minutes // 10)
+    return total
+
+
+def frames_to_timecode(total_frames, fps=25, drop_frame=False):
+    """Convertit un nombre de trames depuis minuit en timecode HH:MM:SS:FF"""
+    total_frames %= frames_per_day(fps, drop_frame)
+    if drop_frame:
+        drop = fps // 15
+        per_minute = fps * 60 - drop
+        per_ten_minutes = fps * 600 - 9 * drop
+        tens, rest = divmod(total_frames, per_ten_minutes)
+        total_frames += 9 * drop * tens
+        if rest > drop:
+            total_frames += drop * ((rest - drop) // per_minute)
+
+    frames = total_frames % fps
+    seconds = (total_frames // fps) % 60
+    minutes = (total_frames // (fps * 60)) % 60
+    hours = (total_frames // (fps * 3600)) % 24
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
+
+
+def _flag_bits(fps):
+    """Positions de BGF0, BGF2 et du bit de polarité (permutées en 25 i/s)"""
+    return (27, 43, 59) if fps == 25 else (43, 59, 27)
+
+
+def _format_timezone(code):
+    """Fuseau horaire SMPTE 309M lisible"""
+    offset = _TIMEZONE_OFFSETS.get(code)
+    if offset is None:
+        return f"TZ {code:02X}"
+    sign = '-' if offset < 0 else '+'
+    return f"UTC{sign}{abs(offset) // 60:02d}:{abs(offset) % 60:02d}"
+
+
+def format_user_bits(user_bits, bgf=BGF_UNSPECIFIED):
+    """Représentation lisible des bits utilisateur selon les drapeaux BGF"""
+    data = user_bits.to_bytes(4, 'little')
+    if bgf & _BGF_FORMAT == BGF_DATE:
+        day, month, year = (_BCD_VALUE[b] for b in data[:3])
+        if None not in (day, month, year):
+            return f"{day:02d}/{month:02d}/{year:02d} {_format_timezone(data[3])}"
+    elif bgf & _BGF_FORMAT == BGF_CHARSET:
+        return data.translate(_PRINTABLE).decode('ascii')
+    return data.hex(' ').upper()
+
+
+def parse_user_bits(text, mode='hex'):
+    """Convertit une saisie opérateur en (bits utilisateur, drapeaux BGF)
+
+    mode 'hex'   : 8 chiffres hexadécimaux, ex. "12 34 56 78"
+    mode 'date'  : "JJ/MM/AA" suivi éventuellement de "UTC+HH:MM"
+    mode 'chars' : jusqu'à 4 caractères ASCII
+    """
+    text = text.strip()
+    if mode == 'hex':
+        digits = re.sub(r'\s', '', text)
+        if not re.fullmatch(r'[0-9A-Fa-f]{8}', digits):
+            raise ValueError("8 chiffres hexadécimaux attendus")
+        return int.from_bytes(bytes.fromhex(digits), 'little'), BGF_UNSPECIFIED
+
+    if mode == 'date':
+        match = re.fullmatch(r'(\d{2})/(\d{2})/(\d{2})'
+                             r'(?:\s*(?:UTC)?([+-])(\d{2}):?(\d{2}))?', text)
+        if not match:
+            raise ValueError("Format de date attendu : JJ/MM/AA [UTC+HH:MM]")
+        day, month, year = (int(g) for g in match.group(1, 2, 3))
+        if not (1 <= day <= 31 and 1 <= month <= 12):
+            raise ValueError("Date invalide")
+        offset = 0
+        if match.group(4):
+            offset = int(match.group(5)) * 60 + int(match.group(6))
+            if match.group(4) == '-':
+                offset = -offset
+        if offset not in _TIMEZONE_CODES:
+            raise ValueError("Fuseau horaire non codable en SMPTE 309M")
+        data = bytes((_BCD_CODE[day], _BCD_CODE[month], _BCD_CODE[year],
+                      _TIMEZONE_CODES[offset]))
+        return int.from_bytes(data, 'little'), BGF_DATE
+
+    if mode == 'chars':
+        if len(text) > 4 or not text.isascii():
+            raise ValueError("4 caractères ASCII au maximum")
+        return int.from_bytes(text.ljust(4).encode('ascii'), 'little'), BGF_CHARSET
+
+    raise ValueError(f"Format de bits utilisateur inconnu: {mode}")
+
+
+class LTCFrame:
+    """Trame LTC : champs du timecode et informations de décodage"""
+
+    def __init__(self, hours=0, minutes=0, seconds=0, frames=0,
+                 drop_frame=False, color_frame=False,
+                 user_bits=0, bgf=BGF_UNSPECIFIED):
+        self.hours = hours
+        self.minutes = minutes
+        self.seconds = seconds
+        self.frames = frames
+        self.drop_frame = drop_frame
+        self.color_frame = color_frame
+        self.user_bits = user_bits
+        self.bgf = bgf
+
+        # Renseignés par le décodeur
+        self.start_sample = None
+        self.end_sample = None
+        self.reverse = False
+        self.speed = 1.0
+
+    @classmethod
+    def from_timecode(cls, timecode, drop_frame=False,
+                      user_bits=0, bgf=BGF_UNSPECIFIED):
+        """Crée une trame depuis un timecode HH:MM:SS:FF"""
+        h, m, s, f = map(int, re.split(r'[:;.]', timecode))
+        return cls(h, m, s, f, drop_frame=drop_frame,
+                   user_bits=user_bits, bgf=bgf)
+
+    @property
+    def timecode(self):
+        return (f"{self.hours:02d}:{self.minutes:02d}:"
+                f"{self.seconds:02d}:{self.frames:02d}")
+
+    @property
+    def user_bits_text(self):
+        return format_user_bits(self.user_bits, self.bgf)
+
+    def __repr__(self):
+        return f"LTCFrame({self.timecode!r})"
+
+    def to_bits(self, fps=25):
+        """Assemble les 80 bits de la trame (bit 0 en poids faible)"""
+        value = (
+            (self.frames % 10)
+            | (self.frames // 10) << 8
+            | int(self.drop_frame) << 10
+            | int(self.color_frame) << 11
+            | (self.seconds % 10) << 16
+            | (self.seconds // 10) << 24
+            | (self.minutes % 10) << 32
+            | (self.minutes // 10) << 40
+            | (self.hours % 10) << 48
+            | (self.hours // 10) << 56
+            | SYNC_WORD << 64
+        )
+        ub = self.user_bits
+        value |= (_UB_SPREAD[0][ub & 0xFF] | _UB_SPREAD[1][(ub >> 8) & 0xFF]
+                  | _UB_SPREAD[2][(ub >> 16) & 0xFF] | _UB_SPREAD[3][ub >> 24])
+
+        bgf0, bgf2, parity = _flag_bits(fps)
+        value |= ((self.bgf & 1) << bgf0 | ((self.bgf >> 1) & 1) << 58
+                  | ((self.bgf >> 2) & 1) << bgf2)
+
+        # Nombre pair de bits à 1 : chaque trame commence avec la même polarité
+        if bin(value).count('1') & 1:
+            value |= 1 << parity
+        return value
+
+    @classmethod
+    def from_bits(cls, value, fps=25):
+        """Reconstruit une trame depuis ses 80 bits, None si invalide
+
+        Invalide : chiffre BCD hors plage, heure au-delà de 23, numéro de
+        trame absent à `fps` (base entière) ou sauté en drop-frame, ou bit
+        de polarité faux (nombre impair de bits à 1).
+        """
+        if bin(value).count('1') & 1:
+            return None
+        frame_units = value & 0xF
+        frame_tens = (value >> 8) & 0x3
+        secs_units = (value >> 16) & 0xF
+        secs_tens = (value >> 24) & 0x7
+        mins_units = (value >> 32) & 0xF
+        mins_tens = (value >> 40) & 0x7
+        hours_units = (value >> 48) & 0xF
+        hours_tens = (value >> 56) & 0x3
+
+        if (frame_units > 9 or secs_units > 9 or mins_units > 9
+                or hours_units > 9 or secs_tens > 5 or mins_tens > 5):
+            return None
+        hours = hours_tens * 10 + hours_units
+        frames = frame_tens * 10 + frame_units
+        drop_frame = bool((value >> 10) & 1)
+        if hours > 23 or frames >= fps:
+            return None
+        if (drop_frame and frames < 2 and secs_units == 0 and secs_tens == 0
+                and mins_units != 0):
+            return None     # Numéros 00 et 01 sautés hors des dizaines de minutes
+
+        data = value.to_bytes(10, 'little')
+        user_bits = (
+            int.from_bytes(data[0:8:2].translate(_NIBBLE_HIGH_TO_LOW), 'little')
+            | int.from_bytes(data[1:8:2].translate(_NIBBLE_HIGH), 'little')
+        )
+        bgf0, bgf2, _ = _flag_bits(fps)
+        bgf = ((value >> bgf0) & 1 | ((value >> 58) & 1) << 1
+               | ((value >> bgf2) & 1) << 2)
+
+        return cls(hours, mins_tens * 10 + mins_units,
+                   secs_tens * 10 + secs_units, frames,
+                   drop_frame=drop_frame,
+                   color_frame=bool((value >> 11) & 1),
+                   user_bits=user_bits, bgf=bgf)
+
+
+class LTCEncoder:
+    """Génère le signal audio LTC (PCM 16 bits mono) trame par trame"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, fps='25', amplitude=0.5):
+        self.sample_rate = sample_rate
+        self.frame_rate = get_frame_rate(fps)
+        self.samples_per_bit = sample_rate / (self.frame_rate.rate * BITS_PER_FRAME)
+        self.level = int(32767 * amplitude)
+        # Échantillons par trame, exacts : 30000/1001 i/s retrouvé du flottant
+        self._frame_samples = (Fraction(sample_rate)
+                               / Fraction(self.frame_rate.rate).limit_denominator(1001))
+        self._phase = 0.0     # Position fractionnaire dans le flux
+        self._polarity = 1
+        self._cells = {}      # Cache des demi-cellules (niveau, longueur)
+
+    @property
+    def samples_per_frame(self):
+        return self.samples_per_bit * BITS_PER_FRAME
+
+    def set_speed(self, speed):
+        """Change la vitesse de défilement (1.0 = nominale) sans rupture de phase"""
+        self.samples_per_bit = self.sample_rate / (
+            self.frame_rate.rate * BITS_PER_FRAME * speed)
+
+    def hold(self, count):
+        """Prolonge le niveau courant de `count` échantillons (recalage)"""
+        return array('h', [self._polarity * self.level]) * count
+
+    @property
+    def state(self):
+        """(phase fractionnaire, polarité) entre deux trames
+
+        La polarité est la même au début de chaque trame : le bit de
+        correction de polarité rend pair le nombre de transitions.
+        """
+        return (self._phase, self._polarity)
+
+    def restore(self, state):
+        """Reprend après des trames rendues ailleurs (pré-rendu)"""
+        self._phase, self._polarity = state
+
+    def seek(self, number):
+        """Phase du début de la trame `number` d'un flux continu parti de la
+        trame 0 : un départ sur cette trame, à froid ou pré-rendu, produit
+        les mêmes échantillons"""
+        self._phase = round(float(number * self._frame_samples % 1), PHASE_DIGITS)
+
+    def encode_frame(self, frame):
+        """Retourne les échantillons d'une trame sous forme d'array('h')"""
+        bits = frame.to_bits(self.frame_rate.base)
+        half = self.samples_per_bit / 2
+        out = array('h')
+        for i in range(BITS_PER_FRAME):
+            # Transition en début de chaque cellule, plus une au milieu des 1
+            self._polarity = -self._polarity
+            self._emit(out, half)
+            if (bits >> i) & 1:
+                self._polarity = -self._polarity
+            self._emit(out, half)
+        # Fin arrondie : 383,9999999 devient 384, et l'échantillon manquant
+        # est émis au niveau de la dernière demi-cellule
+        end = round(self._phase, PHASE_DIGITS)
+        if int(end) > int(self._phase):
+            out.extend(self.hold(int(end) - int(self._phase)))
+        self._phase = round(end - int(end), PHASE_DIGITS)
+        return out
+
+    def _emit(self, out, duration):
+        """Ajoute une demi-cellule en conservant la phase fractionnaire"""
+        start = int(self._phase)
+        self._phase += duration
+        key = (self._polarity, int(self._phase) - start)
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = array('h', [self._polarity * self.level]) * key[1]
+            self._cells[key] = cell
+        out.extend(cell)
+
+
+class LTCDecoder:
+    """Décode un flux PCM 16 bits mono little-endian en trames LTC"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, fps='25'):
+        self.sample_rate = sample_rate
+        self.frame_rate = get_frame_rate(fps)
+        self.nominal_bit = sample_rate / (self.frame_rate.rate * BITS_PER_FRAME)
+        self.bit_period = self.nominal_bit
+        self.frames_decoded = 0
+        self.reset()
+
+    def reset(self):
+        """Oublie l'état du flux (changement de source, discontinuité)"""
+        self.bit_period = self.nominal_bit
+        self._position = 0        # Index absolu du prochain échantillon
+        self._pending = b''       # Signes de la fin du bloc précédent
+        self._polarity = None
+        self._last_edge = None
+        self._half = False
+        self._register = 0
+        self._bit_count = 0
+        self._bit_edges = deque(maxlen=BITS_PER_FRAME + 1)
+        self._resynced()
+
+    def _resynced(self):
+        """Flux repris à zéro : la prochaine trame n'a pas de précédente"""
+        self._last_number = None    # (numéro, sens) de la dernière trame rendue
+        self._candidate = None      # (numéro, sens, trame) hors séquence, en attente
+
+    @property
+    def samples_decoded(self):
+        """Nombre d'échantillons reçus depuis reset(), repère de end_sample"""
+        return self._position
+
+    def decode(self, data):
+        """Décode un bloc d'échantillons et retourne les trames complètes"""
+        samples = memoryview(data).cast('B')
+        signs = self._pending + bytes(samples[1::2]).translate(_SIGN_TABLE)
+        base = self._position - len(self._pending)
+        self._position += len(samples) // 2
+        self._pending = b''
+
+        # Les impulsions plus courtes qu'un cinquième de bit sont du bruit
+        min_run = max(1, int(self.bit_period / 5))
+        frames = []
+        accepted = rejected = rejected_length = 0
+        for run in _RUNS.finditer(signs):
+            start, end = run.span()
+            if end - start < min_run:
+                if end == len(signs):
+                    # Peut-être le début d'un palier coupé par le bloc
+                    self._pending = signs[start:]
+                else:
+                    rejected += 1
+                    rejected_length += end - start
+                continue
+            accepted += 1
+            polarity = signs[start]
+            if polarity == self._polarity:
+                continue
+            self._polarity = polarity
+            edge = base + start
+            if self._last_edge is not None:
+                self._interval(edge - self._last_edge, edge, frames)
+            self._last_edge = edge
+
+        if rejected > max(32, 2 * accepted):
+            # Accélération brutale (shuttle) : les bits sont devenus plus
+            # courts que le filtre anti-parasites, on réestime la période
+            self.bit_period = max(2.0, 1.5 * rejected_length / rejected)
+            self._half = False
+            self._bit_count = 0
+            self._resynced()
+        return frames
+
+    def _interval(self, duration, edge, frames):
+        """Classe l'intervalle entre deux transitions en demi-bit ou bit"""
+        if duration > self.bit_period * 4:
+            # Ralentissement brutal, silence ou coupure : on resynchronise
+            # en prenant l'intervalle comme un bit complet si la vitesse
+            # reste plausible (jusqu'à MIN_SPEED)
+            if duration < self.nominal_bit / MIN_SPEED:
+                self.bit_period = duration
+            self._half = False
+            self._bit_count = 0
+            self._resynced()
+            # Cette transition ouvre le prochain bit : repère du début de trame
+            self._bit_edges.clear()
+            self._bit_edges.append(edge)
+            return
+
+        if duration < self.bit_period * 0.75:
+            self.bit_period += (2 * duration - self.bit_period) / 4
+            if not self._half:
+                self._half = True
+                return
+            self._half = False
+            self._push_bit(1, edge, frames)
+        else:
+            self.bit_period += (duration - self.bit_period) / 4
+            self._half = False
+            self._push_bit(0, edge, frames)
+
+    def _push_bit(self, bit, edge, frames):
+        """Fait entrer un bit dans le registre et cherche le mot de sync"""
+        self._register = (self._register >> 1) | (bit << 79)
+        self._bit_edges.append(edge)
+        self._bit_count += 1
+        if self._bit_count < BITS_PER_FRAME:
+            return
+
+        reverse = False
+        if self._register >> 64 == SYNC_WORD:
+            value = self._register
+        elif self._register & 0xFFFF == SYNC_WORD_REVERSE:
+            value = int(format(self._register, '080b')[::-1], 2)
+            reverse = True
+        else:
+            return
+
+        frame = LTCFrame.from_bits(value, self.frame_rate.base)
+        if frame is None:
+            return
+        self._bit_count = 0
+
+        if len(self._bit_edges) > BITS_PER_FRAME:
+            start = self._bit_edges[0]
+        else:
+            start = edge - int(self.bit_period * BITS_PER_FRAME)
+        frame.start_sample = start
+        frame.end_sample = edge
+        frame.reverse = reverse
+        frame.speed = self.nominal_bit * BITS_PER_FRAME / max(1, edge - start)
+        self._accept(frame, frames)
+
+    def _accept(self, frame, frames):
+        """Rend la trame si elle prolonge la précédente
+
+        Un bloc audio perdu colle le début d'une trame à la fin d'une autre :
+        mot de sync valide, chiffres plausibles, timecode faux. Une trame qui
+        ne suit pas la précédente (une seconde d'écart au plus, même sens)
+        est donc retenue ; elle n'est rendue, avec ses positions d'origine,
+        que si la suivante la prolonge. Un vrai saut arrive une trame plus
+        tard, une trame fausse isolée n'arrive jamais.
+        """
+        rate = self.frame_rate
+        per_day = frames_per_day(rate.base, rate.drop_frame)
+        try:
+            number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+        except ValueError:
+            return      # Numéro sauté à la cadence lue (non-drop lu en drop-frame)
+        direction = -1 if frame.reverse else 1
+
+        def follows(previous):
+            if previous is None or previous[1] != direction:
+                return False
+            step = (number - previous[0]) * direction % per_day
+            return 1 <= step <= rate.base
+
+        if self._last_number is not None and not follows(self._last_number):
+            if not follows(self._candidate):
+                self._candidate = (number, direction, frame)
+                return
+            self.frames_decoded += 1
+            frames.append(self._candidate[2])
+        self._last_number = (number, direction)
+        self._candidate = None
+        self.frames_decoded += 1
+        frames.append(frame)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Conditionnement du signal lu avant décodage
+Passe-haut anti-continu, passe-bande autour du LTC, réjection du secteur et
+gain automatique suivi d'un comparateur à hystérésis : le décodeur reçoit un
+signal carré propre même d'une interface USB bon marché ou d'un long câble.
+Filtres IIR calculés par blocs NumPy avec état conservé : coût fixe et
+faible par bloc, aucune couture aux frontières de blocs.
+"""
+
+import math
+
+import numpy as np
+
+from ltc_codec import BITS_PER_FRAME, SAMPLE_RATE, get_frame_rate
+
+DC_CUTOFF = 10.0          # Passe-haut anti-continu (Hz)
+BAND_LOW = 1 / 8          # Passe-bande, en multiples du débit binaire nominal
+BAND_HIGH = 2.0           # (250 Hz - 4 kHz à 25 i/s : lecture de 0,25x à 1,5x)
+HUM_Q = 8.0               # Sélectivité des réjecteurs secteur
+HUM_HARMONICS = 3         # Fondamentale et harmoniques rejetées
+AGC_RELEASE = 0.5         # Constante de temps de retour du gain (s)
+HYSTERESIS = 0.25         # Seuils du comparateur, en fraction de l'enveloppe
+SQUELCH = 1e-4            # Enveloppe (pleine échelle) en dessous de laquelle on se tait
+OUTPUT_LEVEL = 16384      # Amplitude du signal carré transmis au décodeur
+SPAN_DIGITS = 100         # Dynamique maximale (décades) des pondérations p^-n
+MAX_SPAN = 4096           # Échantillons par tronçon de somme cumulée
+
+# Étages proposés à --input-filter ; hum50/hum60 ajoutent les réjecteurs
+STAGES = ('dc', 'band', 'agc')
+DEFAULT_STAGES = 'dc,band,agc'
+
+
+class Biquad:
+    """Cellule IIR du second ordre, filtrée par blocs sans boucle par échantillon
+
+    y = b(z)/a(z)·x : le numérateur est une convolution (deux échantillons
+    d'entrée gardés), le dénominateur se décompose en pôles du premier ordre
+    u[n] = p·u[n-1] + v[n], calculés par somme cumulée pondérée par p^-n sur
+    des tronçons assez courts pour que p^-n reste représentable. Une paire
+    de pôles conjugués ne coûte qu'une récurrence complexe.
+    """
+
+    def __init__(self, b, a):
+        self.b = np.asarray(b, dtype=np.float64) / a[0]
+        roots = np.roots([1.0, a[1] / a[0], a[2] / a[0]]).astype(complex)
+        p, q = roots if len(roots) == 2 else (roots[0], 0j)
+        if abs(p - q) < 1e-9:
+            raise ValueError("pôle double : cellule non décomposable")
+        if p.imag and abs(q - p.conjugate()) < 1e-12:
+            terms = [(p, 2 * p / (p - q))]          # y = 2·Re(A·u_p)
+        else:
+            terms = [(pole, pole / (pole - other))
+                     for pole, other in ((p, q), (q, p)) if abs(pole) > 0]
+        self._terms = []
+        for pole, weight in terms:
+            if not pole.imag:
+                # Pôle réel : calcul en réels, deux fois moins cher
+                pole, weight = pole.real, weight.real
+            radius = abs(pole)
+            span = MAX_SPAN if radius >= 1 else max(
+                1, min(MAX_SPAN, int(SPAN_DIGITS / -math.log10(radius))))
+            steps = np.arange(span)
+            self._terms.append((pole, weight, pole ** steps, pole ** -steps.astype(float)))
+        self.reset()
+
+    def reset(self):
+        self._inputs = np.zeros(2)
+        self._states = [0 * pole for pole, *arrays in self._terms]
+
+    def process(self, x):
+        """Filtre un bloc (float64), en continuité avec le précédent"""
+        b0, b1, b2 = self.b
+        padded = np.concatenate((self._inputs, x))
+        self._inputs = padded[-2:]
+        v = b0 * padded[2:] + b1 * padded[1:-1] + b2 * padded[:-2]
+        y = np.zeros(len(x))
+        for index, (pole, weight, powers, inverse) in enumerate(self._terms):
+            span = len(powers)
+            u = np.empty(len(x), dtype=powers.dtype)
+            last = self._states[index]
+            for start in range(0, len(x), span):
+                segment = v[start:start + span]
+                count = len(segment)
+                u[start:start + count] = powers[:count] * (
+                    pole * last + np.cumsum(inverse[:count] * segment))
+                last = u[start + count - 1]
+            self._states[index] = last
+            y += (weight * u).real
+        return y
+
+
+def highpass(cutoff, sample_rate):
+    """Passe-haut du premier ordre y[n] = x[n] - x[n-1] + R·y[n-1]
+
+    Pente douce : un second ordre déplace la ligne de base selon les
+    données et décale les fronts déjà arrondis par un câble.
+    """
+    pole = math.exp(-2 * math.pi * cutoff / sample_rate)
+    return Biquad((1, -1, 0), (1, -pole, 0))
+
+
+def lowpass(cutoff, sample_rate, q=math.sqrt(0.5)):
+    """Passe-bas du second ordre (Butterworth par défaut)"""
+    w = 2 * math.pi * cutoff / sample_rate
+    alpha = math.sin(w) / (2 * q)
+    cos = math.cos(w)
+    return Biquad(((1 - cos) / 2, 1 - cos, (1 - cos) / 2),
+                  (1 + alpha, -2 * cos, 1 - alpha))
+
+
+def notch(frequency, sample_rate, q=HUM_Q):
+    """Réjecteur étroit centré sur `frequency`"""
+    w = 2 * math.pi * frequency / sample_rate
+    alpha = math.sin(w) / (2 * q)
+    cos = math.cos(w)
+    return Biquad((1, -2 * cos, 1), (1 + alpha, -2 * cos, 1 - alpha))
+
+
+def parse_stages(text):
+    """'dc,band,agc,hum50' → dict d'options d'InputConditioner ; ValueError
+    si un étage est inconnu. Chaîne vide ou 'off' : aucun étage."""
+    options = dict.fromkeys(STAGES, False)
+    options['hum'] = None
+    for stage in filter(None, (part.strip().lower() for part in text.split(','))):
+        if stage == 'off':
+            continue
+        if stage in STAGES:
+            options[stage] = True
+        elif stage in ('hum50', 'hum60'):
+            options['hum'] = int(stage[3:])
+        else:
+            raise ValueError(f"étage de conditionnement inconnu : {stage}")
+    return options
+
+
+class InputConditioner:
+    """Chaîne de conditionnement du PCM 16 bits mono capturé
+
+    process() prend les octets lus (longueur quelconque) et rend un bloc
+    int16 que LTCDecoder décode tel quel : un signal carré dont les fronts
+    sont ceux du comparateur à hystérésis, ou le signal filtré sans AGC.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, fps='25', dc=True, band=True,
+                 agc=True, hum=None):
+        rate = get_frame_rate(fps)
+        bit_rate = rate.rate * BITS_PER_FRAME
+        self.sample_rate = sample_rate
+        self.agc = agc
+        self.filters = []
+        if dc:
+            self.filters.append(highpass(DC_CUTOFF, sample_rate))
+        if hum:
+            self.filters += [notch(hum * harmonic, sample_rate)
+                             for harmonic in range(1, HUM_HARMONICS + 1)]
+        if band:
+            self.filters.append(highpass(bit_rate * BAND_LOW, sample_rate))
+            self.filters.append(lowpass(min(bit_rate * BAND_HIGH, 0.45 * sample_rate),
+                                        sample_rate))
+        self.reset()
+
+    @property
+    def enabled(self):
+        return bool(self.filters) or self.agc
+
+    def reset(self):
+        """Oublie l'état du flux (changement de source, discontinuité)"""
+        for stage in self.filters:
+            stage.reset()
+        self.envelope = 0.0
+        self._state = 1
+        self._odd = b''
+
+    def process(self, data):
+        """Conditionne un bloc d'octets lus ; rend un tableau int16"""
+        data = self._odd + bytes(data)
+        usable = len(data) & ~1
+        self._odd = data[usable:]
+        x = np.frombuffer(data[:usable], dtype='<i2').astype(np.float64) / 32768
+        if not len(x):
+            return np.zeros(0, dtype=np.int16)
+        for stage in self.filters:
+            x = stage.process(x)
+        if not self.agc:
+            return np.clip(x * 32768, -32768, 32767).astype(np.int16)
+
+        # Gain automatique : enveloppe RMS du bloc, montée immédiate, retour
+        # lent ; les seuils suivent l'enveloppe en rampe sur le bloc
+        level = math.sqrt(float(np.dot(x, x)) / len(x)) * math.sqrt(2)
+        previous = self.envelope
+        release = math.exp(-len(x) / (AGC_RELEASE * self.sample_rate))
+        self.envelope = max(level, previous * release + level * (1 - release))
+        if self.envelope < SQUELCH:
+            # Trop faible : ni bruit ni fronts transmis
+            return np.full(len(x), self._state * OUTPUT_LEVEL, dtype=np.int16)
+        threshold = HYSTERESIS * np.linspace(previous or self.envelope, self.envelope,
+                                             len(x))
+
+        # Comparateur : +1 au-dessus du seuil haut, -1 sous le seuil bas,
+        # sinon l'état précédent (report vectorisé du dernier franchissement)
+        crossing = np.where(x > threshold, 1, np.where(x < -threshold, -1, 0))
+        last = np.where(crossing != 0, np.arange(len(x)), -1)
+        np.maximum.accumulate(last, out=last)
+        state = np.where(last >= 0, crossing[np.maximum(last, 0)], self._state)
+        self._state = int(state[-1])
+        return (state * OUTPUT_LEVEL).astype(np.int16)
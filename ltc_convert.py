@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Conversion de cadence et re-striping du LTC lu
+Chaque trame décodée fixe la position que doit avoir un générateur de sortie :
+décalage, changement de cadence ancré sur le temps réel (29.97df → 25),
+drop/non-drop. Le générateur suit sans rupture de phase (rattrapage progressif,
+recalage par prolongation du niveau courant) et l'écart entrée → sortie est
+mesuré en continu. En poursuite (chase), la sortie garde son propre timecode
+et ne prend de la référence (LTC lu ou train d'impulsions) que la cadence et
+la phase des trames.
+"""
+
+import re
+from collections import deque
+
+import numpy as np
+
+from ltc_codec import (SAMPLE_RATE, frames_per_day, get_frame_rate,
+                       timecode_to_frames)
+from ltc_generator import EPOCH_WINDOW
+from ltc_metrics import LatencyWindow
+
+SPEED_TOLERANCE = 0.1     # Trames lues hors de 1x ± 10 % : non suivies
+FREEWHEEL_AFTER = 0.2     # Sans trame suivie depuis (s) : roue libre
+PULSE_THRESHOLD = 0.25    # Seuil de détection des impulsions (fraction de pleine échelle)
+
+
+def parse_offset(text, fps='25'):
+    """Décalage en trames : entier signé ou timecode signé (-01:00:00:00)"""
+    text = text.strip()
+    if re.fullmatch(r'[+-]?\d+', text):
+        return int(text)
+    match = re.fullmatch(r'([+-]?)(\d{1,2}[:;.]\d{2}[:;.]\d{2}[:;.]\d{2})', text)
+    if not match:
+        raise ValueError(f"Décalage invalide: {text}")
+    rate = get_frame_rate(fps)
+    frames = timecode_to_frames(match.group(2), rate.base, rate.drop_frame)
+    return -frames if match.group(1) == '-' else frames
+
+
+class RateTransform:
+    """Position d'entrée → position de sortie, ancrées sur le temps réel
+
+    Une position est un nombre de trames depuis minuit ; divisé par la
+    cadence réelle (30000/1001 pour 29.97), il donne l'heure que le timecode
+    représente. Le décalage est en trames de sortie.
+    """
+
+    def __init__(self, input_fps='25', output_fps='25', offset=0):
+        self.input_rate = get_frame_rate(input_fps)
+        self.output_rate = get_frame_rate(output_fps)
+        self.offset = offset
+        self.ratio = self.output_rate.rate / self.input_rate.rate
+        self.output_day = frames_per_day(self.output_rate.base, self.output_rate.drop_frame)
+
+    def input_number(self, timecode):
+        rate = self.input_rate
+        return timecode_to_frames(timecode, rate.base, rate.drop_frame)
+
+    def position(self, number):
+        """Position de sortie correspondant à la position d'entrée `number`"""
+        return (number * self.ratio + self.offset) % self.output_day
+
+
+class Converter:
+    """Asservit un générateur aux trames lues, à travers une RateTransform
+
+    La boucle de lecture appelle observe() après chaque bloc capturé puis
+    feed() pour chaque trame. L'instant de passage de chaque trame sur le
+    fil est déduit de sa position dans le flux capturé et de l'instant de
+    capture de l'échantillon 0, estimé par un minimum glissant comme pour la
+    sortie. `delay` retarde volontairement la sortie : au-delà de la latence
+    de sortie, même les sauts du timecode lu sont reproduits à la trame près.
+    """
+
+    reference_label = "du LTC entrant"
+
+    def __init__(self, generator, transform, delay=0.0, sample_rate=SAMPLE_RATE,
+                 chase=None):
+        self.generator = generator
+        self.transform = transform
+        self.delay = delay
+        self.sample_rate = sample_rate
+        self.chase = chase          # Poursuite : numéro de la première trame sortie
+        self.frames_followed = 0
+        self.frames_ignored = 0
+        self.jumps = 0
+        self.reaction = LatencyWindow()    # Saut lu → saut sorti (ms)
+        self.last_followed = None          # Instant monotone de la dernière trame suivie
+        self._epochs = deque(maxlen=EPOCH_WINDOW)
+        self._expected = None
+        self._jump = None                  # (instant du saut, échantillons déjà rendus)
+        generator.start_following()
+
+    def reset_input(self, sample_rate=None):
+        """Nouvelle capture (à `sample_rate` si elle change) : les positions
+        d'échantillons repartent de zéro"""
+        if sample_rate:
+            self.sample_rate = sample_rate
+        self._epochs.clear()
+        self._expected = None
+
+    def observe(self, samples_decoded, mono):
+        """Bloc capturé : `samples_decoded` échantillons reçus à l'instant `mono`"""
+        self._epochs.append(mono - samples_decoded / self.sample_rate)
+
+    def feed(self, frame):
+        """Trame décodée : recale la position attendue de la sortie"""
+        if (frame.reverse or abs(frame.speed - 1) > SPEED_TOLERANCE
+                or not self._epochs or frame.end_sample is None):
+            self.frames_ignored += 1
+            self._expected = None
+            return
+        # La fin de la trame N est le début de la trame N + 1
+        epoch = min(self._epochs)
+        number = self.transform.input_number(frame.timecode) + 1
+        boundary = epoch + frame.end_sample / self.sample_rate
+        if self.chase is not None and number != self._expected:
+            self._rebase(number, boundary + self.delay)
+        elif self._expected is not None and number != self._expected:
+            # Le saut a eu lieu au début de cette trame, pas à sa fin
+            began = epoch + frame.start_sample / self.sample_rate
+            self.generator.follow(self.transform.position(number - 1), began + self.delay)
+            self.jumps += 1
+            self._jump = (began, self.generator.samples_rendered)
+        self._expected = number + 1
+        self.frames_followed += 1
+        self.last_followed = boundary
+        self.generator.follow(self.transform.position(number), boundary + self.delay)
+        self._measure_reaction()
+
+    def _rebase(self, number, mono):
+        """Poursuite : la position d'entrée `number` donnera la position de
+        sortie attendue à l'instant `mono`, ou la première trame au départ"""
+        transform = self.transform
+        position = self.generator.reference_position(mono)
+        if position is None:
+            position = self.chase
+        offset = position - number * transform.ratio
+        if transform.ratio == 1:
+            # Même cadence : frontières de trames confondues avec l'entrée
+            offset = round(offset)
+        transform.offset = offset % transform.output_day
+
+    def _measure_reaction(self):
+        """Délai entre un saut sur l'entrée et le recalage correspondant en sortie"""
+        if self._jump is None:
+            return
+        boundary, rendered = self._jump
+        generator = self.generator
+        if generator.sync_sample is None or generator.sync_sample < rendered:
+            return
+        output = generator.sample_output_time(generator.sync_sample)
+        if output is not None:
+            self._jump = None
+            self.reaction.add((output - boundary) * 1000)
+
+    def latency_ms(self):
+        """Retard mesuré de la sortie sur l'entrée (ms), ou None"""
+        if self.generator.offset_ms is None:
+            return None
+        return self.delay * 1000 + self.generator.offset_ms
+
+    def status(self, mono):
+        """Résumé pour l'opérateur"""
+        label = "Conversion" if self.chase is None else "Poursuite"
+        if self.last_followed is None:
+            return f"{label} : en attente {self.reference_label}"
+        latency = self.latency_ms()
+        state = "roue libre" if mono - self.last_followed > FREEWHEEL_AFTER else "verrouillée"
+        text = f"{label} {state} {self.generator.output_timecode()}"
+        if latency is not None:
+            text += (f" (latence {latency:+.1f} ms, "
+                     f"horloge {self.generator.trim * 1e6:+.1f} ppm)")
+        reaction = self.reaction.snapshot()['0.5']
+        if reaction is not None:
+            text += f", sauts suivis en {reaction:.0f} ms"
+        return text
+
+
+class PulseChaser(Converter):
+    """Poursuite d'un train d'impulsions (top image, word clock divisé...)
+
+    Chaque `pulses_per_frame` impulsions (fronts montants au-delà du seuil,
+    instant interpolé entre deux échantillons) marquent le début d'une
+    trame de sortie. La boucle de capture appelle feed_samples() pour
+    chaque bloc de PCM 16 bits mono. Une impulsion manquée est comptée
+    d'après l'intervalle nominal.
+    """
+
+    reference_label = "des impulsions"
+
+    def __init__(self, generator, start, pulses_per_frame=1, delay=0.0,
+                 sample_rate=SAMPLE_RATE, threshold=PULSE_THRESHOLD):
+        rate = generator.frame_rate
+        super().__init__(generator, RateTransform(rate, rate), delay, sample_rate, chase=start)
+        self.pulses_per_frame = pulses_per_frame
+        self.threshold = int(threshold * 32767)
+        self.interval = sample_rate / (rate.rate * pulses_per_frame)
+        self.pulses = 0
+        self.pulses_missed = 0
+        self._samples = 0           # Échantillons reçus depuis reset_input()
+        self._odd = b''
+        self._previous = 0          # Dernier échantillon du bloc précédent
+        self._last_pulse = None     # (position fractionnaire, numéro d'impulsion)
+
+    def reset_input(self):
+        super().reset_input()
+        self._samples = 0
+        self._odd = b''
+        self._previous = 0
+        self._last_pulse = None
+
+    def feed_samples(self, data, mono):
+        """Bloc capturé, reçu à l'instant `mono` : une référence par début de trame"""
+        data = self._odd + data
+        self._odd = data[len(data) & ~1:]   # Octet de poids fort encore en route
+        samples = np.frombuffer(data, np.int16, len(data) // 2).astype(np.int32)
+        base = self._samples
+        self._samples += len(samples)
+        self.observe(self._samples, mono)
+        padded = np.concatenate(([self._previous], samples))
+        self._previous = int(padded[-1])
+        above = padded >= self.threshold
+        for index in np.flatnonzero(above[1:] & ~above[:-1]):
+            # Instant du passage du seuil, par interpolation linéaire
+            low, high = padded[index], padded[index + 1]
+            position = base + index - 1 + (self.threshold - low) / (high - low)
+            self._pulse(position)
+
+    def _pulse(self, position):
+        if self._last_pulse is None:
+            count = 0
+        else:
+            last, count = self._last_pulse
+            steps = round((position - last) / self.interval)
+            if steps < 1:
+                return  # Rebond ou parasite
+            self.pulses_missed += steps - 1
+            count += steps
+        self._last_pulse = (position, count)
+        self.pulses += 1
+        if count % self.pulses_per_frame:
+            return
+        boundary = min(self._epochs) + position / self.sample_rate
+        number = count // self.pulses_per_frame
+        if self._expected is None:
+            self._rebase(number, boundary + self.delay)
+        self._expected = number + 1
+        self.frames_followed += 1
+        self.last_followed = boundary
+        self.generator.follow(self.transform.position(number), boundary + self.delay)
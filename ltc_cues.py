@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Moteur de cues déclenchés par le timecode entrant
+Liste de cues (points et plages, pré-roll optionnel) indexée par numéro de
+trame : chaque trame décodée coûte O(1) quel que soit le nombre de cues.
+Les actions (commande shell, UDP, OSC, socket local) s'exécutent dans un
+thread dédié, hors du thread de décodage.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import queue
+import random
+import socket
+import struct
+import subprocess
+import threading
+import time
+from collections import deque
+
+from ltc_codec import (LTCFrame, frames_per_day, frames_to_timecode,
+                       get_frame_rate, timecode_to_frames)
+
+CATCHUP_SECONDS = 2.0   # Trou (saut, perte de signal) dont on rattrape les cues
+LATENCY_HISTORY = 1000  # Mesures de précision gardées pour les statistiques
+
+
+def osc_message(address, args=()):
+    """Encode un message OSC 1.0 (arguments entiers, réels ou chaînes)"""
+    def pad(data):
+        return data + b'\0' * (4 - len(data) % 4)
+
+    tags = ','
+    payload = b''
+    for arg in args:
+        if isinstance(arg, bool) or isinstance(arg, int):
+            tags += 'i'
+            payload += struct.pack('>i', int(arg))
+        elif isinstance(arg, float):
+            tags += 'f'
+            payload += struct.pack('>f', arg)
+        else:
+            tags += 's'
+            payload += pad(str(arg).encode('utf-8'))
+    return pad(address.encode('utf-8')) + pad(tags.encode('ascii')) + payload
+
+
+def check_template(template):
+    """Vérifie qu'un message accepte `{name}` et `{timecode}` au chargement
+    plutôt qu'à chaque déclenchement (accolades littérales : `{{` et `}}`)"""
+    try:
+        template.format(name="Cue", timecode="00:00:00:00")
+    except (KeyError, IndexError, AttributeError, ValueError) as e:
+        raise ValueError(f"Message invalide {template!r} : {e!r}")
+    return template
+
+
+class ShellAction:
+    """Lance une commande shell sans attendre sa fin
+
+    La commande est passée telle quelle au shell (accolades et `$` compris) :
+    le cue et le timecode sont dans les variables LTC_CUE et LTC_TIMECODE.
+    """
+
+    def __init__(self, command):
+        self.command = command
+
+    def run(self, cue, timecode):
+        env = dict(os.environ, LTC_CUE=cue.name, LTC_TIMECODE=timecode)
+        subprocess.Popen(self.command, shell=True, env=env, stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class UDPAction:
+    """Envoie un datagramme texte"""
+
+    def __init__(self, host, port, message='{name} {timecode}'):
+        self.address = (host, int(port))
+        self.message = check_template(message)
+        self.sock = None
+
+    def payload(self, cue, timecode):
+        return self.message.format(name=cue.name, timecode=timecode).encode('utf-8')
+
+    def run(self, cue, timecode):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.sendto(self.payload(cue, timecode), self.address)
+
+
+class OSCAction(UDPAction):
+    """Envoie un message OSC par UDP"""
+
+    def __init__(self, host, port, address, args=()):
+        super().__init__(host, port)
+        self.osc_address = address
+        self.args = [check_template(arg) if isinstance(arg, str) else arg for arg in args]
+
+    def payload(self, cue, timecode):
+        args = [arg.format(name=cue.name, timecode=timecode)
+                if isinstance(arg, str) else arg for arg in self.args]
+        return osc_message(self.osc_address, args)
+
+
+class SocketAction(UDPAction):
+    """Notifie un processus local par un socket Unix en datagrammes"""
+
+    def __init__(self, path, message='{name} {timecode}'):
+        self.address = path
+        self.message = check_template(message)
+        self.sock = None
+
+    def run(self, cue, timecode):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.sendto(self.payload(cue, timecode), self.address)
+
+
+ACTION_TYPES = {
+    'shell': ShellAction,
+    'udp': UDPAction,
+    'osc': OSCAction,
+    'socket': SocketAction,
+}
+
+
+def make_action(spec):
+    """Construit une action depuis sa description ({"type": ..., ...})"""
+    if spec is None:
+        return None
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind not in ACTION_TYPES:
+        raise ValueError(f"Type d'action inconnu : {kind}")
+    try:
+        return ACTION_TYPES[kind](**spec)
+    except TypeError as e:
+        raise ValueError(f"Action {kind} invalide : {e}")
+
+
+class Cue:
+    """Cue ponctuel (end=None) ou plage [start, end], en numéros de trame"""
+
+    def __init__(self, name, start, end=None, preroll=0, action=None,
+                 exit_action=None):
+        if end is not None and end < start:
+            raise ValueError(f"Cue {name} : fin avant le début")
+        self.name = name
+        self.start = start
+        self.end = end
+        self.preroll = preroll
+        self.action = action
+        self.exit_action = exit_action
+
+    @property
+    def trigger(self):
+        """Trame de déclenchement, pré-roll compris"""
+        return self.start - self.preroll
+
+
+def load_cues(path, fps='25'):
+    """Lit une liste de cues JSON
+
+    {"cues": [{"name": "Lumière 1", "at": "01:00:00:00", "preroll": 0,
+               "action": {"type": "osc", "host": "...", "port": 8000,
+                          "address": "/cue/1/go"}},
+              {"name": "Vidéo", "start": "01:00:10:00", "end": "01:02:00:00",
+               "action": {...}, "exit": {...}}]}
+
+    Le pré-roll s'exprime en trames (entier) ou en timecode.
+    """
+    rate = get_frame_rate(fps)
+
+    def frame_number(value):
+        if isinstance(value, int):
+            return value
+        return timecode_to_frames(value, rate.base, rate.drop_frame)
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    cues = []
+    for index, entry in enumerate(data.get('cues', []), 1):
+        name = entry.get('name', f"Cue {index}")
+        start = entry.get('at', entry.get('start'))
+        if start is None:
+            raise ValueError(f"Cue {name} : timecode manquant")
+        end = entry.get('end')
+        cues.append(Cue(name, frame_number(start),
+                        None if end is None else frame_number(end),
+                        frame_number(entry.get('preroll', 0)),
+                        make_action(entry.get('action')),
+                        make_action(entry.get('exit'))))
+    return cues
+
+
+class CueEngine:
+    """Déclenche les cues au passage du timecode décodé
+
+    Les cues ponctuels sont rangés dans un dictionnaire trame → cues ; les
+    plages dans une liste triée de frontières, chaque segment portant
+    l'ensemble des plages actives. En lecture normale, une trame coûte une
+    recherche dans le dictionnaire et une comparaison au segment courant.
+    """
+
+    def __init__(self, cues=(), fps='25', catchup=CATCHUP_SECONDS,
+                 clock=time.monotonic):
+        self.frame_rate = get_frame_rate(fps)
+        self.day = frames_per_day(self.frame_rate.base, self.frame_rate.drop_frame)
+        self.catchup = int(catchup * self.frame_rate.rate)
+        self.clock = clock
+
+        self.fired = 0
+        self.late = 0           # Cues rattrapés après un saut ou une perte
+        self.jumps = 0
+        self.errors = 0
+        self.last_error = None
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self.load(cues)
+
+    def load(self, cues):
+        """Indexe une nouvelle liste de cues"""
+        points = {}
+        bounds = {}
+        for cue in cues:
+            if cue.end is None:
+                points.setdefault(cue.trigger % self.day, []).append(cue)
+            else:
+                bounds.setdefault(cue.trigger, ([], []))[0].append(cue)
+                bounds.setdefault(cue.end + 1, ([], []))[1].append(cue)
+        self.cues = list(cues)
+        self._points = points
+        self._triggers = sorted(points)
+
+        # Segments entre frontières consécutives et plages actives sur chacun,
+        # construits en un seul balayage
+        self._bounds = sorted(bounds)
+        self._segments = []
+        active = set()
+        for bound in self._bounds:
+            entering, leaving = bounds[bound]
+            active.difference_update(leaving)
+            active.update(entering)
+            self._segments.append(frozenset(active))
+        self.reset()
+
+    def reset(self):
+        """Oublie la position (changement de source)"""
+        self._position = None
+        self._active = frozenset()
+        self._segment = (0, 0)
+
+    def start(self):
+        """Démarre le thread d'exécution des actions"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self):
+        """Arrête le thread d'exécution après les actions en attente"""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def feed(self, frame, timestamp):
+        """Traite une trame décodée
+
+        `timestamp` est l'instant (horloge `clock`) de la fin de la trame, qui
+        est aussi le début de la suivante : c'est cette suivante qu'on
+        déclenche, pour ne pas subir la trame de retard du décodage.
+        """
+        if frame.reverse:
+            # Pas de déclenchement en marche arrière ; la reprise sera un saut
+            self._position = None
+            return
+        rate = self.frame_rate
+        number = (timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+                  + 1) % self.day
+        last = self._position
+        self._position = number
+        gap = 1 if last is None else (number - last) % self.day
+        if gap == 0:
+            return
+
+        cues = self._points.get(number)
+        if gap == 1:
+            if cues:
+                self._dispatch(cues, number, timestamp, False)
+        elif gap <= self.catchup:
+            for skipped in self._between(last, number):
+                self._dispatch(self._points[skipped], skipped, timestamp,
+                               skipped != number)
+        else:
+            self.jumps += 1
+            if cues:
+                self._dispatch(cues, number, timestamp, False)
+
+        low, high = self._segment
+        if not low <= number < high:
+            self._update_ranges(number, timestamp)
+
+    def _between(self, last, number):
+        """Trames de déclenchement dans ]last, number], passage de minuit compris"""
+        triggers = self._triggers
+        if last < number:
+            return triggers[bisect.bisect_right(triggers, last):
+                            bisect.bisect_right(triggers, number)]
+        return (triggers[bisect.bisect_right(triggers, last):]
+                + triggers[:bisect.bisect_right(triggers, number)])
+
+    def _update_ranges(self, number, timestamp):
+        """Entrées et sorties de plages au changement de segment"""
+        bounds = self._bounds
+        index = bisect.bisect_right(bounds, number) - 1
+        low = bounds[index] if index >= 0 else 0
+        high = bounds[index + 1] if index + 1 < len(bounds) else self.day
+        self._segment = (low, high)
+        active = self._segments[index] if index >= 0 else frozenset()
+        for cue in active - self._active:
+            if cue.action:
+                self._queue.put((cue.action, cue, number, timestamp, False))
+        for cue in self._active - active:
+            if cue.exit_action:
+                self._queue.put((cue.exit_action, cue, number, timestamp, False))
+        self._active = active
+
+    def _dispatch(self, cues, number, timestamp, late):
+        for cue in cues:
+            if cue.action:
+                self._queue.put((cue.action, cue, number, timestamp, late))
+
+    def _run(self):
+        rate = self.frame_rate
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            action, cue, number, timestamp, late = item
+            if late:
+                self.late += 1
+            else:
+                self.latencies.append((self.clock() - timestamp) * 1000)
+            try:
+                action.run(cue, frames_to_timecode(number, rate.base, rate.drop_frame))
+                self.fired += 1
+            except Exception as e:
+                # Une action fautive ne doit pas faire taire les suivantes
+                self.errors += 1
+                self.last_error = f"{cue.name} : {e}"
+
+    def accuracy(self):
+        """Retard de déclenchement en ms : (moyen, 95e centile, max) ou None"""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return (sum(latencies) / len(latencies),
+                latencies[int(0.95 * (len(latencies) - 1))],
+                latencies[-1])
+
+    def summary(self):
+        """Résumé pour l'interface"""
+        text = f"{len(self.cues)} cues, {self.fired} déclenchés"
+        if self.late:
+            text += f" ({self.late} rattrapés)"
+        accuracy = self.accuracy()
+        if accuracy:
+            text += f", retard moy {accuracy[0]:.2f} ms / max {accuracy[2]:.2f} ms"
+        if self.errors:
+            text += f", {self.errors} erreurs"
+        return text
+
+
+class _NullAction:
+    """Action vide pour la mesure de coût"""
+
+    def run(self, cue, timecode):
+        pass
+
+
+def benchmark(count, fps='25', duration=3600, seed=0):
+    """Coût par trame de feed() avec `count` cues aléatoires"""
+    rate = get_frame_rate(fps)
+    day = frames_per_day(rate.base, rate.drop_frame)
+    rng = random.Random(seed)
+    action = _NullAction()
+    cues = []
+    for index in range(count):
+        start = rng.randrange(day)
+        end = start + rng.randrange(1, 500) if index % 4 == 0 else None
+        cues.append(Cue(f"Cue {index}", start, end, rng.randrange(25), action))
+    build = time.perf_counter()
+    engine = CueEngine(cues, fps)
+    build = time.perf_counter() - build
+
+    total = int(duration * rate.rate)
+    origin = rng.randrange(day)
+    frames = [LTCFrame.from_timecode(
+        frames_to_timecode((origin + n) % day, rate.base, rate.drop_frame),
+        rate.drop_frame) for n in range(total)]
+    elapsed = time.perf_counter()
+    for index, frame in enumerate(frames):
+        engine.feed(frame, index)
+    elapsed = time.perf_counter() - elapsed
+    return build, elapsed / total, engine._queue.qsize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérification et mesure du moteur de cues")
+    parser.add_argument('cue_file', nargs='?', help="Liste de cues JSON à vérifier")
+    parser.add_argument('--fps', default='25', help="Cadence (24, 25, 29.97, 29.97df, 30)")
+    parser.add_argument('--bench', type=int, nargs='*', metavar='N',
+                        help="Coût par trame pour N cues aléatoires")
+    args = parser.parse_args()
+
+    rate = get_frame_rate(args.fps)
+    if args.cue_file:
+        for cue in load_cues(args.cue_file, args.fps):
+            span = frames_to_timecode(cue.start, rate.base, rate.drop_frame)
+            if cue.end is not None:
+                span += " → " + frames_to_timecode(cue.end, rate.base, rate.drop_frame)
+            print(f"{span:<28} pré-roll {cue.preroll:>3}  {cue.name}")
+    if args.bench is not None:
+        for count in args.bench or (10, 1000, 10000, 100000):
+            build, per_frame, queued = benchmark(count, args.fps)
+            print(f"{count:>7} cues : indexation {build * 1000:8.1f} ms, "
+                  f"{per_frame * 1e6:6.2f} µs/trame, {queued} actions en une heure")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Géométrie des écrans et profils de l'affichage HDMI
+La disposition des écrans est lue une fois par `xrandr --current` (sans
+sonder les sorties, contrairement à `xrandr --query`) et gardée sur disque,
+indexée par les sorties branchées : d'un démarrage à l'autre avec les mêmes
+écrans, aucun programme externe n'est lancé. La fenêtre HDMI est créée
+directement à la bonne place, avec des polices choisies selon la résolution.
+"""
+
+import glob
+import json
+import os
+import re
+import subprocess
+import threading
+import zlib
+
+from ltc_state import STATE_PATH
+
+DISPLAY_CACHE = os.path.join(os.path.dirname(STATE_PATH), 'displays.json')
+DRM_CONNECTORS = '/sys/class/drm/card*-*'
+CACHE_ENTRIES = 8          # Configurations d'écrans retenues (plateaux différents)
+XRANDR_TIMEOUT = 5.0       # (s)
+WINDOWED = (800, 600, 100, 100)   # Fenêtre sans écran secondaire : l, h, x, y
+
+# Sortie active : « HDMI-1 connected primary 1920x1080+800+0 (normal ...) »
+OUTPUT_LINE = re.compile(r'^(\S+) connected( primary)? (\d+)x(\d+)\+(\d+)\+(\d+)', re.M)
+
+
+class Monitor:
+    """Sortie vidéo active et sa place sur le bureau X"""
+
+    def __init__(self, name, width, height, x=0, y=0, primary=False):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+        self.primary = primary
+
+    @property
+    def geometry(self):
+        """Géométrie Tk « LxH+X+Y »"""
+        return f"{self.width}x{self.height}+{self.x}+{self.y}"
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def __str__(self):
+        return f"{self.name} {self.geometry}"
+
+
+class DisplayProfile:
+    """Polices et marges de l'affichage HDMI pour une résolution
+
+    Tailles en pixels (négatives pour Tk) : le rendu ne dépend pas de la
+    résolution déclarée par l'écran (DPI), souvent fantaisiste en HDMI.
+    """
+
+    def __init__(self, timecode_size, status_size, status_pady):
+        self.timecode_font = ('Courier New', -timecode_size, 'bold')
+        self.status_font = ('Arial', -status_size, 'normal')
+        self.status_pady = status_pady
+
+    def __repr__(self):
+        return f"DisplayProfile({self.timecode_font[1]}, {self.status_font[1]})"
+
+
+# Résolutions courantes ; 1920x1080 garde l'aspect d'origine (120 points)
+PROFILES = {
+    (800, 480): DisplayProfile(84, 20, 8),
+    (800, 600): DisplayProfile(96, 20, 10),
+    (1024, 600): DisplayProfile(112, 22, 10),
+    (1280, 720): DisplayProfile(136, 24, 12),
+    (1280, 1024): DisplayProfile(136, 26, 16),
+    (1920, 1080): DisplayProfile(160, 32, 20),
+    (2560, 1440): DisplayProfile(256, 44, 28),
+    (3840, 2160): DisplayProfile(384, 64, 40),
+}
+REFERENCE = (1920, 1080)
+
+
+def profile_for(width, height):
+    """Profil de la résolution, ou celui de 1920x1080 mis à l'échelle"""
+    if (width, height) in PROFILES:
+        return PROFILES[width, height]
+    scale = min(width / REFERENCE[0], height / REFERENCE[1])
+    reference = PROFILES[REFERENCE]
+    return DisplayProfile(max(24, round(-reference.timecode_font[1] * scale)),
+                          max(12, round(-reference.status_font[1] * scale)),
+                          max(4, round(reference.status_pady * scale)))
+
+
+def parse_xrandr(text):
+    """Sorties actives décrites par `xrandr --current` (les sorties
+    branchées mais éteintes, sans géométrie, sont ignorées)"""
+    return [Monitor(name, int(width), int(height), int(x), int(y), bool(primary))
+            for name, primary, width, height, x, y in OUTPUT_LINE.findall(text)]
+
+
+def secondary_monitor(monitors):
+    """Écran du grand affichage : le plus grand hors écran principal, ou
+    None si un seul écran est actif"""
+    if len(monitors) < 2:
+        return None
+    primary = next((m for m in monitors if m.primary), None)
+    if primary is None:
+        # Sans écran principal déclaré, le contrôle reste sur celui en (0, 0)
+        primary = min(monitors, key=lambda m: (m.x, m.y))
+    others = [m for m in monitors if m is not primary]
+    return max(others, key=lambda m: m.width * m.height)
+
+
+def connector_key(pattern=DRM_CONNECTORS):
+    """Sorties branchées et empreinte de leur EDID, lues dans sysfs
+    (quelques fichiers, sans sonder les écrans) ; None sans DRM"""
+    parts = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(os.path.join(path, 'status')) as f:
+                if f.read().strip() != 'connected':
+                    continue
+            with open(os.path.join(path, 'edid'), 'rb') as f:
+                edid = f.read()
+        except OSError:
+            continue
+        name = os.path.basename(path).split('-', 1)[1]
+        parts.append(f"{name}:{zlib.crc32(edid):08x}")
+    return ';'.join(parts) or None
+
+
+def query_xrandr():
+    """Disposition actuelle, sans sonder les sorties ; [] sans X ni xrandr"""
+    try:
+        result = subprocess.run(['xrandr', '--current'], capture_output=True, text=True,
+                                timeout=XRANDR_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    return parse_xrandr(result.stdout) if result.returncode == 0 else []
+
+
+class DisplayLayout:
+    """Disposition des écrans, lue une fois puis gardée en cache
+
+    monitors() relit la clé des sorties branchées (sysfs) et ne relance
+    xrandr que si elle est inconnue ; sans DRM, xrandr est interrogé une
+    seule fois par exécution. `refresh` ignore le cache disque au premier
+    appel (écrans reconfigurés à la main). Utilisable depuis n'importe
+    quel thread.
+    """
+
+    def __init__(self, path=DISPLAY_CACHE, refresh=False, query=query_xrandr,
+                 key=connector_key):
+        self.path = path
+        self.refresh = refresh
+        self.query = query
+        self.key = key
+        self.queries = 0            # Appels à xrandr
+        self.cached = False         # Dernière disposition tirée du cache
+        self._lock = threading.Lock()
+        self._current = None        # (clé, écrans)
+
+    def monitors(self):
+        """Sorties actives, du cache si les mêmes écrans sont branchés"""
+        with self._lock:
+            key = self.key()
+            if self._current and self._current[0] == key:
+                self.cached = True
+                return self._current[1]
+            entries = self._load()
+            monitors = None
+            if key is not None and key in entries and not self.refresh:
+                try:
+                    monitors = [Monitor(**entry) for entry in entries[key]]
+                    self.cached = True
+                except TypeError:
+                    pass    # Entrée d'une autre version : relue
+            if monitors is None:
+                monitors = self.query()
+                self.queries += 1
+                self.cached = False
+                if key is not None and monitors:
+                    entries.pop(key, None)
+                    entries[key] = [m.to_dict() for m in monitors]
+                    self._save(dict(list(entries.items())[-CACHE_ENTRIES:]))
+            self.refresh = False
+            self._current = (key, monitors)
+            return monitors
+
+    def secondary(self):
+        return secondary_monitor(self.monitors())
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        temporary = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, separators=(',', ':'))
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"Impossible d'enregistrer la disposition des écrans: {e}")
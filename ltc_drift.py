@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Analyse de la dérive des sources de timecode
+Chaque source (LTC lu, sorties générées, horloge système) est notée en
+couples (instant monotone d'arrivée, heure représentée en secondes) dans des
+tampons circulaires NumPy de taille fixe. Une régression linéaire sur la
+fenêtre, tenue à jour incrémentalement, donne la dérive de chaque source en
+ppm par rapport à l'horloge du Pi, le décalage en millisecondes entre deux
+sources quelconques et le temps restant avant une trame d'écart.
+"""
+
+import copy
+import csv
+import time
+
+import numpy as np
+
+DRIFT_HISTORY = 3600        # Points gardés par source (un par seconde : 1 h)
+DRIFT_PERIOD = 1.0          # Observations regroupées en un point par période (s)
+JUMP_TOLERANCE = 0.02       # Écart à la prédiction (s) qui fait repartir la source
+MIN_POINTS = 10             # Points (secondes) nécessaires à une estimation
+DAY_SECONDS = 86400
+CLOCK_SOURCE = "Horloge système"
+
+
+def system_seconds(now=None):
+    """Heure locale de CLOCK_REALTIME, en secondes depuis minuit"""
+    now = time.time() if now is None else now
+    return (now + time.localtime(now).tm_gmtoff) % DAY_SECONDS
+
+
+def wrap_seconds(seconds):
+    """Écart d'heures ramené à ±12 h"""
+    return (seconds + DAY_SECONDS / 2) % DAY_SECONDS - DAY_SECONDS / 2
+
+
+class DriftTrack:
+    """Historique d'une source et régression heure = f(instant monotone)
+
+    Les sommes de la régression sont tenues à jour à chaque point ajouté ou
+    écrasé, en coordonnées centrées sur le premier point, et recalculées
+    exactement à chaque tour du tampon pour borner l'erreur d'arrondi. Un
+    saut (recalage, changement de bande, minuit) vide l'historique.
+    """
+
+    def __init__(self, name, frame_time=1 / 25, size=DRIFT_HISTORY):
+        self.name = name
+        self.frame_time = frame_time
+        self.times = np.zeros(size)
+        self.values = np.zeros(size)
+        self.size = size
+        self.count = 0
+        self.index = 0
+        self.resets = 0
+        self._origin = None         # (instant, heure) du premier point
+        self._sums = np.zeros(5)    # n, Σx, Σy, Σx², Σxy (centrés)
+        self._bucket = None         # [début, Σinstants, Σheures, nombre]
+        self._last = None           # Dernière observation (instant, heure)
+
+    def reset(self):
+        self.count = 0
+        self.index = 0
+        self._origin = None
+        self._sums[:] = 0.0
+        self._bucket = None
+        self._last = None
+
+    def observe(self, mono, seconds):
+        """Heure `seconds` représentée par la source à l'instant `mono`"""
+        last = self._last
+        if last is not None:
+            expected = last[1] + (mono - last[0])
+            if abs(seconds - expected) > JUMP_TOLERANCE:
+                self.reset()
+                self.resets += 1
+        self._last = (mono, seconds)
+
+        # Centroïde des observations de la période : un point moins bruité
+        bucket = self._bucket
+        if bucket is None:
+            self._bucket = [mono, mono, seconds, 1]
+            return
+        if mono - bucket[0] >= DRIFT_PERIOD:
+            self._push(bucket[1] / bucket[3], bucket[2] / bucket[3])
+            self._bucket = [mono, mono, seconds, 1]
+            return
+        bucket[1] += mono
+        bucket[2] += seconds
+        bucket[3] += 1
+
+    def _push(self, mono, seconds):
+        if self._origin is None:
+            self._origin = (mono, seconds)
+        x = mono - self._origin[0]
+        y = seconds - self._origin[1]
+        index = self.index
+        sums = self._sums
+        if self.count == self.size:
+            old_x = self.times[index]
+            old_y = self.values[index]
+            sums -= (1.0, old_x, old_y, old_x * old_x, old_x * old_y)
+        else:
+            self.count += 1
+        self.times[index] = x
+        self.values[index] = y
+        sums += (1.0, x, y, x * x, x * y)
+        self.index = (index + 1) % self.size
+        if self.index == 0:
+            times, values = self.times, self.values
+            sums[:] = (self.size, times.sum(), values.sum(),
+                       np.dot(times, times), np.dot(times, values))
+
+    def fit(self):
+        """(pente, ordonnée centrée) de la régression, ou None"""
+        n, sx, sy, sxx, sxy = self._sums
+        if self.count < MIN_POINTS:
+            return None
+        denominator = n * sxx - sx * sx
+        if denominator <= 0:
+            return None
+        slope = (n * sxy - sx * sy) / denominator
+        return float(slope), float((sy - slope * sx) / n)
+
+    def drift_ppm(self):
+        """Dérive par rapport à l'horloge monotone du Pi (ppm), ou None"""
+        fit = self.fit()
+        return None if fit is None else (fit[0] - 1) * 1e6
+
+    def at(self, mono):
+        """Heure représentée à l'instant (ou au tableau d'instants) `mono`, ou None"""
+        fit = self.fit()
+        if fit is None:
+            return None
+        slope, intercept = fit
+        return self._origin[1] + intercept + slope * (mono - self._origin[0])
+
+    def history(self, since=None):
+        """(instants, heures) des points gardés, dans l'ordre, depuis `since`"""
+        if self.count < self.size:
+            times = self.times[:self.count]
+            values = self.values[:self.count]
+        else:
+            times = np.roll(self.times, -self.index)
+            values = np.roll(self.values, -self.index)
+        if self._origin is None:
+            return np.zeros(0), np.zeros(0)
+        times = times + self._origin[0]
+        values = values + self._origin[1]
+        if since is not None:
+            keep = times >= since
+            times, values = times[keep], values[keep]
+        return times, values
+
+
+class DriftAnalyzer:
+    """Dérives et décalages de toutes les sources, par rapport à une référence
+
+    Alimenté depuis la boucle du moteur seulement ; le résumé et les
+    courbes sont calculés dans cette même boucle puis transmis à Tk.
+    """
+
+    def __init__(self, reference=CLOCK_SOURCE):
+        self.tracks = {}
+        self.reference = reference
+
+    def observe(self, name, mono, seconds, frame_time=1 / 25):
+        track = self.tracks.get(name)
+        if track is None:
+            track = self.tracks[name] = DriftTrack(name, frame_time)
+        track.frame_time = frame_time
+        track.observe(mono, seconds)
+
+    def offset_ms(self, name, other, mono):
+        """Avance de la source `name` sur `other` à l'instant `mono` (ms), ou None"""
+        first = self.tracks.get(name)
+        second = self.tracks.get(other)
+        if first is None or second is None:
+            return None
+        a = first.at(mono)
+        b = second.at(mono)
+        if a is None or b is None:
+            return None
+        return wrap_seconds(a - b) * 1000
+
+    def summary(self, mono):
+        """Une ligne par source : dérive, écart à la référence, trame d'écart dans"""
+        reference = self.tracks.get(self.reference)
+        reference_ppm = reference.drift_ppm() if reference else None
+        rows = []
+        for name, track in self.tracks.items():
+            ppm = track.drift_ppm()
+            row = {'source': name, 'points': track.count, 'drift_ppm': ppm,
+                   'offset_ms': None, 'relative_ppm': None, 'frame_in': None}
+            if name != self.reference and ppm is not None and reference_ppm is not None:
+                relative = ppm - reference_ppm
+                row['offset_ms'] = self.offset_ms(name, self.reference, mono)
+                row['relative_ppm'] = relative
+                if relative:
+                    # Une trame de plus (ou de moins) par rapport à maintenant
+                    row['frame_in'] = track.frame_time / abs(relative * 1e-6)
+            rows.append(row)
+        return rows
+
+    def curves(self, mono, span, points=300):
+        """Variation de l'écart à la référence (ms) sur les `span` dernières secondes
+
+        Écart de chaque point moins l'écart actuel : seule la dérive se voit,
+        quel que soit le décalage entre les sources (affiché à part).
+        """
+        reference = self.tracks.get(self.reference)
+        if reference is None or reference.fit() is None:
+            return {}
+        curves = {}
+        for name, track in self.tracks.items():
+            current = track.at(mono)
+            if name == self.reference or current is None:
+                continue
+            times, values = track.history(mono - span)
+            step = max(1, len(times) // points)
+            times, values = times[::step], values[::step]
+            if len(times):
+                offsets = wrap_seconds(values - reference.at(times)
+                                       - (current - reference.at(mono))) * 1000
+                curves[name] = list(zip((times - mono).tolist(), offsets.tolist()))
+        return curves
+
+    def copy(self):
+        """Copie indépendante, pour un export hors de la boucle du moteur"""
+        return copy.deepcopy(self)
+
+    def export_csv(self, path):
+        """Historique de toutes les sources, avec l'écart à la référence"""
+        reference = self.tracks.get(self.reference)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['source', 'monotonic_s', 'timecode_s', 'offset_ms',
+                             'drift_ppm'])
+            for name, track in self.tracks.items():
+                times, values = track.history()
+                ppm = '' if track.drift_ppm() is None else f"{track.drift_ppm():.3f}"
+                expected = reference.at(times) if reference else None
+                offsets = ([''] * len(times) if expected is None else
+                           [f"{offset:.3f}" for offset in
+                            (wrap_seconds(values - expected) * 1000).tolist()])
+                for mono, seconds, offset in zip(times.tolist(), values.tolist(), offsets):
+                    writer.writerow([name, f"{mono:.6f}", f"{seconds:.6f}", offset, ppm])
+        return path
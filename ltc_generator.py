@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""
+Générateur LTC en processus
+Timecode libre, reprise alignée sur une position sauvegardée, asservissement à
+une référence extérieure (conversion), ou heure du jour alignée sur
+CLOCK_REALTIME avec suivi des sauts et glissements de l'horloge système
+(chrony, NTP). Plusieurs générateurs indépendants peuvent partager une
+même sortie multicanal (GeneratorBank). Les débuts de génération probables
+sont pré-rendus (PrerollCache) : un départ n'encode rien avant sa première
+trame.
+"""
+
+import math
+import time
+from array import array
+from collections import OrderedDict, deque
+
+from ltc_codec import (SAMPLE_RATE, BGF_UNSPECIFIED, LTCEncoder, LTCFrame,
+                       frames_per_day, frames_to_timecode, get_frame_rate,
+                       timecode_to_frames)
+
+# Suivi de l'heure du jour
+WARMUP_SECONDS = 0.5      # Silence initial, le temps que la sortie se stabilise
+STEP_THRESHOLD = 0.002    # Variation realtime - monotonic vue comme un saut (s)
+RESYNC_FRAMES = 0.5       # Écart (en trames) au-delà duquel on recale
+SLEW_TIME = 5.0           # Constante de temps du rattrapage progressif (s)
+TRIM_TIME = 4 * SLEW_TIME # Constante de temps de l'estimation d'écart d'horloge (s)
+MAX_SLEW = 0.001          # Correction de vitesse maximale (1000 ppm)
+EPOCH_WINDOW = 25         # Observations gardées pour le minimum glissant
+
+# Sortie multicanal
+BANK_BLOCK = 1024         # Échantillons par canal et par écriture (~21 ms)
+
+# Pré-rendu des départs
+PREROLL_SECONDS = 1.0     # Durée de chaque début pré-rendu
+PREROLL_BYTES = 4 << 20   # Mémoire maximale du cache (~40 débuts à 48 kHz)
+
+
+class SystemClock:
+    """Horloges du système, remplaçables par une horloge simulée"""
+
+    def realtime(self):
+        return time.clock_gettime(time.CLOCK_REALTIME)
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def utc_offset(self, realtime):
+        """Décalage de l'heure locale (heure d'été comprise), en secondes"""
+        return time.localtime(realtime).tm_gmtoff
+
+
+class LTCGenerator:
+    """Produit le flux PCM LTC trame par trame pour une sortie audio
+
+    La boucle d'écriture appelle render() puis, une fois le bloc accepté par
+    la sortie, written(). En mode heure du jour, l'instant de retour de
+    l'écriture (sortie pleine) sert à estimer quand chaque échantillon
+    quitte la carte son.
+    """
+
+    def __init__(self, fps='25', sample_rate=SAMPLE_RATE, clock=None,
+                 output_latency=0.0, user_bits=0, bgf=BGF_UNSPECIFIED, offset=0,
+                 preroll=None):
+        self.frame_rate = get_frame_rate(fps)
+        self.sample_rate = sample_rate
+        self.clock = clock or SystemClock()
+        self.output_latency = output_latency
+        self.user_bits = user_bits
+        self.bgf = bgf
+        self.offset = offset        # Décalage (trames) du départ ou de l'heure du jour
+        self.encoder = LTCEncoder(sample_rate, self.frame_rate)
+        self.preroll = preroll      # PrerollCache consulté au premier départ
+
+        self.time_of_day = False
+        self.following = False      # Asservi à une référence (follow())
+        self.anchor = None          # Reprise : (position, instant monotone)
+        self.frame_number = 0       # Prochaine trame à encoder
+        self.first_frame_sample = None
+        self.samples_rendered = 0   # Échantillons rendus par render()
+        self.samples_written = 0    # ... dont la sortie a accepté
+        self.offset_ms = None       # Écart mesuré à l'heure système
+        self.clock_steps = 0
+        self.resyncs = 0
+        self.sync_sample = None     # Début de la trame du dernier recalage
+        self.trim = 0.0             # Écart d'horloge référence/sortie estimé (fraction)
+        self.preroll_hit = None     # Premier départ trouvé dans le cache de pré-rendu
+
+        self._warmup = 0
+        self._needs_sync = False
+        self._epochs = deque(maxlen=EPOCH_WINDOW)
+        self._real_minus_mono = None
+        self._frame_start = None    # (échantillon, numéro) de la dernière trame
+        self._references = deque()  # Asservissement : (position, instant) à venir
+        self._last_observed = None  # Instant monotone du dernier écart mesuré
+        self._preroll = None        # [début pré-rendu, trame suivante], False si épuisé
+
+    @property
+    def current_timecode(self):
+        """Dernière trame encodée"""
+        rate = self.frame_rate
+        return frames_to_timecode(self.frame_number - 1, rate.base, rate.drop_frame)
+
+    def output_timecode(self):
+        """Trame en cours de sortie, compte tenu de la latence"""
+        rate = self.frame_rate
+        queued = int(self.output_latency * rate.rate)
+        return frames_to_timecode(self.frame_number - 1 - queued,
+                                  rate.base, rate.drop_frame)
+
+    @property
+    def aligned(self):
+        """Sortie asservie à l'horloge (heure du jour ou reprise)"""
+        return self.time_of_day or self.anchor is not None
+
+    def start(self, timecode):
+        """Timecode libre à partir de `timecode` (plus le décalage)"""
+        rate = self.frame_rate
+        self.time_of_day = False
+        self.following = False
+        self.anchor = None
+        self.frame_number = (timecode_to_frames(timecode, rate.base, rate.drop_frame)
+                             + self.offset) % frames_per_day(rate.base, rate.drop_frame)
+        self._preroll = None
+        self.encoder.set_speed(1.0)
+        self.encoder.seek(self.frame_number)
+
+    def start_time_of_day(self):
+        """Heure du jour : trames alignées sur les secondes de CLOCK_REALTIME"""
+        self.time_of_day = True
+        self.following = False
+        self.anchor = None
+        self._start_aligned()
+
+    def resume(self, position, realtime):
+        """Reprise d'un timecode libre : la trame `position` (fractionnaire)
+        sortait à l'instant `realtime` ; la sortie reprend là où elle en
+        serait, puis suit l'horloge monotone"""
+        self.time_of_day = False
+        self.following = False
+        mono_minus_real = self.clock.monotonic() - self.clock.realtime()
+        self.anchor = (position, realtime + mono_minus_real)
+        self._start_aligned()
+
+    def start_following(self):
+        """Asservissement : silence jusqu'au premier appel de follow()"""
+        self.time_of_day = False
+        self.following = True
+        self.anchor = None
+        self._references.clear()
+        self._start_aligned()
+
+    def follow(self, position, mono):
+        """La trame `position` (fractionnaire) de la référence commence à
+        l'instant monotone `mono` ; la sortie s'y recale ou la rattrape
+
+        Un instant futur (sortie retardée) ne prend effet qu'à son heure :
+        un saut de la référence est reproduit au même moment en sortie.
+        """
+        self._references.append((position, mono))
+        if self.anchor is None:
+            self.anchor = (position, mono)
+
+    def _start_aligned(self):
+        self.offset_ms = None
+        self._warmup = int(WARMUP_SECONDS * self.sample_rate)
+        self._needs_sync = True
+        self._epochs.clear()
+        self._real_minus_mono = None
+        self._last_observed = None
+        self._preroll = None
+        self.trim = 0.0
+        self.encoder.set_speed(1.0)
+
+    def join(self, epoch):
+        """Rejoint une sortie déjà établie : l'échantillon 0 de ce générateur
+        sortira à l'instant monotone `epoch`, le silence de mise en route est
+        inutile"""
+        self._warmup = 0
+        self._epochs.append(epoch)
+
+    def sample_output_time(self, index):
+        """Instant (monotone) de sortie de l'échantillon `index`, ou None"""
+        if not self._epochs:
+            return None
+        return min(self._epochs) + index / self.sample_rate
+
+    def reference_position(self, mono):
+        """Position (en trames) que la sortie doit avoir à l'instant `mono`,
+        ou None tant qu'elle n'a pas de référence"""
+        if not self.aligned or (self.following and self.anchor is None):
+            return None
+        rate = self.frame_rate
+        if self.time_of_day and self._real_minus_mono is None:
+            return None
+        return self._target(mono) % frames_per_day(rate.base, rate.drop_frame)
+
+    def output_position(self):
+        """(position fractionnaire, instant CLOCK_REALTIME) de la sortie
+
+        Position de la trame qui quitte la carte son en ce moment, pour la
+        sauvegarde de l'état ; None tant que la sortie n'est pas établie.
+        """
+        if not self._epochs or self._frame_start is None:
+            return None
+        mono = self.clock.monotonic()
+        playing = (mono - min(self._epochs)) * self.sample_rate
+        start, number = self._frame_start
+        rate = self.frame_rate
+        position = number + (playing - start) / self.encoder.samples_per_frame
+        return (position % frames_per_day(rate.base, rate.drop_frame),
+                self.clock.realtime())
+
+    def render(self):
+        """Prochain bloc à écrire : une trame, précédée au besoin d'un recalage"""
+        if self._warmup > 0:
+            count = min(self._warmup, int(self.encoder.samples_per_frame))
+            self._warmup -= count
+            if self._warmup < WARMUP_SECONDS * self.sample_rate / 2:
+                # Oublie les mesures faites pendant le remplissage des tampons
+                self._epochs.clear()
+            self.samples_rendered += count
+            return array('h', bytes(2 * count))
+        if self.following and self.anchor is None:
+            # Pas encore de référence : silence, une trame à la fois
+            count = int(self.encoder.samples_per_frame)
+            self.samples_rendered += count
+            return array('h', bytes(2 * count))
+
+        chunk = array('h')
+        if self.following and not self._needs_sync and self._epochs:
+            # Saut de la référence : recalage dès la trame concernée, sans
+            # attendre qu'elle soit écrite
+            rate = self.frame_rate
+            day = frames_per_day(rate.base, rate.drop_frame)
+            late = (self._target(self._output_monotonic()) - self.frame_number
+                    + day / 2) % day - day / 2
+            if abs(late) > RESYNC_FRAMES:
+                self.resyncs += 1
+                self._needs_sync = True
+        if self._needs_sync:
+            self._needs_sync = False
+            chunk.extend(self._align())
+            self.sync_sample = self.samples_rendered + len(chunk)
+
+        rate = self.frame_rate
+        start = self.samples_rendered + len(chunk)
+        self._frame_start = (start, self.frame_number)
+        if self.first_frame_sample is None:
+            self.first_frame_sample = start
+        pcm = self._preroll_frame()
+        if pcm is None:
+            tc = frames_to_timecode(self.frame_number, rate.base, rate.drop_frame)
+            pcm = self.encoder.encode_frame(LTCFrame.from_timecode(
+                tc, rate.drop_frame, self.user_bits, self.bgf))
+        chunk.extend(pcm)
+        self.frame_number += 1
+        self.samples_rendered += len(chunk)
+        return chunk
+
+    def _preroll_frame(self):
+        """Trame suivante prise dans le cache de pré-rendu, ou None
+
+        Seulement à vitesse nominale et tant que les trames se suivent : dès
+        qu'un glissement ou un recalage intervient, on encode trame par trame.
+        """
+        if self.preroll is None or self._preroll is False:
+            return None
+        if self._preroll is None:
+            found = self.preroll.lookup(self.frame_rate, self.frame_number,
+                                        self.user_bits, self.bgf)
+            self.preroll_hit = found is not None
+            if found is None:
+                self._preroll = False
+                return None
+            self._preroll = list(found)
+        entry, index = self._preroll
+        if (index >= entry.count or entry.number(index) != self.frame_number
+                or self.encoder.samples_per_bit != entry.samples_per_bit
+                or self.encoder.state != (entry.phases[index], entry.polarity)):
+            self._preroll = False
+            return None
+        self._preroll[1] += 1
+        self.encoder.restore((entry.phases[index + 1], entry.polarity))
+        return entry.frame(index)
+
+    def written(self, count):
+        """Signale que `count` échantillons ont été acceptés par la sortie"""
+        self.samples_written += count
+        self._observe()
+
+    def _target(self, mono):
+        """Position (en trames) que la sortie devrait avoir à l'instant `mono`"""
+        rate = self.frame_rate
+        if self.time_of_day:
+            realtime = mono + self._real_minus_mono
+            return ((realtime + self.clock.utc_offset(realtime)) % 86400 * rate.rate
+                    + self.offset)
+        if self.following:
+            # Dernière référence déjà en vigueur à l'instant `mono`
+            references = self._references
+            while len(references) > 1 and references[1][1] <= mono:
+                references.popleft()
+            self.anchor = references[0]
+        position, anchor = self.anchor
+        return position + (mono - anchor) * rate.rate
+
+    def _output_monotonic(self):
+        """Instant (monotone) où sortira le prochain échantillon rendu"""
+        if self._epochs:
+            epoch = min(self._epochs)
+        else:
+            epoch = (self.clock.monotonic() + self.output_latency
+                     - self.samples_written / self.sample_rate)
+        return epoch + self.samples_rendered / self.sample_rate
+
+    def _align(self):
+        """Choisit la trame dont le début coïncide avec la prochaine frontière"""
+        rate = self.frame_rate
+        self._real_minus_mono = self.clock.realtime() - self.clock.monotonic()
+        target = self._target(self._output_monotonic())
+        number = math.ceil(target)
+        pad = round((number - target) / rate.rate * self.sample_rate)
+        self.frame_number = number % frames_per_day(rate.base, rate.drop_frame)
+        self.encoder.set_speed(1.0)
+        self.encoder.seek(self.frame_number)
+        return self.encoder.hold(pad)
+
+    def _observe(self):
+        """Mesure l'écart à l'heure système et corrige sauts et glissements"""
+        mono = self.clock.monotonic()
+        real_minus_mono = self.clock.realtime() - mono
+        if (self.time_of_day and self._real_minus_mono is not None
+                and abs(real_minus_mono - self._real_minus_mono) > STEP_THRESHOLD):
+            # Saut de CLOCK_REALTIME : on recale à la prochaine trame
+            self.clock_steps += 1
+            self._needs_sync = True
+        self._real_minus_mono = real_minus_mono
+
+        # Instant de sortie de l'échantillon 0 en temps monotone ; un retard
+        # du thread d'écriture ne peut que l'augmenter, d'où le minimum
+        self._epochs.append(mono + self.output_latency
+                            - self.samples_written / self.sample_rate)
+        if not self.aligned or self._warmup > 0 or self._needs_sync:
+            return
+
+        rate = self.frame_rate
+        day = frames_per_day(rate.base, rate.drop_frame)
+        late = (self._target(self._output_monotonic()) - self.frame_number
+                + day / 2) % day - day / 2
+        offset = late / rate.rate
+        self.offset_ms = offset * 1000
+        if abs(offset) * rate.rate > RESYNC_FRAMES:
+            self.resyncs += 1
+            self._needs_sync = True
+            return
+
+        # Glissement (slew) : on accélère si la sortie est en retard. Le
+        # terme intégral apprend l'écart entre l'horloge de la référence et
+        # celle de la carte son : sans lui, cet écart laisserait un retard
+        # permanent (écart × SLEW_TIME, ~1 ms à 200 ppm)
+        if self._last_observed is not None:
+            elapsed = min(mono - self._last_observed, 1.0)
+            self.trim = max(-MAX_SLEW, min(MAX_SLEW, self.trim + offset * elapsed
+                                           / (SLEW_TIME * TRIM_TIME)))
+        self._last_observed = mono
+        correction = max(-MAX_SLEW, min(MAX_SLEW, self.trim + offset / SLEW_TIME))
+        self.encoder.set_speed(1.0 + correction)
+
+
+class Preroll:
+    """Début de génération pré-rendu : `count` trames à partir de `start`"""
+
+    def __init__(self, rate, start, user_bits, bgf, sample_rate, count):
+        self.day = frames_per_day(rate.base, rate.drop_frame)
+        self.start = start % self.day
+        self.count = count
+        encoder = LTCEncoder(sample_rate, rate)
+        encoder.seek(self.start)
+        self.samples_per_bit = encoder.samples_per_bit
+        self.polarity = encoder.state[1]
+        self.pcm = array('h')
+        self.offsets = [0]          # Début de chaque trame dans pcm
+        self.phases = [encoder.state[0]]    # Phase de l'encodeur au début de chaque trame
+        for index in range(count):
+            tc = frames_to_timecode(self.number(index), rate.base, rate.drop_frame)
+            self.pcm.extend(encoder.encode_frame(LTCFrame.from_timecode(
+                tc, rate.drop_frame, user_bits, bgf)))
+            self.offsets.append(len(self.pcm))
+            self.phases.append(encoder.state[0])
+
+    @property
+    def size(self):
+        """Mémoire occupée (octets)"""
+        return self.pcm.itemsize * len(self.pcm)
+
+    def number(self, index):
+        return (self.start + index) % self.day
+
+    def frame(self, index):
+        return self.pcm[self.offsets[index]:self.offsets[index + 1]]
+
+
+class PrerollCache:
+    """Débuts de génération pré-rendus, en LRU bornée en mémoire
+
+    Rempli à l'avance (timecode saisi, zéro, heure du jour des prochaines
+    secondes) et consulté par LTCGenerator à son premier départ. Une seule
+    boucle y accède : celle du moteur.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, max_bytes=PREROLL_BYTES,
+                 seconds=PREROLL_SECONDS):
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.seconds = seconds
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def prepare(self, fps, number, user_bits=0, bgf=BGF_UNSPECIFIED):
+        """Pré-rend `seconds` de LTC à partir de la trame `number`"""
+        rate = get_frame_rate(fps)
+        key = (rate.name, number % frames_per_day(rate.base, rate.drop_frame),
+               user_bits, bgf)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        entry = Preroll(rate, number, user_bits, bgf, self.sample_rate,
+                        max(1, round(self.seconds * rate.rate)))
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            self.size -= self._entries.popitem(last=False)[1].size
+
+    def prepare_time_of_day(self, fps, clock, ahead, offset=0, user_bits=0,
+                            bgf=BGF_UNSPECIFIED):
+        """Pré-rend l'heure du jour de maintenant à `ahead` secondes
+
+        Les débuts sont pris sur une grille fixe de `seconds` : d'un appel à
+        l'autre, seul le dernier est nouveau.
+        """
+        rate = get_frame_rate(fps)
+        realtime = clock.realtime()
+        position = ((realtime + clock.utc_offset(realtime)) % 86400 * rate.rate
+                    + offset)
+        count = max(1, round(self.seconds * rate.rate))
+        first = int(position // count) * count
+        for start in range(first, math.ceil(position + ahead * rate.rate), count):
+            self.prepare(rate, start, user_bits, bgf)
+
+    def lookup(self, rate, number, user_bits, bgf):
+        """(début pré-rendu, rang de la trame `number`) ou None"""
+        for key, entry in reversed(self._entries.items()):
+            index = (number - entry.start) % entry.day
+            if key[0] == rate.name and key[2:] == (user_bits, bgf) and index < entry.count:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry, index
+        self.misses += 1
+        return None
+
+
+class GeneratorBank:
+    """Générateurs indépendants sur les canaux d'une même sortie audio
+
+    Chaque générateur remplit sa propre file à sa cadence (trames de
+    longueurs différentes en 25 et 29,97 i/s) ; render() prélève le même
+    nombre d'échantillons dans chaque file et les entrelace d'une seule
+    affectation par canal. Un canal sans générateur reste silencieux.
+
+    La banque estime elle-même quand ses échantillons quittent la carte son :
+    un générateur branché sur une sortie déjà établie part sans silence de
+    mise en route.
+    """
+
+    def __init__(self, channels, block=BANK_BLOCK, sample_rate=SAMPLE_RATE, clock=None):
+        self.channels = channels
+        self.block = block
+        self.sample_rate = sample_rate
+        self.clock = clock or SystemClock()
+        self.generators = [None] * channels
+        self.output_latency = 0.0
+        self.samples_written = 0
+        self._queues = [array('h') for _ in range(channels)]
+        self._rendered = []
+        self._epochs = deque(maxlen=EPOCH_WINDOW)
+
+    @property
+    def active(self):
+        """Au moins un canal a un générateur"""
+        return any(generator is not None for generator in self.generators)
+
+    def attach(self, channel, generator):
+        """Branche `generator` sur `channel` à partir du prochain bloc"""
+        generator.output_latency = self.output_latency
+        self.generators[channel] = generator
+        self._queues[channel] = array('h')
+
+    def detach(self, channel):
+        """Rend le canal au silence"""
+        self.generators[channel] = None
+        self._queues[channel] = array('h')
+
+    def reset(self):
+        """Nouvelle sortie audio : son instant de sortie reste à mesurer"""
+        self.samples_written = 0
+        self._epochs.clear()
+
+    def set_output_latency(self, latency):
+        self.output_latency = latency
+        for generator in self.generators:
+            if generator is not None:
+                generator.output_latency = latency
+
+    def render(self):
+        """Prochain bloc entrelacé : `block` échantillons par canal"""
+        count = self.block
+        channels = self.channels
+        out = array('h', bytes(2 * count * channels))
+        rendered = []
+        for channel, generator in enumerate(self.generators):
+            if generator is None:
+                continue
+            queue = self._queues[channel]
+            if generator.samples_rendered == 0 and self._epochs:
+                generator.join(min(self._epochs) + self.samples_written / self.sample_rate)
+            while len(queue) < count:
+                queue.extend(generator.render())
+            out[channel::channels] = queue[:count]
+            del queue[:count]
+            rendered.append(generator)
+        self._rendered = rendered
+        return out
+
+    def written(self, count):
+        """Signale que `count` échantillons par canal ont été acceptés"""
+        self.samples_written += count
+        self._epochs.append(self.clock.monotonic() + self.output_latency
+                            - self.samples_written / self.sample_rate)
+        if self.samples_written < WARMUP_SECONDS * self.sample_rate:
+            # Oublie les mesures faites pendant le remplissage des tampons
+            self._epochs.clear()
+        for generator in self._rendered:
+            generator.written(count)
@@ -1,48 +1,95 @@
 #!/usr/bin/env python3
 """
 Interface LTC Reader/Generator pour Raspberry Pi
-Utilise ltc-tools pour lire et générer du timecode LTC
+Lit et génère du timecode LTC via arecord/aplay et le codec ltc_codec
 """
 
+import argparse
+import asyncio
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import subprocess
-import threading
 import time
 import re
-from datetime import datetime, timedelta
 import signal
 import os
 
+from ltc_async import EngineLoop, TkBridge
+from ltc_audio import CAPTURE_RATES, AplaySink, ArecordSource, PipeSource, make_source
+from ltc_condition import DEFAULT_STAGES, InputConditioner, parse_stages
+from ltc_codec import (SAMPLE_RATE, USER_BITS_FORMATS, BGF_CLOCK, FRAME_RATES, LTCDecoder,
+                       frames_to_timecode, get_frame_rate, parse_user_bits,
+                       timecode_to_frames)
+from ltc_convert import (SPEED_TOLERANCE, Converter, PulseChaser, RateTransform,
+                         parse_offset)
+from ltc_cues import CueEngine, load_cues
+from ltc_display import WINDOWED, DisplayLayout, profile_for
+from ltc_drift import CLOCK_SOURCE, DriftAnalyzer, system_seconds
+from ltc_generator import GeneratorBank, LTCGenerator, PrerollCache
+from ltc_metrics import Metrics, MetricsServer, process_usage, process_wakeups
+from ltc_mtc import MTCOutput, make_sink
+from ltc_power import PowerPolicy
+from ltc_remote import RemoteDisplayServer
+from ltc_state import HEARTBEAT, STATE_PATH, StateStore, process_uptime
+from ltc_trace import TRACE_PATH, TRACER
+
+READ_BLOCK_BYTES = 2048  # 1024 échantillons, ~21 ms
+SIGNAL_TIMEOUT = 0.5     # Secondes sans trame avant "Pas de signal"
+REOPEN_MAX_DELAY = 30.0  # Écart maximal entre deux tentatives de réouverture (s)
+SINK_LINGER = 10.0       # aplay reste ouvert après la dernière sortie (s)
+PREROLL_LEAD = 1.0       # Heure du jour pré-rendue au-delà du prochain résumé (s)
+PREROLL_DEBOUNCE = 300   # Pause de saisie avant de pré-rendre les départs (ms)
+
+# Analyse de dérive : source lue, courbe affichée et ses couleurs
+DRIFT_READER = "Lecture"
+DRIFT_GRAPH_SPAN = 600   # Secondes d'historique tracées
+DRIFT_GRAPH_SIZE = (560, 90)
+DRIFT_COLORS = ('#00ff00', '#ffcc00', '#00ccff', '#ff66cc', '#ff6633', '#cccccc')
+
+# Source de la sortie MTC : LTC lu, ou à défaut la sortie affichée ; une
+# sortie donnée s'écrit par son numéro ("1", "2"...)
+MTC_AUTO = 'auto'
+MTC_READER = 'reader'
+MTC_LABELS = {MTC_AUTO: "Auto", MTC_READER: "Lecture"}
+
+# Libellés des formats de bits utilisateur proposés à l'opérateur
+USER_BITS_LABELS = dict(zip(USER_BITS_FORMATS,
+                            ("Hexadécimal", "Date JJ/MM/AA", "Caractères")))
+
 class TimecodeDisplay:
     """Fenêtre d'affichage plein écran pour le timecode sur écran HDMI"""
     
-    def __init__(self, display_number=":0.1"):
+    def __init__(self, display_number=":0.1", monitor=None, on_drawn=None):
         self.display_number = display_number
+        self.monitor = monitor          # Écran HDMI (ltc_display), None : en fenêtre
+        self.on_drawn = on_drawn        # Appelé (Tk) une fois la 1re image dessinée
         self.root = None
         self.timecode_var = None
         self.status_var = None
+        self.shown_timecode = None
+        self.shown_status = None
         self.setup_display()
     
     def setup_display(self):
         """Configure l'affichage secondaire"""
         try:
-            # Création d'une nouvelle fenêtre pour le second écran
+            # Création d'une nouvelle fenêtre pour le second écran, construite
+            # cachée : elle n'apparaît qu'à sa place et à sa taille définitives
             self.root = tk.Toplevel()
+            self.root.withdraw()
             self.root.title("LTC Timecode Display")
             self.root.configure(bg='black', cursor='none')
             
-            # Configuration plein écran
-            self.root.attributes('-fullscreen', True)
-            self.root.attributes('-topmost', True)
-            
-            # Tenter de positionner sur le second écran
-            try:
-                # Obtenir la géométrie des écrans
-                self.root.geometry("1920x1080+1920+0")  # Position écran secondaire
-            except:
-                # Fallback si pas de second écran détecté
-                self.root.geometry("800x600+100+100")
+            # Position et polices selon l'écran HDMI ; sans second écran,
+            # simple fenêtre sur l'écran de contrôle
+            monitor = self.monitor
+            if monitor:
+                width, height = monitor.width, monitor.height
+                self.root.geometry(monitor.geometry)
+            else:
+                width, height, x, y = WINDOWED
+                self.root.geometry(f"{width}x{height}+{x}+{y}")
+            profile = profile_for(width, height)
             
             # Variables pour l'affichage
             self.timecode_var = tk.StringVar(value="--:--:--:--")
@@ -56,7 +103,7 @@ class TimecodeDisplay:
             timecode_label = tk.Label(
                 main_frame,
                 textvariable=self.timecode_var,
-                font=('Courier New', 120, 'bold'),
+                font=profile.timecode_font,
                 fg='white',
                 bg='black',
                 justify='center'
@@ -67,17 +114,27 @@ class TimecodeDisplay:
             status_label = tk.Label(
                 main_frame,
                 textvariable=self.status_var,
-                font=('Arial', 24, 'normal'),
+                font=profile.status_font,
                 fg='#888888',
                 bg='black',
                 justify='center'
             )
-            status_label.pack(side=tk.BOTTOM, pady=20)
+            status_label.pack(side=tk.BOTTOM, pady=profile.status_pady)
             
             # Bind pour fermer avec Échap
             self.root.bind('<Escape>', self.toggle_fullscreen)
             self.root.bind('<F11>', self.toggle_fullscreen)
             
+            # Première image : le redessin suit l'exposition du label
+            if self.on_drawn:
+                timecode_label.bind('<Expose>', self.first_expose)
+            
+            # Plein écran (sur l'écran HDMI) dès l'apparition
+            if monitor:
+                self.root.attributes('-fullscreen', True)
+            self.root.attributes('-topmost', True)
+            self.root.deiconify()
+            
             # Focus sur la fenêtre
             self.root.focus_set()
             
@@ -85,19 +142,35 @@ class TimecodeDisplay:
             print(f"Erreur lors de la création de l'affichage secondaire: {e}")
             self.root = None
     
+    def first_expose(self, event):
+        """Label exposé pour la première fois : son redessin passe avant
+        les callbacks d'inactivité"""
+        event.widget.unbind('<Expose>')
+        self.root.after_idle(self.on_drawn)
+    
     def update_timecode(self, timecode):
-        """Met à jour l'affichage du timecode"""
-        if self.root and self.timecode_var:
+        """Met à jour l'affichage du timecode (thread Tk), s'il a changé"""
+        if self.root and self.timecode_var and timecode != self.shown_timecode:
             try:
-                self.root.after(0, lambda: self.timecode_var.set(timecode))
+                self.render_timecode(timecode)
+                self.shown_timecode = timecode
             except tk.TclError:
                 pass  # Fenêtre fermée
     
+    def render_timecode(self, timecode):
+        """Affiche le timecode ; le span de trace couvre le redessin Tk"""
+        started = TRACER.begin()
+        self.timecode_var.set(timecode)
+        if started is not None:
+            # Les callbacks d'inactivité passent après le redessin du label
+            self.root.after_idle(TRACER.end, 'display_render', started)
+    
     def update_status(self, status):
-        """Met à jour l'affichage du statut"""
-        if self.root and self.status_var:
+        """Met à jour l'affichage du statut (thread Tk), s'il a changé"""
+        if self.root and self.status_var and status != self.shown_status:
             try:
-                self.root.after(0, lambda: self.status_var.set(status))
+                self.status_var.set(status)
+                self.shown_status = status
             except tk.TclError:
                 pass  # Fenêtre fermée
     
@@ -116,131 +189,31 @@ class TimecodeDisplay:
                 pass
             self.root = None
 
-class LTCInterface:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("LTC Reader/Generator - Interface de Contrôle")
-        self.root.geometry("800x600")  # Agrandie pour les nouveaux contrôles
-        self.root.configure(bg='#2c3e50')
-        
-        # Variables
-        self.ltc_reader_process = None
-        self.ltc_generator_process = None
-        self.is_reading = False
+class OutputPanel:
+    """Commandes d'une sortie LTC, jouée sur un canal de la sortie audio"""
+    
+    def __init__(self, app, parent, channel):
+        self.app = app
+        self.channel = channel
+        self.generator = None
+        self.converting = False     # Re-striping du LTC lu plutôt que génération libre
+        self.chasing = False        # ... ou poursuite de la référence, timecode propre
         self.is_generating = False
         self.is_paused = False
-        self.current_timecode = "00:00:00:00"
         self.paused_timecode = None
         self.generation_start_time = None
         self.generation_start_timecode = None
-        
-        # Affichage secondaire
-        self.timecode_display = None
-        self.display_enabled = False
-        
-        # Style
-        self.setup_styles()
-        
-        # Interface
-        self.create_widgets()
-        
-        # Démarrage automatique de la lecture
-        self.start_reading()
-        
-        # Gestion de la fermeture
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.user_bits = 0
+        self.user_bits_bgf = 0
+        self._prepare_job = None    # Pré-rendu différé (after), jusqu'à la fin de la saisie
+        self.create_widgets(parent)
     
-    def setup_styles(self):
-        """Configure les styles pour l'interface"""
-        style = ttk.Style()
-        style.theme_use('clam')
-        
-        # Style pour les gros boutons
-        style.configure('Large.TButton', 
-                       font=('Arial', 14, 'bold'),
-                       padding=(15, 12))
-        
-        # Style spécial pour les boutons de contrôle
-        style.configure('Control.TButton',
-                       font=('Arial', 16, 'bold'),
-                       padding=(20, 15))
-        
-        # Style pour les labels principaux
-        style.configure('Large.TLabel',
-                       font=('Arial', 18, 'bold'),
-                       background='#2c3e50',
-                       foreground='white')
-        
-        # Style pour l'affichage du timecode
-        style.configure('Timecode.TLabel',
-                       font=('Courier', 32, 'bold'),
-                       background='#1a252f',
-                       foreground='#00ff00',
-                       anchor='center',
-                       relief='sunken',
-                       borderwidth=2)
+    @property
+    def frame_rate(self):
+        return get_frame_rate(self.rate_var.get())
     
-    def create_widgets(self):
-        """Crée l'interface utilisateur"""
-        
-        # Frame principal
-        main_frame = ttk.Frame(self.root, padding="10")
-        main_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Titre
-        title_label = ttk.Label(main_frame, text="LTC Reader/Generator", 
-                               style='Large.TLabel')
-        title_label.pack(pady=(0, 20))
-        
-        # Section lecture LTC
-        reader_frame = ttk.LabelFrame(main_frame, text="Lecture LTC Entrante", 
-                                     padding="10")
-        reader_frame.pack(fill=tk.X, pady=(0, 20))
-        
-        # Affichage du timecode entrant
-        self.incoming_timecode_var = tk.StringVar(value="--:--:--:--")
-        self.incoming_display = ttk.Label(reader_frame, 
-                                         textvariable=self.incoming_timecode_var,
-                                         style='Timecode.TLabel')
-        self.incoming_display.pack(fill=tk.X, pady=10)
-        
-        # Statut de lecture
-        self.reader_status_var = tk.StringVar(value="Arrêté")
-        status_label = ttk.Label(reader_frame, textvariable=self.reader_status_var)
-        status_label.pack()
-        
-        # Section affichage HDMI
-        display_frame = ttk.LabelFrame(main_frame, text="Affichage HDMI Secondaire", 
-                                      padding="10")
-        display_frame.pack(fill=tk.X, pady=(0, 20))
-        
-        # Contrôles d'affichage
-        display_controls = ttk.Frame(display_frame)
-        display_controls.pack(fill=tk.X)
-        
-        self.display_button = ttk.Button(display_controls, text="ACTIVER AFFICHAGE HDMI", 
-                                        command=self.toggle_hdmi_display,
-                                        style='Large.TButton')
-        self.display_button.pack(side=tk.LEFT, padx=(0, 10), expand=True, fill=tk.X)
-        
-        # Statut de l'affichage
-        self.display_status_var = tk.StringVar(value="Désactivé")
-        display_status = ttk.Label(display_controls, textvariable=self.display_status_var)
-        display_status.pack(side=tk.RIGHT)
-        
-        # Instructions
-        instructions = ttk.Label(display_frame, 
-                                text="Connectez un écran HDMI secondaire pour afficher le timecode en grand format\n"
-                                     "Échap ou F11 pour basculer le plein écran sur l'affichage HDMI",
-                                font=('Arial', 9),
-                                foreground='gray')
-        instructions.pack(pady=5)
-        
-        # Section génération LTC
-        generator_frame = ttk.LabelFrame(main_frame, text="Génération LTC Sortante", 
-                                        padding="10")
-        generator_frame.pack(fill=tk.BOTH, expand=True)
-        
+    def create_widgets(self, generator_frame):
+        """Crée les commandes de la sortie"""
         # Boutons de mode de génération
         mode_frame = ttk.Frame(generator_frame)
         mode_frame.pack(fill=tk.X, pady=(0, 10))
@@ -253,6 +226,14 @@ class LTCInterface:
                   command=self.generate_from_zero,
                   style='Large.TButton').pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
         
+        ttk.Button(mode_frame, text="Convertir Entrée",
+                  command=self.start_conversion,
+                  style='Large.TButton').pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        
+        ttk.Button(mode_frame, text="Poursuivre Réf.",
+                  command=self.start_chase,
+                  style='Large.TButton').pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        
         # Saisie de timecode personnalisé
         custom_frame = ttk.Frame(generator_frame)
         custom_frame.pack(fill=tk.X, pady=10)
@@ -271,6 +252,41 @@ class LTCInterface:
                   command=self.generate_custom_timecode,
                   style='Large.TButton').pack(side=tk.RIGHT)
         
+        # Cadence et décalage propres à la sortie
+        rate_frame = ttk.Frame(custom_frame)
+        rate_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(rate_frame, text="Cadence :").pack(side=tk.LEFT)
+        self.rate_var = tk.StringVar(value=self.app.frame_rate.name)
+        ttk.Combobox(rate_frame, textvariable=self.rate_var, values=list(FRAME_RATES),
+                     state='readonly', width=8).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(rate_frame, text="Décalage (trames ou ±HH:MM:SS:FF) :").pack(
+            side=tk.LEFT, padx=(10, 0))
+        self.offset_var = tk.StringVar(value="0")
+        ttk.Spinbox(rate_frame, textvariable=self.offset_var, from_=-9999, to=9999,
+                    width=13).pack(side=tk.LEFT, padx=5)
+        
+        # Bits utilisateur sortants
+        user_bits_frame = ttk.Frame(custom_frame)
+        user_bits_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(user_bits_frame, text="Bits utilisateur :").pack(side=tk.LEFT)
+        
+        self.user_bits_format_var = tk.StringVar(value=USER_BITS_LABELS['hex'])
+        ttk.Combobox(user_bits_frame, textvariable=self.user_bits_format_var,
+                     values=list(USER_BITS_LABELS.values()), state='readonly',
+                     width=14).pack(side=tk.LEFT, padx=5)
+        
+        self.user_bits_var = tk.StringVar(value="00 00 00 00")
+        ttk.Entry(user_bits_frame, textvariable=self.user_bits_var,
+                  font=('Courier', 14), width=20).pack(side=tk.LEFT, expand=True,
+                                                       fill=tk.X, padx=5)
+        
+        self.clock_flag_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(user_bits_frame, text="Horloge ext.",
+                        variable=self.clock_flag_var).pack(side=tk.LEFT)
+        
         # Boutons de contrôle lecture (plus gros et mieux organisés)
         control_frame = ttk.Frame(generator_frame)
         control_frame.pack(fill=tk.X, pady=15)
@@ -303,52 +319,56 @@ class LTCInterface:
                                     textvariable=self.generator_status_var)
         gen_status_label.pack()
         
+        # Délai du dernier départ (diagnostic)
+        self.start_latency_var = tk.StringVar(value="")
+        ttk.Label(generator_frame, textvariable=self.start_latency_var).pack()
+        
+        # Pré-rendu des départs probables, une fois les réglages stables
+        for var in (self.custom_timecode_var, self.rate_var, self.offset_var,
+                    self.user_bits_format_var, self.user_bits_var, self.clock_flag_var):
+            var.trace_add('write', self.schedule_prepare)
+        self.prepare_starts()
+        
         # Mise à jour initiale des boutons
         self.update_control_buttons()
     
-    def toggle_hdmi_display(self):
-        """Active/désactive l'affichage HDMI secondaire"""
-        if not self.display_enabled:
-            try:
-                self.timecode_display = TimecodeDisplay()
-                if self.timecode_display.root:
-                    self.display_enabled = True
-                    self.display_button.config(text="DÉSACTIVER AFFICHAGE HDMI")
-                    self.display_status_var.set("Activé")
-                    # Mise à jour initiale
-                    self.timecode_display.update_timecode(self.current_timecode)
-                    if self.is_reading:
-                        self.timecode_display.update_status("LECTURE LTC")
-                    else:
-                        self.timecode_display.update_status("EN ATTENTE")
-                else:
-                    messagebox.showwarning("Avertissement", 
-                                         "Impossible de créer l'affichage secondaire.\n"
-                                         "Vérifiez qu'un écran HDMI est connecté.")
-            except Exception as e:
-                messagebox.showerror("Erreur", f"Erreur lors de l'activation de l'affichage HDMI:\n{e}")
-        else:
-            self.close_hdmi_display()
-    
-    def close_hdmi_display(self):
-        """Ferme l'affichage HDMI"""
-        if self.timecode_display:
-            self.timecode_display.close()
-            self.timecode_display = None
+    def restore(self, saved):
+        """Rétablit réglages et génération de la sortie avant l'arrêt du programme"""
+        if saved.get('user_bits_format') in USER_BITS_LABELS:
+            self.user_bits_format_var.set(USER_BITS_LABELS[saved['user_bits_format']])
+        if saved.get('user_bits_text'):
+            self.user_bits_var.set(saved['user_bits_text'])
+        self.clock_flag_var.set(bool(saved.get('clock_flag')))
+        if saved.get('custom_timecode'):
+            self.custom_timecode_var.set(saved['custom_timecode'])
+        if saved.get('rate') in FRAME_RATES:
+            self.rate_var.set(saved['rate'])
+        self.offset_var.set(str(saved.get('offset', 0)))
         
-        self.display_enabled = False
-        self.display_button.config(text="ACTIVER AFFICHAGE HDMI")
-        self.display_status_var.set("Désactivé")
-    
-    def update_hdmi_timecode(self, timecode):
-        """Met à jour le timecode sur l'affichage HDMI"""
-        if self.display_enabled and self.timecode_display:
-            self.timecode_display.update_timecode(timecode)
+        mode = saved.get('mode')
+        if mode == 'time_of_day':
+            self.start_generation(None, time_of_day=True, restored=True)
+        elif mode == 'convert':
+            self.start_conversion(restored=True)
+        elif mode == 'chase':
+            resume = None
+            if saved.get('position') is not None:
+                resume = (saved['position'], saved['saved_at'])
+            self.start_chase(resume=resume, restored=True)
+        elif mode == 'free' and saved.get('position') is not None:
+            self.start_generation(None, resume=(saved['position'], saved['saved_at']),
+                                  restored=True)
+        elif mode == 'paused' and saved.get('paused_timecode'):
+            self.paused_timecode = saved['paused_timecode']
+            self.converting = bool(saved.get('convert'))
+            self.chasing = bool(saved.get('chase'))
+            self.is_paused = True
+            self.generator_status_var.set(f"En pause : {self.paused_timecode}")
+            self.update_control_buttons()
     
-    def update_hdmi_status(self, status):
-        """Met à jour le statut sur l'affichage HDMI"""
-        if self.display_enabled and self.timecode_display:
-            self.timecode_display.update_status(status)
+    def update_state(self, **fields):
+        """Modifie l'état sauvegardé de cette sortie"""
+        self.app.update_output_state(self.channel, **fields)
     
     def update_control_buttons(self):
         """Met à jour l'état des boutons de contrôle"""
@@ -369,122 +389,146 @@ class LTCInterface:
         """Met en pause la génération LTC"""
         if self.is_generating and not self.is_paused:
             # Calculer le timecode actuel
-            if self.generation_start_time and self.generation_start_timecode:
+            if self.generator:
+                self.paused_timecode = self.generator.output_timecode()
+            elif self.generation_start_time and self.generation_start_timecode:
                 elapsed = time.time() - self.generation_start_time
                 self.paused_timecode = self.calculate_current_timecode(
                     self.generation_start_timecode, elapsed)
             
-            # Arrêter le processus
-            if self.ltc_generator_process:
-                self.ltc_generator_process.terminate()
-                self.ltc_generator_process = None
+            # Le canal retombe au silence, les autres sorties continuent
+            self.app.detach_output(self.channel)
+            self.generator = None
             
             self.is_generating = False
             self.is_paused = True
+            self.update_state(mode='paused', paused_timecode=self.paused_timecode,
+                              convert=self.converting and not self.chasing,
+                              chase=self.chasing)
             self.generator_status_var.set(f"En pause : {self.paused_timecode}")
-            self.update_hdmi_status(f"PAUSE: {self.paused_timecode}")
+            self.app.update_hdmi_status(f"PAUSE: {self.paused_timecode}")
             self.update_control_buttons()
     
     def resume_generation(self):
         """Reprend la génération LTC depuis la pause"""
-        if self.is_paused and self.paused_timecode:
-            self.start_generation(self.paused_timecode)
+        if (self.is_paused and self.paused_timecode and (self.chasing or not self.converting)
+                and not self.validate_timecode(self.paused_timecode)):
+            # Timecode figé absent à la cadence choisie depuis la pause
+            messagebox.showerror("Erreur", "Format de timecode invalide!\nUtilisez HH:MM:SS:FF")
+            return
+        if self.is_paused and self.chasing:
+            # La poursuite repart du timecode figé, calée sur la référence
+            self.start_chase(self.paused_timecode, apply_offset=False)
+            self.is_paused = False
+            self.update_control_buttons()
+        elif self.is_paused and self.converting:
+            # Une conversion reprend sur le LTC lu, pas sur le timecode figé
+            self.start_conversion()
+            self.is_paused = False
+            self.update_control_buttons()
+        elif self.is_paused and self.paused_timecode:
+            # Le timecode en pause inclut déjà le décalage
+            self.start_generation(self.paused_timecode, apply_offset=False)
             self.is_paused = False
             self.generator_status_var.set(f"Reprise depuis {self.paused_timecode}")
-            self.update_hdmi_status(f"REPRISE: {self.paused_timecode}")
+            self.app.update_hdmi_status(f"REPRISE: {self.paused_timecode}")
             self.update_control_buttons()
     
     def calculate_current_timecode(self, start_timecode, elapsed_seconds):
         """Calcule le timecode actuel basé sur le début et le temps écoulé"""
+        rate = self.frame_rate
         try:
-            h, m, s, f = map(int, start_timecode.split(':'))
-            total_frames = (h * 3600 + m * 60 + s) * 25 + f
+            total_frames = timecode_to_frames(start_timecode, rate.base, rate.drop_frame)
             
             # Ajouter les frames écoulées
-            elapsed_frames = int(elapsed_seconds * 25)
-            total_frames += elapsed_frames
+            total_frames += int(elapsed_seconds * rate.rate)
             
             # Reconvertir en timecode
-            frames = total_frames % 25
-            seconds = (total_frames // 25) % 60
-            minutes = (total_frames // (25 * 60)) % 60
-            hours = (total_frames // (25 * 60 * 60)) % 24
-            
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
+            return frames_to_timecode(total_frames, rate.base, rate.drop_frame)
         except:
             return start_timecode
     
     def validate_timecode(self, timecode):
-        """Valide le format du timecode HH:MM:SS:FF"""
-        pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])
-        """Valide le format du timecode HH:MM:SS:FF"""
-        pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])
-        """Valide le format du timecode HH:MM:SS:FF"""
+        """Valide le format du timecode HH:MM:SS:FF et l'existence de la trame
+        à la cadence de la sortie (FF sous la base, numéro non sauté en
+        drop-frame)"""
         pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])$'
-        return re.match(pattern, timecode) is not None
-    
-    def start_reading(self):
-        """Démarre la lecture du LTC entrant"""
-        if self.is_reading:
-            return
-        
+        if re.match(pattern, timecode) is None:
+            return False
+        rate = self.frame_rate
         try:
-            # Commande ltcdump pour lire le LTC
-            cmd = ['ltcdump', '-f', '-']
-            self.ltc_reader_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            self.is_reading = True
-            self.reader_status_var.set("En cours de lecture...")
-            
-            # Thread pour lire la sortie
-            threading.Thread(target=self.read_ltc_output, daemon=True).start()
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la lecture LTC:\n{e}")
+            timecode_to_frames(timecode, rate.base, rate.drop_frame)
+        except ValueError:
+            return False
+        return True
     
-    def read_ltc_output(self):
-        """Lit la sortie de ltcdump en continu"""
-        while self.is_reading and self.ltc_reader_process:
-            try:
-                line = self.ltc_reader_process.stdout.readline()
-                if line:
-                    # Extrait le timecode de la ligne (format peut varier)
-                    timecode_match = re.search(r'(\d{2}:\d{2}:\d{2}:\d{2})', line)
-                    if timecode_match:
-                        timecode = timecode_match.group(1)
-                        self.current_timecode = timecode
-                        # Mise à jour interface principale
-                        self.root.after(0, lambda tc=timecode: self.incoming_timecode_var.set(tc))
-                        self.root.after(0, lambda: self.reader_status_var.set("Signal LTC détecté"))
-                        # Mise à jour affichage HDMI
-                        self.root.after(0, lambda tc=timecode: self.update_hdmi_timecode(tc))
-                        self.root.after(0, lambda: self.update_hdmi_status("LECTURE LTC"))
-                else:
-                    time.sleep(0.1)
-            except Exception as e:
-                self.root.after(0, lambda: self.reader_status_var.set("Pas de signal LTC"))
-                self.root.after(0, lambda: self.update_hdmi_status("PAS DE SIGNAL"))
-                time.sleep(1)
+    def parse_user_bits(self):
+        """(bits utilisateur, drapeaux BGF) saisis ; ValueError si invalides"""
+        labels = {label: mode for mode, label in USER_BITS_LABELS.items()}
+        mode = labels.get(self.user_bits_format_var.get(), 'hex')
+        user_bits, bgf = parse_user_bits(self.user_bits_var.get(), mode)
+        if self.clock_flag_var.get():
+            bgf |= BGF_CLOCK
+        return user_bits, bgf
+    
+    def read_user_bits(self):
+        """Lit les bits utilisateur saisis ; False si la saisie est invalide"""
+        try:
+            self.user_bits, self.user_bits_bgf = self.parse_user_bits()
+        except ValueError as e:
+            messagebox.showerror("Erreur", f"Bits utilisateur invalides:\n{e}")
+            return False
+        return True
     
-    def stop_reading(self):
-        """Arrête la lecture du LTC"""
-        self.is_reading = False
-        if self.ltc_reader_process:
-            self.ltc_reader_process.terminate()
-            self.ltc_reader_process = None
-        self.reader_status_var.set("Arrêté")
+    def read_offset(self):
+        """Lit le décalage saisi, en trames de la sortie ; None si la saisie est invalide"""
+        try:
+            return parse_offset(self.offset_var.get(), self.rate_var.get())
+        except ValueError:
+            messagebox.showerror("Erreur", "Décalage invalide : nombre entier de trames "
+                                           "ou timecode signé (-01:00:00:00) attendu")
+            return None
+    
+    def schedule_prepare(self, *args):
+        """Réglage modifié : pré-rendu après PREROLL_DEBOUNCE ms sans autre
+        changement, plutôt qu'à chaque touche"""
+        if self._prepare_job is not None:
+            self.app.root.after_cancel(self._prepare_job)
+        self._prepare_job = self.app.root.after(PREROLL_DEBOUNCE, self.prepare_starts)
+    
+    def prepare_starts(self):
+        """Demande au moteur de pré-rendre les départs que permettent les
+        réglages : timecode saisi, zéro et heure du jour (sans message
+        d'erreur ni nouveau rendu tant que la saisie est incomplète)"""
+        self._prepare_job = None
+        timecode = self.custom_timecode_var.get()
+        if not self.validate_timecode(timecode):
+            return
+        try:
+            rate = self.frame_rate
+            offset = parse_offset(self.offset_var.get(), rate.name)
+            user_bits, bgf = self.parse_user_bits()
+        except ValueError:
+            return
+        starts = [offset,
+                  timecode_to_frames(timecode, rate.base, rate.drop_frame) + offset]
+        self.app.engine.call(self.app.set_preroll, self.channel,
+                             (rate, starts, offset, user_bits, bgf))
+    
+    def save_settings(self, mode, offset, **fields):
+        """Enregistre le mode lancé et les réglages de la sortie"""
+        labels = {label: key for key, label in USER_BITS_LABELS.items()}
+        self.update_state(
+            mode=mode, rate=self.rate_var.get(), offset=offset,
+            convert=mode == 'convert', chase=mode == 'chase',
+            user_bits_format=labels.get(self.user_bits_format_var.get(), 'hex'),
+            user_bits_text=self.user_bits_var.get(),
+            clock_flag=self.clock_flag_var.get(),
+            custom_timecode=self.custom_timecode_var.get(), **fields)
     
     def generate_current_time(self):
-        """Génère un LTC avec l'heure actuelle"""
-        current_time = datetime.now()
-        timecode = current_time.strftime("%H:%M:%S:00")
-        self.start_generation(timecode)
+        """Génère un LTC heure du jour, aligné sur l'horloge système"""
+        self.start_generation(None, time_of_day=True)
     
     def generate_from_zero(self):
         """Génère un LTC à partir de zéro"""
@@ -498,667 +542,1515 @@ class LTCInterface:
             return
         self.start_generation(timecode)
     
-    def start_generation(self, start_timecode):
-        """Démarre la génération LTC"""
-        self.stop_generation()  # Arrête toute génération en cours
+    def start_generation(self, start_timecode, time_of_day=False, resume=None,
+                         restored=False, apply_offset=True):
+        """Démarre la génération LTC sur le canal de la sortie
+
+        `resume` (position, instant CLOCK_REALTIME) reprend un timecode libre
+        sauvegardé là où il en serait ; `restored` mesure le délai entre le
+        lancement du programme et la sortie de la première trame.
+        """
+        pressed = None if restored else time.monotonic()
+        self.stop_generation(persist=False)  # Arrête toute génération en cours
         
-        try:
-            # Commande ltcgen pour générer le LTC
-            cmd = ['ltcgen', '-f', '25', '-s', start_timecode, '-']
-            self.ltc_generator_process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            self.is_generating = True
-            self.generator_status_var.set(f"Génération depuis {start_timecode}")
-            
-            # Mise à jour de l'affichage HDMI pour la génération
-            self.update_hdmi_status(f"GÉNÉRATION: {start_timecode}")
-            
-            # Démarrer la simulation du timecode généré pour l'affichage
-            self.start_timecode_simulation(start_timecode)
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la génération LTC:\n{e}")
-    
-    def start_timecode_simulation(self, start_timecode):
-        """Simule l'affichage du timecode généré"""
-        if not self.is_generating:
+        if not self.read_user_bits():
             return
+        offset = self.read_offset()
+        if offset is None:
+            return
+        position, saved_at = resume or (None, None)
+        self.save_settings('time_of_day' if time_of_day else 'free', offset,
+                           position=position, saved_at=saved_at)
         
-        def simulate_timecode():
-            current = start_timecode
-            while self.is_generating:
-                try:
-                    # Convertir en secondes
-                    h, m, s, f = map(int, current.split(':'))
-                    total_frames = (h * 3600 + m * 60 + s) * 25 + f
-                    
-                    # Incrémenter d'une frame
-                    total_frames += 1
-                    
-                    # Reconvertir
-                    frames = total_frames % 25
-                    seconds = (total_frames // 25) % 60
-                    minutes = (total_frames // (25 * 60)) % 60
-                    hours = (total_frames // (25 * 60 * 60)) % 24
-                    
-                    current = f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
-                    
-                    # Mise à jour de l'affichage HDMI
-                    if self.display_enabled:
-                        self.root.after(0, lambda tc=current: self.update_hdmi_timecode(tc))
-                    
-                    time.sleep(1/25)  # 25 fps
-                    
-                except Exception:
-                    break
+        generator = LTCGenerator(self.frame_rate, SAMPLE_RATE,
+                                 user_bits=self.user_bits,
+                                 bgf=self.user_bits_bgf,
+                                 offset=offset if apply_offset else 0,
+                                 preroll=self.app.preroll)
+        if time_of_day:
+            generator.start_time_of_day()
+            label = "HEURE DU JOUR"
+        elif resume:
+            generator.resume(*resume)
+            label = "REPRISE"
+        else:
+            generator.start(start_timecode)
+            label = start_timecode
+        self.generator = generator
+        self.converting = False
         
-        # Lancer la simulation dans un thread séparé
-        threading.Thread(target=simulate_timecode, daemon=True).start()
+        self.is_generating = True
+        self.generation_start_time = time.time()
+        self.generation_start_timecode = start_timecode
+        self.app.attach_output(self.channel, generator, restored, pressed)
+        self.generator_status_var.set(f"Génération depuis {label.lower()}")
+        
+        # Mise à jour de l'affichage HDMI pour la génération
+        self.app.update_hdmi_status(f"GÉNÉRATION: {label}")
     
-    def stop_generation(self):
+    def start_conversion(self, restored=False):
+        """Re-stripe le LTC lu sur le canal : cadence et décalage de la sortie
+        
+        La sortie suit l'entrée en continu (sauts compris) et passe en roue
+        libre si le signal lu disparaît.
+        """
+        self.stop_generation(persist=False)
+        
+        if not self.read_user_bits():
+            return
+        offset = self.read_offset()
+        if offset is None:
+            return
+        self.save_settings('convert', offset, position=None, saved_at=None)
+        
+        generator = LTCGenerator(self.frame_rate, SAMPLE_RATE,
+                                 user_bits=self.user_bits,
+                                 bgf=self.user_bits_bgf)
+        transform = RateTransform(self.app.frame_rate, self.frame_rate, offset)
+        converter = Converter(generator, transform, self.app.convert_delay)
+        self.generator = generator
+        self.converting = True
+        
+        self.is_generating = True
+        self.generation_start_time = time.time()
+        self.generation_start_timecode = None
+        self.app.attach_converter(self.channel, converter, restored)
+        label = f"{self.app.frame_rate.name} → {self.frame_rate.name}"
+        self.generator_status_var.set(f"Conversion {label} : en attente du LTC entrant")
+        self.app.update_hdmi_status(f"CONVERSION: {label}")
+    
+    def start_chase(self, start_timecode=None, resume=None, restored=False,
+                    apply_offset=True):
+        """Poursuite : timecode propre (saisi, plus le décalage), cadence et
+        phase des trames calées sur la référence
+        
+        La référence est le LTC lu, ou le train d'impulsions de
+        --chase-pulses. `resume` (position, instant CLOCK_REALTIME) reprend
+        une poursuite sauvegardée là où elle en serait.
+        """
+        self.stop_generation(persist=False)
+        
+        if start_timecode is None and resume is None:
+            start_timecode = self.custom_timecode_var.get()
+            if not self.validate_timecode(start_timecode):
+                messagebox.showerror("Erreur",
+                                     "Format de timecode invalide!\nUtilisez HH:MM:SS:FF")
+                return
+        if not self.read_user_bits():
+            return
+        offset = self.read_offset()
+        if offset is None:
+            return
+        position, saved_at = resume or (None, None)
+        self.save_settings('chase', offset, position=position, saved_at=saved_at)
+        
+        rate = self.frame_rate
+        if resume:
+            start = round(position + (time.time() - saved_at) * rate.rate)
+        else:
+            start = timecode_to_frames(start_timecode, rate.base, rate.drop_frame)
+            if apply_offset:
+                start += offset
+        generator = LTCGenerator(rate, SAMPLE_RATE,
+                                 user_bits=self.user_bits,
+                                 bgf=self.user_bits_bgf)
+        chaser = self.app.make_chaser(generator, start)
+        self.generator = generator
+        self.converting = True
+        self.chasing = True
+        
+        self.is_generating = True
+        self.generation_start_time = time.time()
+        self.generation_start_timecode = None
+        self.app.attach_converter(self.channel, chaser, restored)
+        self.generator_status_var.set(chaser.status(time.monotonic()))
+        self.app.update_hdmi_status(f"POURSUITE: {self.app.chase_label}")
+    
+    def show_status(self, generator, status):
+        """Affiche l'écart mesuré tant que ce générateur est actif"""
+        if generator is self.generator:
+            self.generator_status_var.set(status)
+    
+    def show_start_latency(self, generator, queued, output, preroll_hit):
+        """Délais du dernier départ : première trame en file, puis sortie"""
+        if generator is not self.generator:
+            return
+        text = f"Dernier départ : 1re trame en file {queued * 1000:.0f} ms"
+        if output is not None:
+            text += f", sortie {output * 1000:.0f} ms"
+        if preroll_hit:
+            text += " (pré-rendue)"
+        self.start_latency_var.set(text)
+    
+    def stop_generation(self, persist=True):
         """Arrête la génération LTC"""
+        if persist:
+            self.update_state(mode='stopped')
         self.is_generating = False
-        if self.ltc_generator_process:
-            self.ltc_generator_process.terminate()
-            self.ltc_generator_process = None
+        self.converting = False
+        self.chasing = False
+        if self.generator:
+            self.app.detach_output(self.channel)
+            self.generator = None
         self.generator_status_var.set("Arrêté")
-        self.update_hdmi_status("ARRÊT GÉNÉRATION")
-    
-    def on_closing(self):
-        """Nettoyage avant fermeture"""
-        self.stop_reading()
-        self.stop_generation()
-        self.close_hdmi_display()
-        self.root.destroy()
+        self.app.update_hdmi_status("ARRÊT GÉNÉRATION")
 
-def check_ltc_tools():
-    """Vérifie que ltc-tools est installé"""
-    try:
-        subprocess.run(['ltcdump', '--help'], capture_output=True)
-        subprocess.run(['ltcgen', '--help'], capture_output=True)
-        return True
-    except FileNotFoundError:
-        return False
-
-def main():
-    """Fonction principale"""
-    # Vérification des outils LTC
-    if not check_ltc_tools():
-        print("Erreur: ltc-tools n'est pas installé!")
-        print("Installez-le avec: sudo apt-get install ltc-tools")
-        return
-    
-    # Création de l'interface
-    root = tk.Tk()
-    app = LTCInterface(root)
-    
-    try:
-        root.mainloop()
-    except KeyboardInterrupt:
-        app.on_closing()
-
-if __name__ == "__main__":
-    main()
-
-        return re.match(pattern, timecode) is not None
-        """Valide le format du timecode HH:MM:SS:FF"""
-        pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])$'
-        return re.match(pattern, timecode) is not None
-    
-    def start_reading(self):
-        """Démarre la lecture du LTC entrant"""
-        if self.is_reading:
-            return
+class LTCInterface:
+    def __init__(self, root, metrics_port=None, trace_path=None, state_path=None,
+                 outputs=None, output_device=None, convert_delay=0.0, remote_port=None,
+                 low_power=None, chase_pulses=None, pulses_per_frame=1, input_filter=None,
+                 mtc=None, mtc_source=None, input_source=None, max_speed=False,
+                 refresh_displays=False, capture_rate=None):
+        self.root = root
+        self.root.title("LTC Reader/Generator - Interface de Contrôle")
+        self.root.geometry("800x600")  # Agrandie pour les nouveaux contrôles
+        self.root.configure(bg='#2c3e50')
         
+        # Variables
+        self.reader_task = None
+        self.is_reading = False
+        self.current_timecode = "00:00:00:00"
+        
+        # État sauvegardé par l'exécution précédente (redémarrage à chaud)
+        self.state = StateStore(state_path or STATE_PATH)
+        saved = self.state.load()
+        self.last_heartbeat = 0.0
         try:
-            # Commande ltcdump pour lire le LTC
-            cmd = ['ltcdump', '-f', '-']
-            self.ltc_reader_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            self.is_reading = True
-            self.reader_status_var.set("En cours de lecture...")
-            
-            # Thread pour lire la sortie
-            threading.Thread(target=self.read_ltc_output, daemon=True).start()
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la lecture LTC:\n{e}")
-    
-    def read_ltc_output(self):
-        """Lit la sortie de ltcdump en continu"""
-        while self.is_reading and self.ltc_reader_process:
+            self.frame_rate = get_frame_rate(saved.get('rate', '25'))
+        except ValueError:
+            self.frame_rate = get_frame_rate('25')
+        
+        # Source lue (carte son, tube, fichier, réseau : voir make_source) ;
+        # un fichier est lu au rythme réel, ou aussi vite que possible
+        self.input_source = input_source or saved.get('input_source') or 'alsa'
+        self.max_speed = max_speed
+        # Fréquence de capture d'arecord (96 kHz : shuttle jusqu'à 10x)
+        self.capture_rate = capture_rate or saved.get('capture_rate')
+        if self.capture_rate not in CAPTURE_RATES:
+            self.capture_rate = SAMPLE_RATE
+        if capture_rate:
+            self.state.update(capture_rate=capture_rate)
+        
+        # Conditionnement du signal lu (étages, '' si désactivé), relu par
+        # la boucle du moteur à chaque bloc ; --input-filter l'impose
+        if input_filter is None:
+            input_filter = saved.get('input_filter', '')
+        self.input_filter = input_filter
+        self.filter_stages = input_filter or saved.get('filter_stages') or DEFAULT_STAGES
+        
+        # Sorties LTC : un générateur indépendant par canal d'un même flux
+        # aplay, rendus ensemble par la boucle du moteur
+        self.bank = GeneratorBank(outputs or len(saved.get('outputs', ())) or 1)
+        self.output_device = output_device
+        self.output_task = None
+        self.output_idle_since = None
+        self.restored_generators = set()
+        self.display_channel = 0
+        
+        # Départs pré-rendus (boucle du moteur) : réglages de chaque sortie,
+        # et instant de chaque départ demandé pour en mesurer le délai
+        self.preroll = PrerollCache(SAMPLE_RATE)
+        self.preroll_settings = {}
+        self.pending_starts = {}
+        
+        # Sorties asservies au LTC lu (canal → Converter), boucle du moteur
+        # seulement ; retard voulu de la sortie convertie sur l'entrée
+        self.converters = {}
+        self.convert_delay = convert_delay
+        
+        # Poursuite : référence LTC lu, ou impulsions capturées à part
+        # (canal → PulseChaser, périphérique ALSA ou tube nommé)
+        self.chase_pulses = chase_pulses
+        self.pulses_per_frame = pulses_per_frame
+        self.pulse_chasers = {}
+        self.pulse_task = None
+        
+        # Boucle asyncio du moteur (capture, génération, réseau) et pont
+        # vers Tk, seul point de passage entre les deux
+        self.engine = EngineLoop().start()
+        self.bridge = TkBridge(self.root)
+        
+        # Compteurs de supervision, servis en HTTP sur demande (--metrics-port)
+        self.metrics = Metrics(self.frame_rate)
+        self.metrics.generators = self.bank.generators
+        self.metrics.preroll = self.preroll
+        self.metrics_server = None
+        if metrics_port:
             try:
-                line = self.ltc_reader_process.stdout.readline()
-                if line:
-                    # Extrait le timecode de la ligne (format peut varier)
-                    timecode_match = re.search(r'(\d{2}:\d{2}:\d{2}:\d{2})', line)
-                    if timecode_match:
-                        timecode = timecode_match.group(1)
-                        self.current_timecode = timecode
-                        # Mise à jour interface principale
-                        self.root.after(0, lambda tc=timecode: self.incoming_timecode_var.set(tc))
-                        self.root.after(0, lambda: self.reader_status_var.set("Signal LTC détecté"))
-                        # Mise à jour affichage HDMI
-                        self.root.after(0, lambda tc=timecode: self.update_hdmi_timecode(tc))
-                        self.root.after(0, lambda: self.update_hdmi_status("LECTURE LTC"))
-                else:
-                    time.sleep(0.1)
-            except Exception as e:
-                self.root.after(0, lambda: self.reader_status_var.set("Pas de signal LTC"))
-                self.root.after(0, lambda: self.update_hdmi_status("PAS DE SIGNAL"))
-                time.sleep(1)
-    
-    def stop_reading(self):
-        """Arrête la lecture du LTC"""
-        self.is_reading = False
-        if self.ltc_reader_process:
-            self.ltc_reader_process.terminate()
-            self.ltc_reader_process = None
-        self.reader_status_var.set("Arrêté")
-    
-    def generate_current_time(self):
-        """Génère un LTC avec l'heure actuelle"""
-        current_time = datetime.now()
-        timecode = current_time.strftime("%H:%M:%S:00")
-        self.start_generation(timecode)
-    
-    def generate_from_zero(self):
-        """Génère un LTC à partir de zéro"""
-        self.start_generation("00:00:00:00")
-    
-    def generate_custom_timecode(self):
-        """Génère un LTC avec le timecode saisi"""
-        timecode = self.custom_timecode_var.get()
-        if not self.validate_timecode(timecode):
-            messagebox.showerror("Erreur", "Format de timecode invalide!\nUtilisez HH:MM:SS:FF")
+                self.metrics_server = self.engine.submit(
+                    MetricsServer(self.metrics, metrics_port).start()).result()
+            except OSError as e:
+                print(f"Métriques indisponibles sur le port {metrics_port}: {e}")
+        
+        # Affichage du timecode sur tablettes et téléphones (--remote-port)
+        self.remote = None
+        if remote_port:
+            try:
+                self.remote = self.engine.submit(
+                    RemoteDisplayServer(remote_port).start()).result()
+            except OSError as e:
+                print(f"Affichage distant indisponible sur le port {remote_port}: {e}")
+        
+        # Sortie MIDI Timecode (--mtc), tirée du LTC lu ou d'une sortie LTC
+        # (relu par la boucle du moteur) ; émise par son propre thread
+        self.mtc = None
+        self.mtc_source = mtc_source or saved.get('mtc_source') or MTC_AUTO
+        if self.mtc_source not in MTC_LABELS and not (
+                self.mtc_source.isdigit() and 1 <= int(self.mtc_source) <= self.bank.channels):
+            self.mtc_source = MTC_AUTO
+        if mtc:
+            try:
+                self.mtc = MTCOutput(make_sink(mtc)).start()
+            except (OSError, ValueError) as e:
+                print(f"Sortie MTC indisponible ({mtc}): {e}")
+        self.metrics.mtc = self.mtc
+        
+        # Cues déclenchés par le timecode lu
+        self.cue_engine = None
+        
+        # Dérive des sources (LTC lu, sorties, horloge système), tenue par
+        # la boucle du moteur et résumée chaque seconde pour Tk
+        self.drift = DriftAnalyzer(saved.get('drift_reference') or CLOCK_SOURCE)
+        
+        # Cadences du moteur et de l'affichage (économie d'énergie)
+        self.power = PowerPolicy(bool(saved.get('low_power')) if low_power is None
+                                 else low_power)
+        self.metrics.low_power = self.power.low_power
+        
+        # Traçage du pipeline (case à cocher, SIGUSR1 ou --trace)
+        self.trace_path = trace_path or TRACE_PATH
+        
+        # Affichage secondaire ; disposition des écrans lue dès maintenant
+        # hors du thread Tk (xrandr seulement si ces écrans sont inconnus)
+        self.timecode_display = None
+        self.display_enabled = False
+        self.hdmi_status = None
+        self.display_layout = DisplayLayout(refresh=refresh_displays)
+        self.engine.submit(asyncio.to_thread(self.display_layout.monitors))
+        
+        # Style
+        self.setup_styles()
+        
+        # Interface
+        self.create_widgets()
+        
+        # Démarrage automatique de la lecture
+        self.start_reading()
+        self.report_task = self.engine.submit(self.periodic_reports())
+        
+        # Reprise de l'état précédent, puis sauvegarde périodique
+        self.restore_state(saved)
+        self.root.after(1000, self.persist_state)
+        
+        # Gestion de la fermeture
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # kill -USR1 <pid> bascule la trace sans toucher à l'écran
+        signal.signal(signal.SIGUSR1,
+                      lambda signum, frame: self.root.after(0, self.toggle_trace))
+        if trace_path:
+            self.toggle_trace()
+    
+    def restore_state(self, saved):
+        """Rétablit réglages et génération tels qu'avant l'arrêt du programme"""
+        if not saved:
             return
-        self.start_generation(timecode)
+        if saved.get('reader_timecode'):
+            self.incoming_timecode_var.set(saved['reader_timecode'])
+        if saved.get('cue_list'):
+            self.load_cue_file(saved['cue_list'])
+        if saved.get('hdmi_display'):
+            self.toggle_hdmi_display()
+        
+        # Anciens fichiers d'état : une seule sortie, décrite à la racine
+        for output, saved_output in zip(self.outputs, saved.get('outputs') or [saved]):
+            output.restore(saved_output)
+    
+    def persist_state(self):
+        """Sauvegarde périodique : positions lue et générées, écritures limitées"""
+        now = time.monotonic()
+        saved = self.state.state.get('outputs', [])
+        unsaved = any(output.generator and not output.generator.time_of_day
+                      and (output.chasing or not output.converting)
+                      and (output.channel >= len(saved)
+                           or saved[output.channel].get('position') is None)
+                      for output in self.outputs)
+        if now - self.last_heartbeat >= HEARTBEAT or unsaved:
+            # Toutes les sorties en une seule écriture
+            outputs = [dict(output) for output in saved]
+            outputs += [{} for _ in range(len(self.outputs) - len(outputs))]
+            established = True
+            for output in self.outputs:
+                generator = output.generator
+                position = generator.output_position() if generator else None
+                if generator and not position:
+                    established = False
+                elif (position and not generator.time_of_day
+                      and (output.chasing or not output.converting)):
+                    # Position de sortie et instant CLOCK_REALTIME associé
+                    outputs[output.channel].update(position=position[0],
+                                                   saved_at=position[1])
+            if established:
+                self.last_heartbeat = now
+            self.state.update(outputs=outputs, reader_timecode=self.metrics.timecode)
+        else:
+            self.state.save()
+        self.root.after(1000, self.persist_state)
     
-    def start_generation(self, start_timecode):
-        """Démarre la génération LTC"""
-        self.stop_generation()  # Arrête toute génération en cours
+    def setup_styles(self):
+        """Configure les styles pour l'interface"""
+        style = ttk.Style()
+        style.theme_use('clam')
         
-        try:
-            # Commande ltcgen pour générer le LTC
-            cmd = ['ltcgen', '-f', '25', '-s', start_timecode, '-']
-            self.ltc_generator_process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            self.is_generating = True
-            self.generator_status_var.set(f"Génération depuis {start_timecode}")
-            
-            # Mise à jour de l'affichage HDMI pour la génération
-            self.update_hdmi_status(f"GÉNÉRATION: {start_timecode}")
-            
-            # Démarrer la simulation du timecode généré pour l'affichage
-            self.start_timecode_simulation(start_timecode)
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la génération LTC:\n{e}")
+        # Style pour les gros boutons
+        style.configure('Large.TButton', 
+                       font=('Arial', 14, 'bold'),
+                       padding=(15, 12))
+        
+        # Style spécial pour les boutons de contrôle
+        style.configure('Control.TButton',
+                       font=('Arial', 16, 'bold'),
+                       padding=(20, 15))
+        
+        # Style pour les labels principaux
+        style.configure('Large.TLabel',
+                       font=('Arial', 18, 'bold'),
+                       background='#2c3e50',
+                       foreground='white')
+        
+        # Style pour l'affichage du timecode
+        style.configure('Timecode.TLabel',
+                       font=('Courier', 32, 'bold'),
+                       background='#1a252f',
+                       foreground='#00ff00',
+                       anchor='center',
+                       relief='sunken',
+                       borderwidth=2)
     
-    def start_timecode_simulation(self, start_timecode):
-        """Simule l'affichage du timecode généré"""
-        if not self.is_generating:
-            return
+    def create_widgets(self):
+        """Crée l'interface utilisateur"""
         
-        def simulate_timecode():
-            current = start_timecode
-            while self.is_generating:
-                try:
-                    # Convertir en secondes
-                    h, m, s, f = map(int, current.split(':'))
-                    total_frames = (h * 3600 + m * 60 + s) * 25 + f
-                    
-                    # Incrémenter d'une frame
-                    total_frames += 1
-                    
-                    # Reconvertir
-                    frames = total_frames % 25
-                    seconds = (total_frames // 25) % 60
-                    minutes = (total_frames // (25 * 60)) % 60
-                    hours = (total_frames // (25 * 60 * 60)) % 24
-                    
-                    current = f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
-                    
-                    # Mise à jour de l'affichage HDMI
-                    if self.display_enabled:
-                        self.root.after(0, lambda tc=current: self.update_hdmi_timecode(tc))
-                    
-                    time.sleep(1/25)  # 25 fps
-                    
-                except Exception:
-                    break
+        # Frame principal
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Titre
+        title_label = ttk.Label(main_frame, text="LTC Reader/Generator", 
+                               style='Large.TLabel')
+        title_label.pack(pady=(0, 20))
+        
+        # Section lecture LTC
+        reader_frame = ttk.LabelFrame(main_frame, text="Lecture LTC Entrante", 
+                                     padding="10")
+        reader_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        # Affichage du timecode entrant
+        self.incoming_timecode_var = tk.StringVar(value="--:--:--:--")
+        self.incoming_display = ttk.Label(reader_frame, 
+                                         textvariable=self.incoming_timecode_var,
+                                         style='Timecode.TLabel')
+        self.incoming_display.pack(fill=tk.X, pady=10)
         
-        # Lancer la simulation dans un thread séparé
-        threading.Thread(target=simulate_timecode, daemon=True).start()
+        # Bits utilisateur entrants
+        self.incoming_user_bits_var = tk.StringVar(value="UB: -- -- -- --")
+        ttk.Label(reader_frame, textvariable=self.incoming_user_bits_var,
+                  font=('Courier', 14)).pack()
+        
+        # Statut de lecture
+        self.reader_status_var = tk.StringVar(value="Arrêté")
+        status_label = ttk.Label(reader_frame, textvariable=self.reader_status_var)
+        status_label.pack()
+        
+        # Cadence du LTC lu
+        reader_rate_frame = ttk.Frame(reader_frame)
+        reader_rate_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(reader_rate_frame, text="Cadence lue :").pack(side=tk.LEFT)
+        self.reader_rate_var = tk.StringVar(value=self.frame_rate.name)
+        reader_rate = ttk.Combobox(reader_rate_frame, textvariable=self.reader_rate_var,
+                                   values=list(FRAME_RATES), state='readonly', width=8)
+        reader_rate.pack(side=tk.LEFT, padx=5)
+        reader_rate.bind('<<ComboboxSelected>>', self.set_reader_rate)
+        
+        # Source lue : carte son, tube nommé, entrée standard, fichier, réseau
+        input_frame = ttk.Frame(reader_frame)
+        input_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(input_frame, text="Entrée :").pack(side=tk.LEFT)
+        self.input_source_var = tk.StringVar(value=self.input_source)
+        input_entry = ttk.Entry(input_frame, textvariable=self.input_source_var, width=30)
+        input_entry.pack(side=tk.LEFT, padx=5)
+        input_entry.bind('<Return>', self.set_input_source)
+        ttk.Button(input_frame, text="Fichier...",
+                   command=self.choose_input_file).pack(side=tk.LEFT)
+        ttk.Button(input_frame, text="Carte son",
+                   command=lambda: self.set_input_source(source='alsa')).pack(side=tk.LEFT,
+                                                                              padx=5)
+        self.max_speed_var = tk.BooleanVar(value=self.max_speed)
+        ttk.Checkbutton(input_frame, text="Vitesse max", variable=self.max_speed_var,
+                        command=self.set_input_source).pack(side=tk.LEFT)
+        
+        # Conditionnement du signal (câbles longs, interfaces bon marché)
+        self.input_filter_var = tk.BooleanVar(value=bool(self.input_filter))
+        ttk.Checkbutton(reader_rate_frame, text="Conditionnement d'entrée",
+                        variable=self.input_filter_var,
+                        command=self.toggle_input_filter).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(reader_rate_frame, text=f"({self.filter_stages})",
+                  font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
+        
+        # Liste de cues
+        cue_frame = ttk.Frame(reader_frame)
+        cue_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(cue_frame, text="Charger cues...",
+                   command=self.load_cue_list).pack(side=tk.LEFT)
+        self.cue_status_var = tk.StringVar(value="Aucune liste de cues")
+        ttk.Label(cue_frame, textvariable=self.cue_status_var).pack(side=tk.LEFT, padx=10)
+        
+        # Section affichage HDMI
+        display_frame = ttk.LabelFrame(main_frame, text="Affichage HDMI Secondaire", 
+                                      padding="10")
+        display_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        # Contrôles d'affichage
+        display_controls = ttk.Frame(display_frame)
+        display_controls.pack(fill=tk.X)
+        
+        self.display_button = ttk.Button(display_controls, text="ACTIVER AFFICHAGE HDMI", 
+                                        command=self.toggle_hdmi_display,
+                                        style='Large.TButton')
+        self.display_button.pack(side=tk.LEFT, padx=(0, 10), expand=True, fill=tk.X)
+        
+        # Statut de l'affichage
+        self.display_status_var = tk.StringVar(value="Désactivé")
+        display_status = ttk.Label(display_controls, textvariable=self.display_status_var)
+        display_status.pack(side=tk.RIGHT)
+        
+        # Instructions
+        instructions = ttk.Label(display_frame, 
+                                text="Connectez un écran HDMI secondaire pour afficher le timecode en grand format\n"
+                                     "Échap ou F11 pour basculer le plein écran sur l'affichage HDMI",
+                                font=('Arial', 9),
+                                foreground='gray')
+        instructions.pack(pady=5)
+        
+        # Traçage du pipeline, pour diagnostiquer les saccades d'affichage
+        trace_frame = ttk.Frame(display_frame)
+        trace_frame.pack(fill=tk.X)
+        self.trace_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(trace_frame, text="Trace pipeline", variable=self.trace_var,
+                        command=self.toggle_trace).pack(side=tk.LEFT)
+        self.trace_status_var = tk.StringVar(value="")
+        ttk.Label(trace_frame, textvariable=self.trace_status_var,
+                  font=('Arial', 9)).pack(side=tk.LEFT, padx=10)
+        
+        # Économie d'énergie, avec la consommation mesurée du processus
+        power_frame = ttk.Frame(display_frame)
+        power_frame.pack(fill=tk.X)
+        self.low_power_var = tk.BooleanVar(value=self.power.low_power)
+        ttk.Checkbutton(power_frame, text="Économie d'énergie", variable=self.low_power_var,
+                        command=self.toggle_low_power).pack(side=tk.LEFT)
+        self.power_status_var = tk.StringVar(value="")
+        ttk.Label(power_frame, textvariable=self.power_status_var,
+                  font=('Arial', 9)).pack(side=tk.LEFT, padx=10)
+        
+        # Sortie MIDI Timecode : source suivie et régularité des quarter-frames
+        if self.mtc:
+            mtc_frame = ttk.LabelFrame(main_frame, text="Sortie MTC", padding="10")
+            mtc_frame.pack(fill=tk.X, pady=(0, 20))
+            ttk.Label(mtc_frame, text="Source :").pack(side=tk.LEFT)
+            labels = dict(MTC_LABELS)
+            labels.update((str(channel), f"Sortie {channel}")
+                          for channel in range(1, self.bank.channels + 1))
+            self.mtc_labels = labels
+            self.mtc_source_var = tk.StringVar(value=labels[self.mtc_source])
+            mtc_source = ttk.Combobox(mtc_frame, textvariable=self.mtc_source_var,
+                                      values=list(labels.values()), state='readonly',
+                                      width=10)
+            mtc_source.pack(side=tk.LEFT, padx=5)
+            mtc_source.bind('<<ComboboxSelected>>', self.set_mtc_source)
+            self.mtc_status_var = tk.StringVar(value=self.mtc.summary())
+            ttk.Label(mtc_frame, textvariable=self.mtc_status_var,
+                      font=('Arial', 9)).pack(side=tk.LEFT, padx=10)
+        
+        # Dérive des sources par rapport à une référence
+        drift_frame = ttk.LabelFrame(main_frame, text="Dérive des sources", padding="10")
+        drift_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        drift_controls = ttk.Frame(drift_frame)
+        drift_controls.pack(fill=tk.X)
+        ttk.Label(drift_controls, text="Référence :").pack(side=tk.LEFT)
+        self.drift_reference_var = tk.StringVar(value=self.drift.reference)
+        self.drift_reference = ttk.Combobox(drift_controls, state='readonly', width=18,
+                                            textvariable=self.drift_reference_var,
+                                            values=[self.drift.reference])
+        self.drift_reference.pack(side=tk.LEFT, padx=5)
+        self.drift_reference.bind('<<ComboboxSelected>>', self.set_drift_reference)
+        ttk.Button(drift_controls, text="Exporter CSV...",
+                   command=self.export_drift).pack(side=tk.RIGHT)
+        
+        self.drift_text_var = tk.StringVar(value="En attente de mesures...")
+        ttk.Label(drift_frame, textvariable=self.drift_text_var,
+                  font=('Courier', 10), justify=tk.LEFT).pack(anchor=tk.W, pady=5)
+        width, height = DRIFT_GRAPH_SIZE
+        self.drift_canvas = tk.Canvas(drift_frame, width=width, height=height,
+                                      bg='#1a252f', highlightthickness=0)
+        self.drift_canvas.pack(fill=tk.X)
+        
+        # Section génération LTC : une sortie par canal audio, chacune avec
+        # ses propres commandes (un onglet par sortie)
+        generator_frame = ttk.LabelFrame(main_frame, text="Génération LTC Sortante", 
+                                        padding="10")
+        generator_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.outputs = []
+        if self.bank.channels == 1:
+            self.outputs.append(OutputPanel(self, generator_frame, 0))
+        else:
+            notebook = ttk.Notebook(generator_frame)
+            notebook.pack(fill=tk.BOTH, expand=True)
+            for channel in range(self.bank.channels):
+                tab = ttk.Frame(notebook, padding="5")
+                notebook.add(tab, text=f"Sortie {channel + 1}")
+                self.outputs.append(OutputPanel(self, tab, channel))
+            notebook.bind('<<NotebookTabChanged>>', lambda event: self.select_display_output(
+                notebook.index('current')))
+    
+    def toggle_trace(self):
+        """Démarre la trace, ou l'arrête et l'écrit au format Chrome/Perfetto"""
+        if TRACER.enabled:
+            TRACER.stop()
+            try:
+                path = TRACER.dump(self.trace_path)
+                self.trace_status_var.set(f"Trace écrite : {path}")
+            except OSError as e:
+                self.trace_status_var.set(f"Trace non écrite : {e}")
+        else:
+            TRACER.start()
+            self.trace_status_var.set("Trace en cours...")
+        self.trace_var.set(TRACER.enabled)
+    
+    def set_mtc_source(self, event=None):
+        """Change la source du MTC : le saut de position donne un full-frame"""
+        label = self.mtc_source_var.get()
+        self.mtc_source = next(source for source, text in self.mtc_labels.items()
+                               if text == label)
+        self.state.update(mtc_source=self.mtc_source)
+    
+    def toggle_low_power(self):
+        """Espace rafraîchissements et résumés, capture au ralenti sans signal"""
+        low_power = self.low_power_var.get()
+        self.power.low_power = low_power
+        self.metrics.low_power = low_power
+        self.state.update(low_power=low_power)
+    
+    def show_power(self, cpu, wakeups, idle):
+        """Consommation du processus sur le dernier intervalle"""
+        text = f"CPU {cpu:.1f} %  ·  {wakeups:.0f} réveils/s"
+        if idle:
+            text += "  ·  capture au ralenti"
+        set_text(self.power_status_var, text)
     
-    def stop_generation(self):
-        """Arrête la génération LTC"""
-        self.is_generating = False
-        if self.ltc_generator_process:
-            self.ltc_generator_process.terminate()
-            self.ltc_generator_process = None
-        self.generator_status_var.set("Arrêté")
-        self.update_hdmi_status("ARRÊT GÉNÉRATION")
+    def toggle_hdmi_display(self):
+        """Active/désactive l'affichage HDMI secondaire"""
+        if not self.display_enabled:
+            pressed = time.perf_counter()
+            try:
+                monitor = self.display_layout.secondary()
+                self.timecode_display = TimecodeDisplay(
+                    monitor=monitor,
+                    on_drawn=lambda: self.hdmi_drawn(monitor, pressed))
+                if self.timecode_display.root:
+                    self.display_enabled = True
+                    self.power.display_active = True
+                    self.hdmi_status = None
+                    self.state.update(hdmi_display=True)
+                    self.display_button.config(text="DÉSACTIVER AFFICHAGE HDMI")
+                    self.display_status_var.set("Activé")
+                    # Mise à jour initiale
+                    self.timecode_display.update_timecode(self.current_timecode)
+                    if self.is_reading:
+                        self.timecode_display.update_status("LECTURE LTC")
+                    else:
+                        self.timecode_display.update_status("EN ATTENTE")
+                else:
+                    messagebox.showwarning("Avertissement", 
+                                         "Impossible de créer l'affichage secondaire.\n"
+                                         "Vérifiez qu'un écran HDMI est connecté.")
+            except Exception as e:
+                messagebox.showerror("Erreur", f"Erreur lors de l'activation de l'affichage HDMI:\n{e}")
+        else:
+            self.close_hdmi_display()
+            self.state.update(hdmi_display=False)
+    
+    def hdmi_drawn(self, monitor, pressed):
+        """Première image de l'affichage HDMI : délai depuis la demande"""
+        elapsed = (time.perf_counter() - pressed) * 1000
+        self.metrics.display_open.add(elapsed)
+        if self.display_enabled:
+            where = monitor.name if monitor else "en fenêtre"
+            cache = ", écrans en cache" if self.display_layout.cached else ""
+            self.display_status_var.set(f"Activé ({where}, 1re image en {elapsed:.0f} ms"
+                                        f"{cache})")
     
-    def on_closing(self):
-        """Nettoyage avant fermeture"""
-        self.stop_reading()
-        self.stop_generation()
-        self.close_hdmi_display()
-        self.root.destroy()
-
-def check_ltc_tools():
-    """Vérifie que ltc-tools est installé"""
-    try:
-        subprocess.run(['ltcdump', '--help'], capture_output=True)
-        subprocess.run(['ltcgen', '--help'], capture_output=True)
-        return True
-    except FileNotFoundError:
-        return False
-
-def main():
-    """Fonction principale"""
-    # Vérification des outils LTC
-    if not check_ltc_tools():
-        print("Erreur: ltc-tools n'est pas installé!")
-        print("Installez-le avec: sudo apt-get install ltc-tools")
-        return
+    def close_hdmi_display(self):
+        """Ferme l'affichage HDMI"""
+        if self.timecode_display:
+            self.timecode_display.close()
+            self.timecode_display = None
+        
+        self.display_enabled = False
+        self.power.display_active = False
+        self.display_button.config(text="ACTIVER AFFICHAGE HDMI")
+        self.display_status_var.set("Désactivé")
     
-    # Création de l'interface
-    root = tk.Tk()
-    app = LTCInterface(root)
+    def update_hdmi_timecode(self, timecode):
+        """Met à jour le timecode sur l'affichage HDMI"""
+        if self.display_enabled and self.timecode_display:
+            self.timecode_display.update_timecode(timecode)
     
-    try:
-        root.mainloop()
-    except KeyboardInterrupt:
-        app.on_closing()
-
-if __name__ == "__main__":
-    main()
-
-        return re.match(pattern, timecode) is not None
-        """Valide le format du timecode HH:MM:SS:FF"""
-        pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])
-        """Valide le format du timecode HH:MM:SS:FF"""
-        pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])$'
-        return re.match(pattern, timecode) is not None
+    def update_hdmi_status(self, status):
+        """Met à jour le statut sur l'affichage HDMI et les affichages distants"""
+        if status == self.hdmi_status:
+            return
+        self.hdmi_status = status
+        if self.display_enabled and self.timecode_display:
+            self.timecode_display.update_status(status)
+        if self.remote:
+            self.engine.call(self.remote.set_status, status)
     
     def start_reading(self):
         """Démarre la lecture du LTC entrant"""
         if self.is_reading:
             return
         
+        self.is_reading = True
+        self.reader_status_var.set("En cours de lecture...")
+        self.reader_task = self.engine.submit(self.read_ltc_output())
+    
+    def choose_input_file(self):
+        """Lit un enregistrement WAV (ou PCM brut) plutôt que la carte son"""
+        path = filedialog.askopenfilename(
+            title="Fichier à lire",
+            filetypes=[("WAV", "*.wav *.bwf"), ("PCM brut 48 kHz", "*.raw *.pcm"),
+                       ("Tous les fichiers", "*")])
+        if path:
+            self.set_input_source(source=path)
+    
+    def set_input_source(self, event=None, source=None):
+        """Change la source lue (ou la relit depuis le début) : relance la lecture"""
+        source = source or self.input_source_var.get().strip() or 'alsa'
         try:
-            # Commande ltcdump pour lire le LTC
-            cmd = ['ltcdump', '-f', '-']
-            self.ltc_reader_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            self.is_reading = True
-            self.reader_status_var.set("En cours de lecture...")
-            
-            # Thread pour lire la sortie
-            threading.Thread(target=self.read_ltc_output, daemon=True).start()
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la lecture LTC:\n{e}")
-    
-    def read_ltc_output(self):
-        """Lit la sortie de ltcdump en continu"""
-        while self.is_reading and self.ltc_reader_process:
-            try:
-                line = self.ltc_reader_process.stdout.readline()
-                if line:
-                    # Extrait le timecode de la ligne (format peut varier)
-                    timecode_match = re.search(r'(\d{2}:\d{2}:\d{2}:\d{2})', line)
-                    if timecode_match:
-                        timecode = timecode_match.group(1)
-                        self.current_timecode = timecode
-                        # Mise à jour interface principale
-                        self.root.after(0, lambda tc=timecode: self.incoming_timecode_var.set(tc))
-                        self.root.after(0, lambda: self.reader_status_var.set("Signal LTC détecté"))
-                        # Mise à jour affichage HDMI
-                        self.root.after(0, lambda tc=timecode: self.update_hdmi_timecode(tc))
-                        self.root.after(0, lambda: self.update_hdmi_status("LECTURE LTC"))
-                else:
-                    time.sleep(0.1)
-            except Exception as e:
-                self.root.after(0, lambda: self.reader_status_var.set("Pas de signal LTC"))
-                self.root.after(0, lambda: self.update_hdmi_status("PAS DE SIGNAL"))
-                time.sleep(1)
-    
-    def stop_reading(self):
-        """Arrête la lecture du LTC"""
-        self.is_reading = False
-        if self.ltc_reader_process:
-            self.ltc_reader_process.terminate()
-            self.ltc_reader_process = None
-        self.reader_status_var.set("Arrêté")
-    
-    def generate_current_time(self):
-        """Génère un LTC avec l'heure actuelle"""
-        current_time = datetime.now()
-        timecode = current_time.strftime("%H:%M:%S:00")
-        self.start_generation(timecode)
+            make_source(source)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
+        self.input_source_var.set(source)
+        self.input_source = source
+        self.max_speed = self.max_speed_var.get()
+        self.state.update(input_source=source)
+        self.metrics.signal_lost()
+        self.stop_reading()
+        self.start_reading()
     
-    def generate_from_zero(self):
-        """Génère un LTC à partir de zéro"""
-        self.start_generation("00:00:00:00")
+    def toggle_input_filter(self):
+        """Active ou coupe le conditionnement, sans interrompre la lecture"""
+        self.input_filter = self.filter_stages if self.input_filter_var.get() else ''
+        self.state.update(input_filter=self.input_filter, filter_stages=self.filter_stages)
     
-    def generate_custom_timecode(self):
-        """Génère un LTC avec le timecode saisi"""
-        timecode = self.custom_timecode_var.get()
-        if not self.validate_timecode(timecode):
-            messagebox.showerror("Erreur", "Format de timecode invalide!\nUtilisez HH:MM:SS:FF")
+    def set_reader_rate(self, event=None):
+        """Change la cadence lue : relance la lecture, les cues et les conversions"""
+        rate = get_frame_rate(self.reader_rate_var.get())
+        if rate is self.frame_rate:
             return
-        self.start_generation(timecode)
-    
-    def start_generation(self, start_timecode):
-        """Démarre la génération LTC"""
-        self.stop_generation()  # Arrête toute génération en cours
-        
+        self.frame_rate = rate
+        self.metrics.frame_rate = rate
+        self.metrics.timecode = None    # Peut ne pas exister à la nouvelle cadence
+        self.metrics.signal_lost()
+        self.state.update(rate=rate.name)
+        if self.is_reading:
+            self.stop_reading()
+            self.start_reading()
+        if self.cue_engine and self.state.state.get('cue_list'):
+            self.load_cue_file(self.state.state['cue_list'])
+        for output in self.outputs:
+            if output.chasing and output.is_generating and not self.chase_pulses:
+                # La poursuite continue son timecode, calée sur la nouvelle cadence
+                output.start_chase(output.generator.output_timecode(), apply_offset=False)
+            elif output.converting and output.is_generating and not output.chasing:
+                output.start_conversion()
+    
+    async def read_ltc_output(self):
+        """Décode en continu la source d'entrée choisie (boucle du moteur)"""
+        metrics = self.metrics
+        power = self.power
         try:
-            # Commande ltcgen pour générer le LTC
-            cmd = ['ltcgen', '-f', '25', '-s', start_timecode, '-']
-            self.ltc_generator_process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            self.is_generating = True
-            self.generator_status_var.set(f"Génération depuis {start_timecode}")
-            
-            # Mise à jour de l'affichage HDMI pour la génération
-            self.update_hdmi_status(f"GÉNÉRATION: {start_timecode}")
-            
-            # Démarrer la simulation du timecode généré pour l'affichage
-            self.start_timecode_simulation(start_timecode)
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la génération LTC:\n{e}")
-    
-    def start_timecode_simulation(self, start_timecode):
-        """Simule l'affichage du timecode généré"""
-        if not self.is_generating:
+            source = make_source(self.input_source, not self.max_speed,
+                                 capture_rate=self.capture_rate)
+            await source.open()
+        except (OSError, ValueError) as e:
+            self.bridge.call(self.reading_failed, e)
             return
+        sample_rate = source.sample_rate
+        decoder = LTCDecoder(sample_rate, self.frame_rate)
+        for converter in self.converters.values():
+            converter.reset_input(sample_rate)
+        began = (time.monotonic(), time.process_time())
         
-        def simulate_timecode():
-            current = start_timecode
-            while self.is_generating:
+        last_frame_time = None
+        last_heard = time.monotonic()   # Dernière trame, ou début de la capture
+        last_post = 0.0
+        stages = conditioner = None
+        reopen_delay = None             # Source à rouvrir, après ce délai (s)
+        try:
+            while True:
                 try:
-                    # Convertir en secondes
-                    h, m, s, f = map(int, current.split(':'))
-                    total_frames = (h * 3600 + m * 60 + s) * 25 + f
-                    
-                    # Incrémenter d'une frame
-                    total_frames += 1
-                    
-                    # Reconvertir
-                    frames = total_frames % 25
-                    seconds = (total_frames // 25) % 60
-                    minutes = (total_frames // (25 * 60)) % 60
-                    hours = (total_frames // (25 * 60 * 60)) % 24
-                    
-                    current = f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
-                    
-                    # Mise à jour de l'affichage HDMI
-                    if self.display_enabled:
-                        self.root.after(0, lambda tc=current: self.update_hdmi_timecode(tc))
-                    
-                    time.sleep(1/25)  # 25 fps
-                    
-                except Exception:
-                    break
-        
-        # Lancer la simulation dans un thread séparé
-        threading.Thread(target=simulate_timecode, daemon=True).start()
-    
-    def stop_generation(self):
-        """Arrête la génération LTC"""
-        self.is_generating = False
-        if self.ltc_generator_process:
-            self.ltc_generator_process.terminate()
-            self.ltc_generator_process = None
-        self.generator_status_var.set("Arrêté")
-        self.update_hdmi_status("ARRÊT GÉNÉRATION")
-    
-    def on_closing(self):
-        """Nettoyage avant fermeture"""
-        self.stop_reading()
-        self.stop_generation()
-        self.close_hdmi_display()
-        self.root.destroy()
-
-def check_ltc_tools():
-    """Vérifie que ltc-tools est installé"""
-    try:
-        subprocess.run(['ltcdump', '--help'], capture_output=True)
-        subprocess.run(['ltcgen', '--help'], capture_output=True)
-        return True
-    except FileNotFoundError:
-        return False
-
-def main():
-    """Fonction principale"""
-    # Vérification des outils LTC
-    if not check_ltc_tools():
-        print("Erreur: ltc-tools n'est pas installé!")
-        print("Installez-le avec: sudo apt-get install ltc-tools")
-        return
-    
-    # Création de l'interface
-    root = tk.Tk()
-    app = LTCInterface(root)
-    
-    try:
-        root.mainloop()
-    except KeyboardInterrupt:
-        app.on_closing()
-
-if __name__ == "__main__":
-    main()
-
-        return re.match(pattern, timecode) is not None
-        """Valide le format du timecode HH:MM:SS:FF"""
-        pattern = r'^([0-1][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9]):([0-2][0-9])$'
-        return re.match(pattern, timecode) is not None
+                    if reopen_delay is not None:
+                        await source.open()
+                        reopen_delay = None
+                        last_heard = time.monotonic()
+                    if self.input_filter != stages:
+                        stages = self.input_filter
+                        conditioner = (InputConditioner(sample_rate, self.frame_rate,
+                                                        **parse_stages(stages))
+                                       if stages else None)
+                    period = (power.capture_period(time.monotonic() - last_heard)
+                              if isinstance(source, ArecordSource) else None)
+                    if period != source.period:
+                        # Passage au ralenti faute de signal, ou retour à la
+                        # période d'arecord dès qu'une trame est décodée. ALSA
+                        # ne change pas de période en cours de capture : arecord
+                        # est relancé, et le son qui passe pendant la relance
+                        # n'est pas capturé
+                        await source.close()
+                        source = ArecordSource(sample_rate, device=source.device,
+                                               period=period)
+                        decoder.reset()
+                        if conditioner:
+                            conditioner.reset()
+                        for converter in self.converters.values():
+                            converter.reset_input()
+                        metrics.capture_idle = period is not None
+                        await source.open()
+                    traced = TRACER.begin()
+                    read = source.read(period * 2 if period else READ_BLOCK_BYTES)
+                    if not source.may_stall:
+                        data = await read
+                    else:
+                        # Tube, entrée standard ou réseau : le producteur
+                        # peut se taire sans fermer le flux
+                        try:
+                            data = await asyncio.wait_for(read, SIGNAL_TIMEOUT)
+                        except asyncio.TimeoutError:
+                            if last_frame_time:
+                                last_frame_time = None
+                                self.reader_signal_lost()
+                            continue
+                    TRACER.end('capture', traced)
+                    if data:
+                        traced = TRACER.begin()
+                        started = time.perf_counter()
+                        if conditioner:
+                            data = conditioner.process(data)
+                        frames = decoder.decode(data)
+                        metrics.decode_latency.add((time.perf_counter() - started) * 1000)
+                        TRACER.end('decode', traced)
+                        traced = TRACER.begin()
+                        for frame in frames:
+                            metrics.observe_frame(frame)
+                        if self.converters:
+                            # Chaque bloc date l'échantillon 0 de la capture,
+                            # avec ou sans trame complète
+                            now = time.monotonic()
+                            for converter in list(self.converters.values()):
+                                converter.observe(decoder.samples_decoded, now)
+                                for frame in frames:
+                                    converter.feed(frame)
+                        remote = self.remote
+                        mtc = self.mtc if self.mtc_source in (MTC_AUTO, MTC_READER) else None
+                        if frames and (remote or mtc):
+                            # Trame en cours sur le fil : celle qui suit la
+                            # dernière décodée, à l'instant où celle-ci finit
+                            frame = frames[-1]
+                            rate = self.frame_rate
+                            number = timecode_to_frames(frame.timecode, rate.base,
+                                                        rate.drop_frame)
+                            position = number if frame.reverse else number + 1
+                            speed = -frame.speed if frame.reverse else frame.speed
+                            ended = time.monotonic() - (decoder.samples_decoded
+                                                        - frame.end_sample) / sample_rate
+                            if remote:
+                                remote.update(position, rate, speed, ended)
+                            if mtc:
+                                mtc.update(position, rate, speed, ended)
+                        if frames:
+                            # Dérive de la source lue : instant de fin de
+                            # chaque trame lue à 1x, comme pour les cues
+                            now = time.monotonic()
+                            rate = self.frame_rate
+                            for frame in frames:
+                                if frame.reverse or abs(frame.speed - 1) > SPEED_TOLERANCE:
+                                    continue
+                                number = timecode_to_frames(frame.timecode, rate.base,
+                                                            rate.drop_frame)
+                                self.drift.observe(
+                                    DRIFT_READER,
+                                    now - (decoder.samples_decoded - frame.end_sample) / sample_rate,
+                                    (number + 1) / rate.rate, 1 / rate.rate)
+                        cue_engine = self.cue_engine
+                        if frames and cue_engine:
+                            # Instant de fin de chaque trame, déduit de sa
+                            # position dans le flux capturé
+                            now = time.monotonic()
+                            for frame in frames:
+                                cue_engine.feed(frame, now - (decoder.samples_decoded
+                                                              - frame.end_sample) / sample_rate)
+                        if frames:
+                            # Seule la dernière trame du bloc compte pour
+                            # l'affichage, et seule la plus récente atteint Tk
+                            last_frame_time = last_heard = time.monotonic()
+                            self.current_timecode = frames[-1].timecode
+                            if last_frame_time - last_post >= power.display_interval():
+                                last_post = last_frame_time
+                                self.bridge.post('incoming', self.apply_incoming_frame,
+                                                 frames[-1], time.perf_counter())
+                            TRACER.end('dispatch', traced)
+                        elif last_frame_time and time.monotonic() - last_frame_time > SIGNAL_TIMEOUT:
+                            last_frame_time = None
+                            self.reader_signal_lost()
+                    elif source.finite:
+                        # Fin du fichier : la lecture s'arrête sur le débit obtenu
+                        self.reader_signal_lost(display=False)
+                        duration = decoder.samples_decoded / sample_rate
+                        elapsed = time.monotonic() - began[0]
+                        cpu = time.process_time() - began[1]
+                        self.bridge.call(
+                            self.reading_finished,
+                            f"Fin de {source} : {decoder.frames_decoded} trames, "
+                            f"{format_duration(duration)} lues en {elapsed:.1f} s "
+                            f"({duration / max(elapsed, 1e-9):.0f}x temps réel, "
+                            f"CPU {cpu:.1f} s)")
+                        return
+                    else:
+                        # arecord s'est arrêté (carte débranchée, xrun fatal) ou
+                        # le producteur du tube est parti : relance
+                        await source.close()
+                        await asyncio.sleep(1)
+                        last_heard = time.monotonic()
+                        metrics.backend_restarts += 1
+                        metrics.signal_lost()
+                        decoder.reset()
+                        if conditioner:
+                            conditioner.reset()
+                        for converter in self.converters.values():
+                            converter.reset_input()
+                        await source.open()
+                except (OSError, ValueError) as e:
+                    # Source fermée ou illisible : réouverture, de plus en
+                    # plus espacée tant qu'elle échoue
+                    reopen_delay = min(REOPEN_MAX_DELAY, (reopen_delay or 0.5) * 2)
+                    print(f"Lecture LTC ({source}) : {e} ; nouvel essai dans "
+                          f"{reopen_delay:.0f} s")
+                    self.bridge.post('incoming', self.show_no_signal)
+                    await source.close()
+                    await asyncio.sleep(reopen_delay)
+                    metrics.backend_restarts += 1
+                    metrics.signal_lost()
+                    decoder.reset()
+                    if conditioner:
+                        conditioner.reset()
+                    for converter in self.converters.values():
+                        converter.reset_input()
+        finally:
+            await source.close()
+    
+    def reader_signal_lost(self, display=True):
+        """Plus de trame lue : compteurs, sorties asservies figées (moteur)"""
+        self.metrics.signal_lost()
+        if self.remote:
+            self.remote.freeze()
+        if self.mtc and self.mtc_source in (MTC_AUTO, MTC_READER):
+            self.mtc.freeze()
+        if display:
+            self.bridge.post('incoming', self.show_no_signal)
+    
+    def reading_finished(self, summary):
+        """Source finie (fichier) lue jusqu'au bout"""
+        self.is_reading = False
+        self.reader_task = None
+        self.reader_status_var.set(summary)
+        print(summary)
     
-    def start_reading(self):
-        """Démarre la lecture du LTC entrant"""
-        if self.is_reading:
+    def reading_failed(self, error):
+        """La capture n'a pas pu démarrer"""
+        self.is_reading = False
+        self.reader_task = None
+        self.reader_status_var.set("Arrêté")
+        messagebox.showerror("Erreur", f"Impossible de démarrer la lecture LTC:\n{error}")
+    
+    def show_no_signal(self):
+        """Signal LTC perdu"""
+        self.reader_status_var.set("Pas de signal LTC")
+        self.update_hdmi_status("PAS DE SIGNAL")
+    
+    def apply_incoming_frame(self, frame, posted_at):
+        """Affiche la trame lue la plus récente, avec vitesse et sens"""
+        traced = TRACER.begin()
+        self.metrics.ui_latency.add((time.perf_counter() - posted_at) * 1000)
+        direction = "◀" if frame.reverse else "▶"
+        self.incoming_timecode_var.set(frame.timecode)
+        set_text(self.incoming_user_bits_var, f"UB: {frame.user_bits_text}")
+        set_text(self.reader_status_var, f"Signal LTC détecté  {direction} {frame.speed:.2f}x")
+        self.update_hdmi_timecode(frame.timecode)
+        if frame.reverse or abs(frame.speed - 1) > 0.02:
+            self.update_hdmi_status(f"LECTURE LTC {direction} {frame.speed:.2f}x")
+        else:
+            self.update_hdmi_status("LECTURE LTC")
+        TRACER.end('tk_callback', traced)
+    
+    def load_cue_list(self):
+        """Charge une liste de cues JSON et l'arme sur le timecode lu"""
+        path = filedialog.askopenfilename(
+            title="Liste de cues",
+            filetypes=[("Liste de cues", "*.json"), ("Tous les fichiers", "*")])
+        if path:
+            self.load_cue_file(path)
+    
+    def load_cue_file(self, path):
+        """Arme la liste de cues `path` en remplacement de la précédente"""
+        try:
+            cues = load_cues(path, self.frame_rate.name)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erreur", f"Liste de cues invalide : {e}")
             return
+        self.state.update(cue_list=path)
         
-        try:
-            # Commande ltcdump pour lire le LTC
-            cmd = ['ltcdump', '-f', '-']
-            self.ltc_reader_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            self.is_reading = True
-            self.reader_status_var.set("En cours de lecture...")
-            
-            # Thread pour lire la sortie
-            threading.Thread(target=self.read_ltc_output, daemon=True).start()
-            
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la lecture LTC:\n{e}")
+        # Nouveau moteur plutôt que rechargement : la boucle de lecture
+        # n'observe jamais un index à moitié construit
+        previous = self.cue_engine
+        self.cue_engine = CueEngine(cues, self.frame_rate.name).start()
+        if previous:
+            previous.stop()
+        else:
+            self.refresh_cue_status()
     
-    def read_ltc_output(self):
-        """Lit la sortie de ltcdump en continu"""
-        while self.is_reading and self.ltc_reader_process:
-            try:
-                line = self.ltc_reader_process.stdout.readline()
-                if line:
-                    # Extrait le timecode de la ligne (format peut varier)
-                    timecode_match = re.search(r'(\d{2}:\d{2}:\d{2}:\d{2})', line)
-                    if timecode_match:
-                        timecode = timecode_match.group(1)
-                        self.current_timecode = timecode
-                        # Mise à jour interface principale
-                        self.root.after(0, lambda tc=timecode: self.incoming_timecode_var.set(tc))
-                        self.root.after(0, lambda: self.reader_status_var.set("Signal LTC détecté"))
-                        # Mise à jour affichage HDMI
-                        self.root.after(0, lambda tc=timecode: self.update_hdmi_timecode(tc))
-                        self.root.after(0, lambda: self.update_hdmi_status("LECTURE LTC"))
-                else:
-                    time.sleep(0.1)
-            except Exception as e:
-                self.root.after(0, lambda: self.reader_status_var.set("Pas de signal LTC"))
-                self.root.after(0, lambda: self.update_hdmi_status("PAS DE SIGNAL"))
-                time.sleep(1)
+    def refresh_cue_status(self):
+        """Met à jour le compte rendu des cues (déclenchés, retard mesuré)"""
+        if self.cue_engine:
+            self.cue_status_var.set(self.cue_engine.summary())
+            self.root.after(1000, self.refresh_cue_status)
     
     def stop_reading(self):
         """Arrête la lecture du LTC"""
         self.is_reading = False
-        if self.ltc_reader_process:
-            self.ltc_reader_process.terminate()
-            self.ltc_reader_process = None
+        if self.reader_task:
+            self.reader_task.cancel()
+            self.reader_task = None
         self.reader_status_var.set("Arrêté")
     
-    def generate_current_time(self):
-        """Génère un LTC avec l'heure actuelle"""
-        current_time = datetime.now()
-        timecode = current_time.strftime("%H:%M:%S:00")
-        self.start_generation(timecode)
-    
-    def generate_from_zero(self):
-        """Génère un LTC à partir de zéro"""
-        self.start_generation("00:00:00:00")
+    def update_output_state(self, channel, **fields):
+        """Modifie l'état sauvegardé de la sortie `channel`"""
+        outputs = [dict(output) for output in self.state.state.get('outputs', [])]
+        outputs += [{} for _ in range(channel + 1 - len(outputs))]
+        outputs[channel].update(fields)
+        self.state.update(outputs=outputs)
     
-    def generate_custom_timecode(self):
-        """Génère un LTC avec le timecode saisi"""
-        timecode = self.custom_timecode_var.get()
-        if not self.validate_timecode(timecode):
-            messagebox.showerror("Erreur", "Format de timecode invalide!\nUtilisez HH:MM:SS:FF")
-            return
-        self.start_generation(timecode)
+    def select_display_output(self, channel):
+        """Sortie dont le timecode généré s'affiche sur l'écran HDMI"""
+        self.display_channel = channel
     
-    def start_generation(self, start_timecode):
-        """Démarre la génération LTC"""
-        self.stop_generation()  # Arrête toute génération en cours
-        
-        try:
-            # Commande ltcgen pour générer le LTC
-            cmd = ['ltcgen', '-f', '25', '-s', start_timecode, '-']
-            self.ltc_generator_process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+    def attach_output(self, channel, generator, restored=False, pressed=None):
+        """Branche un générateur sur son canal sans interrompre les autres
+
+        `pressed` : instant (monotone) de la demande, pour mesurer le délai
+        jusqu'à la première trame.
+        """
+        self.engine.call(self.attach_generator, channel, generator, restored,
+                         pressed=pressed)
+    
+    def attach_converter(self, channel, converter, restored=False):
+        """Branche sur son canal un générateur asservi au LTC lu"""
+        self.engine.call(self.attach_generator, channel, converter.generator,
+                         restored, converter)
+    
+    @property
+    def chase_label(self):
+        """Référence des poursuites, pour l'opérateur"""
+        return f"IMPULSIONS {self.chase_pulses}" if self.chase_pulses else "LTC LU"
+    
+    def make_chaser(self, generator, start):
+        """Asservissement d'une poursuite démarrant à la trame `start`"""
+        if self.chase_pulses:
+            return PulseChaser(generator, start, self.pulses_per_frame, self.convert_delay)
+        transform = RateTransform(self.frame_rate, generator.frame_rate)
+        return Converter(generator, transform, self.convert_delay, chase=start)
+    
+    def detach_output(self, channel):
+        """Rend un canal au silence"""
+        self.engine.call(self.detach_generator, channel)
+    
+    def attach_generator(self, channel, generator, restored, converter=None, pressed=None):
+        """Boucle du moteur : branche le générateur, lance aplay au besoin"""
+        self.pending_starts.pop(self.bank.generators[channel], None)
+        if pressed is not None:
+            self.pending_starts[generator] = pressed
+        self.converters.pop(channel, None)
+        self.pulse_chasers.pop(channel, None)
+        if isinstance(converter, PulseChaser):
+            self.pulse_chasers[channel] = converter
+            if self.pulse_task is None or self.pulse_task.done():
+                self.pulse_task = asyncio.ensure_future(self.read_pulses())
+        elif converter:
+            self.converters[channel] = converter
+        self.bank.attach(channel, generator)
+        if restored:
+            self.restored_generators.add(generator)
+        if self.output_task is None or self.output_task.done():
+            self.output_task = asyncio.ensure_future(self.write_ltc_output())
+    
+    def detach_generator(self, channel):
+        """Boucle du moteur : rend le canal au silence"""
+        self.pending_starts.pop(self.bank.generators[channel], None)
+        self.converters.pop(channel, None)
+        if self.pulse_chasers.pop(channel, None) and not self.pulse_chasers and self.pulse_task:
+            self.pulse_task.cancel()
+            self.pulse_task = None
+        self.bank.detach(channel)
+    
+    def set_preroll(self, channel, settings):
+        """Boucle du moteur : réglages d'une sortie, ses départs libres
+        pré-rendus aussitôt (l'heure du jour l'est par periodic_reports)"""
+        self.preroll_settings[channel] = settings
+        rate, starts, offset, user_bits, bgf = settings
+        for start in starts:
+            self.preroll.prepare(rate, start, user_bits, bgf)
+    
+    def output_wanted(self):
+        """Boucle du moteur : aplay reste ouvert SINK_LINGER secondes après
+        la dernière sortie, prêt pour le prochain départ (sauf en économie
+        d'énergie)"""
+        if self.bank.active:
+            self.output_idle_since = None
+            return True
+        if self.power.low_power:
+            return False
+        now = time.monotonic()
+        if self.output_idle_since is None:
+            self.output_idle_since = now
+        return now - self.output_idle_since < SINK_LINGER
+    
+    async def write_ltc_output(self):
+        """Joue les sorties actives sur aplay tant qu'au moins une génère"""
+        bank = self.bank
+        while self.output_wanted():
+            sink = AplaySink(SAMPLE_RATE, bank.channels, self.output_device)
+            try:
+                await sink.open()
+            except OSError as e:
+                for channel in range(bank.channels):
+                    self.detach_generator(channel)
+                self.bridge.call(self.generation_failed, e)
+                return
+            bank.reset()
+            bank.set_output_latency(sink.latency)
+            self.metrics.generator_sink = sink
+            try:
+                stopped = await self.play_outputs(sink)
+            finally:
+                self.metrics.generator_sink = None
+                await sink.close()
+            if stopped:
+                # aplay s'est arrêté (carte débranchée) : relance
+                await asyncio.sleep(1)
+    
+    async def play_outputs(self, sink):
+        """Rend et écrit les blocs multicanaux, cadencé par le tube
+
+        Retourne True si aplay s'est arrêté en cours de route.
+        """
+        bank = self.bank
+        last_report = 0
+        shown = None
+        while self.output_wanted():
+            traced = TRACER.begin()
+            chunk = bank.render()
+            TRACER.end('generator_render', traced)
+            traced = TRACER.begin()
+            try:
+                await sink.write(chunk)
+            except (ConnectionError, OSError):
+                return True
+            TRACER.end('sink_write', traced)
+            bank.written(bank.block)
+            
+            # Redémarrage à chaud : délai du lancement à la première trame sortie
+            for generator in list(self.restored_generators):
+                if generator.first_frame_sample is None:
+                    continue
+                output = generator.sample_output_time(generator.first_frame_sample)
+                uptime = process_uptime()
+                if output is not None and uptime is not None:
+                    self.restored_generators.clear()
+                    delay = uptime + output - time.monotonic()
+                    self.metrics.restart_to_output = delay
+                    print(f"Redémarrage à chaud : première trame sortie {delay * 1000:.0f} ms "
+                          f"après le lancement")
+                    break
             
-            self.is_generating = True
-            self.generator_status_var.set(f"Génération depuis {start_timecode}")
+            # Départ demandé : délais jusqu'à la file d'aplay, puis jusqu'à la
+            # sortie de la première trame
+            for channel, generator in enumerate(bank.generators):
+                pressed = self.pending_starts.get(generator)
+                if (pressed is None or generator.first_frame_sample is None
+                        or generator.samples_written <= generator.first_frame_sample):
+                    continue
+                del self.pending_starts[generator]
+                queued = time.monotonic() - pressed
+                output = generator.sample_output_time(generator.first_frame_sample)
+                output = None if output is None else output - pressed
+                self.metrics.start_queued.add(queued * 1000)
+                if output is not None:
+                    self.metrics.start_output.add(output * 1000)
+                self.bridge.post(('start_latency', channel),
+                                 self.outputs[channel].show_start_latency,
+                                 generator, queued, output, generator.preroll_hit)
             
-            # Mise à jour de l'affichage HDMI pour la génération
-            self.update_hdmi_status(f"GÉNÉRATION: {start_timecode}")
+            # Timecode en cours de sortie pour l'affichage HDMI
+            generator = bank.generators[self.display_channel]
+            if self.display_enabled and generator:
+                current = generator.output_timecode()
+                if current != shown:
+                    shown = current
+                    self.bridge.post('generated', self.show_generated_timecode,
+                                     generator, current)
             
-            # Démarrer la simulation du timecode généré pour l'affichage
-            self.start_timecode_simulation(start_timecode)
+            # Dérive de chaque sortie : position qui quitte la carte son
+            for channel, output in enumerate(bank.generators):
+                position = output.output_position() if output else None
+                if position:
+                    rate = output.frame_rate
+                    self.drift.observe(f"Sortie {channel + 1}", time.monotonic(),
+                                       position[0] / rate.rate, 1 / rate.rate)
             
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Impossible de démarrer la génération LTC:\n{e}")
+            # Affichages distants : le timecode généré faute de LTC lu
+            if self.remote and generator and not self.metrics.reader_locked:
+                position = generator.output_position()
+                if position:
+                    self.remote.update(position[0], generator.frame_rate)
+            
+            # MTC tiré de la sortie choisie, ou de celle affichée faute de LTC lu
+            source = self.mtc_source
+            if self.mtc and source != MTC_READER:
+                if source == MTC_AUTO:
+                    followed = None if self.metrics.reader_locked else generator
+                else:
+                    followed = bank.generators[int(source) - 1]
+                position = followed.output_position() if followed else None
+                if position:
+                    self.mtc.update(position[0], followed.frame_rate)
+            
+            # Écart à l'horloge de chaque sortie, une fois par seconde
+            # (toutes les cinq en économie d'énergie)
+            now = time.monotonic()
+            if now - last_report >= self.power.report_interval():
+                last_report = now
+                for channel, generator in enumerate(bank.generators):
+                    converter = self.converters.get(channel) or self.pulse_chasers.get(channel)
+                    if converter and converter.generator is generator:
+                        status = converter.status(now)
+                    elif generator is None or generator.offset_ms is None:
+                        continue
+                    else:
+                        label = "Heure du jour" if generator.time_of_day else "Reprise"
+                        status = (f"{label} {generator.output_timecode()} "
+                                  f"(écart {generator.offset_ms:+.1f} ms)")
+                    self.bridge.post(('generator_status', channel),
+                                     self.outputs[channel].show_status, generator, status)
+        return False
     
-    def start_timecode_simulation(self, start_timecode):
-        """Simule l'affichage du timecode généré"""
-        if not self.is_generating:
+    async def periodic_reports(self):
+        """Boucle du moteur : dérive et consommation, chaque seconde (cinq en économie)
+
+        Note l'horloge système pour l'analyse de dérive et pré-rend l'heure
+        du jour jusqu'au résumé suivant.
+        """
+        drift = self.drift
+        previous = None
+        while True:
+            now = time.monotonic()
+            drift.observe(CLOCK_SOURCE, now, system_seconds(), 1 / self.frame_rate.rate)
+            ahead = self.power.report_interval() + PREROLL_LEAD
+            for rate, starts, offset, user_bits, bgf in self.preroll_settings.values():
+                self.preroll.prepare_time_of_day(rate, self.bank.clock, ahead, offset,
+                                                 user_bits, bgf)
+            self.bridge.post('drift', self.show_drift, drift.summary(now),
+                             drift.curves(now, DRIFT_GRAPH_SPAN))
+            if self.mtc:
+                self.bridge.post('mtc', set_text, self.mtc_status_var, self.mtc.summary())
+            usage = (now, process_usage()[0], process_wakeups())
+            if previous:
+                elapsed = now - previous[0]
+                self.bridge.post('power', self.show_power,
+                                 (usage[1] - previous[1]) / elapsed * 100,
+                                 (usage[2] - previous[2]) / elapsed,
+                                 self.metrics.capture_idle)
+            previous = usage
+            await asyncio.sleep(self.power.report_interval())
+    
+    def show_drift(self, rows, curves):
+        """Affiche dérives, écarts à la référence et courbes des écarts"""
+        names = [row['source'] for row in rows]
+        if list(self.drift_reference['values']) != names and names:
+            self.drift_reference['values'] = names
+        lines = []
+        for row in rows:
+            if row['drift_ppm'] is None:
+                lines.append(f"{row['source']:<16} mesure en cours ({row['points']} points)")
+                continue
+            line = f"{row['source']:<16} {row['drift_ppm']:+8.2f} ppm"
+            if row['offset_ms'] is not None:
+                line += f"  écart {row['offset_ms']:+9.3f} ms"
+            if row['frame_in'] is not None:
+                line += f"  1 trame dans {format_duration(row['frame_in'])}"
+            elif row['source'] == self.drift.reference:
+                line += "  (référence)"
+            lines.append(line)
+        self.drift_text_var.set("\n".join(lines) or "En attente de mesures...")
+        
+        # Écart à la référence sur les dernières minutes, échelle symétrique
+        canvas = self.drift_canvas
+        canvas.delete('all')
+        width, height = DRIFT_GRAPH_SIZE
+        values = [offset for points in curves.values() for _, offset in points]
+        scale = max([1.0] + [abs(value) for value in values])
+        middle = height / 2
+        canvas.create_line(0, middle, width, middle, fill='gray')
+        for index, (name, points) in enumerate(curves.items()):
+            color = DRIFT_COLORS[index % len(DRIFT_COLORS)]
+            if len(points) >= 2:
+                canvas.create_line(
+                    *[coordinate for seconds, offset in points for coordinate in
+                      (width * (1 + seconds / DRIFT_GRAPH_SPAN),
+                       middle - offset / scale * (middle - 4))],
+                    fill=color)
+            canvas.create_text(width - 4, 4 + 12 * index, anchor=tk.NE, text=name,
+                               fill=color, font=('Arial', 8))
+        canvas.create_text(4, 4, anchor=tk.NW, fill='white', font=('Arial', 8),
+                           text=f"±{scale:.1f} ms, {DRIFT_GRAPH_SPAN // 60} min")
+    
+    def set_drift_reference(self, event=None):
+        """Source par rapport à laquelle écarts et dérives relatives sont donnés"""
+        reference = self.drift_reference_var.get()
+        self.engine.call(setattr, self.drift, 'reference', reference)
+        self.state.update(drift_reference=reference)
+    
+    def export_drift(self):
+        """Exporte l'historique de dérive de toutes les sources en CSV"""
+        path = filedialog.asksaveasfilename(
+            title="Export de la dérive", defaultextension='.csv',
+            filetypes=[("CSV", "*.csv"), ("Tous les fichiers", "*")])
+        if not path:
             return
         
-        def simulate_timecode():
-            current = start_timecode
-            while self.is_generating:
-                try:
-                    # Convertir en secondes
-                    h, m, s, f = map(int, current.split(':'))
-                    total_frames = (h * 3600 + m * 60 + s) * 25 + f
-                    
-                    # Incrémenter d'une frame
-                    total_frames += 1
-                    
-                    # Reconvertir
-                    frames = total_frames % 25
-                    seconds = (total_frames // 25) % 60
-                    minutes = (total_frames // (25 * 60)) % 60
-                    hours = (total_frames // (25 * 60 * 60)) % 24
-                    
-                    current = f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
-                    
-                    # Mise à jour de l'affichage HDMI
-                    if self.display_enabled:
-                        self.root.after(0, lambda tc=current: self.update_hdmi_timecode(tc))
-                    
-                    time.sleep(1/25)  # 25 fps
-                    
-                except Exception:
-                    break
+        async def copy():
+            return self.drift.copy()
         
-        # Lancer la simulation dans un thread séparé
-        threading.Thread(target=simulate_timecode, daemon=True).start()
+        # Copie prise dans la boucle du moteur, fichier écrit hors de celle-ci
+        snapshot = self.engine.submit(copy()).result()
+        try:
+            snapshot.export_csv(path)
+        except OSError as e:
+            messagebox.showerror("Erreur", f"Export impossible :\n{e}")
+            return
+        messagebox.showinfo("Export", f"Historique de dérive écrit dans :\n{path}")
     
-    def stop_generation(self):
-        """Arrête la génération LTC"""
-        self.is_generating = False
-        if self.ltc_generator_process:
-            self.ltc_generator_process.terminate()
-            self.ltc_generator_process = None
-        self.generator_status_var.set("Arrêté")
-        self.update_hdmi_status("ARRÊT GÉNÉRATION")
+    async def read_pulses(self):
+        """Capture le train d'impulsions des poursuites (boucle du moteur)"""
+        source = None
+        try:
+            while self.pulse_chasers:
+                if source is None:
+                    source = (PipeSource(self.chase_pulses) if os.path.exists(self.chase_pulses)
+                              else ArecordSource(SAMPLE_RATE, device=self.chase_pulses))
+                    try:
+                        await source.open()
+                    except OSError as e:
+                        self.bridge.call(self.pulses_failed, e)
+                        return
+                    for chaser in self.pulse_chasers.values():
+                        chaser.reset_input()
+                data = await source.read(READ_BLOCK_BYTES)
+                if not data:
+                    # Source arrêtée (carte débranchée, producteur du tube
+                    # parti) : relance, les sorties continuent en roue libre
+                    await source.close()
+                    source = None
+                    await asyncio.sleep(1)
+                    continue
+                now = time.monotonic()
+                for chaser in list(self.pulse_chasers.values()):
+                    chaser.feed_samples(data, now)
+        finally:
+            if source:
+                await source.close()
+    
+    def pulses_failed(self, error):
+        """La capture des impulsions n'a pas pu démarrer : les poursuites s'arrêtent"""
+        for output in self.outputs:
+            if output.chasing and output.generator:
+                output.stop_generation(persist=False)
+        messagebox.showerror("Erreur", f"Impossible de capturer les impulsions:\n{error}")
+    
+    def generation_failed(self, error):
+        """aplay n'a pas pu démarrer : toutes les sorties s'arrêtent"""
+        for output in self.outputs:
+            if output.generator:
+                output.stop_generation(persist=False)
+        messagebox.showerror("Erreur", f"Impossible de démarrer la génération LTC:\n{error}")
+    
+    def show_generated_timecode(self, generator, timecode):
+        """Affiche sur l'écran HDMI le timecode en cours de sortie"""
+        if generator is self.outputs[self.display_channel].generator:
+            self.update_hdmi_timecode(timecode)
     
     def on_closing(self):
         """Nettoyage avant fermeture"""
         self.stop_reading()
-        self.stop_generation()
+        for output in self.outputs:
+            output.stop_generation()
+        if self.cue_engine:
+            self.cue_engine.stop()
+        if self.metrics_server:
+            self.engine.submit(self.metrics_server.close())
+        if self.remote:
+            self.engine.submit(self.remote.close())
+        
+        # Annule les tâches restantes et attend la fin d'arecord/aplay
+        self.engine.stop()
+        if self.mtc:
+            self.mtc.stop()
+        self.bridge.close()
+        if TRACER.enabled:
+            self.toggle_trace()
+        self.state.save(force=True)
         self.close_hdmi_display()
         self.root.destroy()
 
-def check_ltc_tools():
-    """Vérifie que ltc-tools est installé"""
+def set_text(var, text):
+    """Change une variable Tk seulement si le texte change : pas de redessin inutile"""
+    if var.get() != text:
+        var.set(text)
+
+def format_duration(seconds):
+    """Durée lisible : 45 s, 12 min, 3.5 h, 6 j"""
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.0f} j"
+
+def check_audio_tools():
+    """Vérifie que alsa-utils (arecord/aplay) est installé"""
     try:
-        subprocess.run(['ltcdump', '--help'], capture_output=True)
-        subprocess.run(['ltcgen', '--help'], capture_output=True)
+        subprocess.run(['arecord', '--version'], capture_output=True)
+        subprocess.run(['aplay', '--version'], capture_output=True)
         return True
     except FileNotFoundError:
         return False
 
 def main():
     """Fonction principale"""
-    # Vérification des outils LTC
-    if not check_ltc_tools():
-        print("Erreur: ltc-tools n'est pas installé!")
-        print("Installez-le avec: sudo apt-get install ltc-tools")
+    parser = argparse.ArgumentParser(description="Interface LTC Reader/Generator")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="Sert les métriques HTTP (/metrics, /metrics.json) sur ce port")
+    parser.add_argument('--trace', nargs='?', const=TRACE_PATH, metavar='FICHIER',
+                        help="Trace le pipeline dès le lancement (JSON Chrome/Perfetto)")
+    parser.add_argument('--outputs', type=int, metavar='N',
+                        help="Nombre de sorties LTC indépendantes, une par canal "
+                             "(défaut : comme à la dernière exécution, sinon 1)")
+    parser.add_argument('--output-device', metavar='PCM',
+                        help="Périphérique ALSA de sortie (aplay -D), assez de canaux "
+                             "pour toutes les sorties")
+    parser.add_argument('--remote-port', type=int, metavar='PORT',
+                        help="Sert l'affichage du timecode aux tablettes et téléphones "
+                             "(http://<pi>:PORT/)")
+    parser.add_argument('--convert-delay', type=float, default=0.0, metavar='S',
+                        help="Retard voulu des sorties converties sur le LTC lu (s) : "
+                             "au-delà de la latence de sortie (~0,2 s), les sauts "
+                             "sont reproduits à la trame près")
+    parser.add_argument('--chase-pulses', metavar='SOURCE',
+                        help="Référence des poursuites : train d'impulsions capturé sur ce "
+                             "périphérique ALSA (hw:2) ou lu dans ce tube nommé (PCM "
+                             "S16_LE mono 48 kHz), au lieu du LTC lu")
+    parser.add_argument('--pulses-per-frame', type=int, default=1, metavar='N',
+                        help="Impulsions par trame de la référence (défaut : 1)")
+    parser.add_argument('--input-filter', metavar='ÉTAGES',
+                        help="Conditionnement du signal lu avant décodage, parmi dc, band, "
+                             "agc, hum50, hum60 (ex. dc,band,agc,hum50 ; off pour le "
+                             "couper) ; défaut : comme à la dernière exécution")
+    parser.add_argument('--input', metavar='SOURCE',
+                        help="Source lue : alsa[:PÉRIPHÉRIQUE] (arecord), - (entrée "
+                             "standard), udp:[HÔTE:]PORT ou rtp:[HÔTE:]PORT (PCM S16 mono "
+                             "48 kHz), tube nommé, ou fichier WAV/brut ; défaut : comme à "
+                             "la dernière exécution, sinon alsa")
+    parser.add_argument('--capture-rate', type=int, choices=CAPTURE_RATES, metavar='HZ',
+                        help="Fréquence de capture d'arecord, 48000 ou 96000 (shuttle "
+                             "décodé jusqu'à 10x au lieu de 8x) ; défaut : comme à la "
+                             "dernière exécution, sinon 48000")
+    parser.add_argument('--max-speed', action='store_true',
+                        help="Lit un fichier aussi vite que possible (mesures), débit "
+                             "affiché à la fin")
+    parser.add_argument('--mtc', metavar='SORTIE',
+                        help="Émet du MIDI Timecode : port MIDI brut (/dev/snd/midiC1D0), "
+                             "séquenceur ALSA (seq:128:0, via snd-virmidi) ou udp:HÔTE:PORT")
+    parser.add_argument('--mtc-source', metavar='SOURCE',
+                        help="Timecode suivi par le MTC : auto (LTC lu, sinon la sortie "
+                             "affichée), reader, ou numéro de sortie ; défaut : comme à "
+                             "la dernière exécution")
+    parser.add_argument('--low-power', action='store_true', default=None,
+                        help="Économie d'énergie (installations sur batterie) : "
+                             "rafraîchissements espacés, capture au ralenti sans signal")
+    parser.add_argument('--refresh-displays', action='store_true',
+                        help="Relit la disposition des écrans (xrandr) au lieu de celle "
+                             "gardée en cache, après une reconfiguration manuelle")
+    args = parser.parse_args()
+    if args.input_filter is not None:
+        try:
+            parse_stages(args.input_filter)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.input_filter.strip().lower() == 'off':
+            args.input_filter = ''
+    if args.input is not None:
+        try:
+            make_source(args.input)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.mtc is not None:
+        try:
+            make_sink(args.mtc)
+        except ValueError as e:
+            parser.error(str(e))
+    if (args.mtc_source is not None and args.mtc_source not in MTC_LABELS
+            and not args.mtc_source.isdigit()):
+        parser.error(f"source MTC inconnue : {args.mtc_source}")
+    
+    # Vérification des outils audio
+    if not check_audio_tools():
+        print("Erreur: alsa-utils n'est pas installé!")
+        print("Installez-le avec: sudo apt-get install alsa-utils")
         return
     
     # Création de l'interface
     root = tk.Tk()
-    app = LTCInterface(root)
+    app = LTCInterface(root, metrics_port=args.metrics_port, trace_path=args.trace,
+                       outputs=args.outputs, output_device=args.output_device,
+                       convert_delay=args.convert_delay, remote_port=args.remote_port,
+                       low_power=args.low_power, chase_pulses=args.chase_pulses,
+                       pulses_per_frame=args.pulses_per_frame,
+                       input_filter=args.input_filter, mtc=args.mtc,
+                       mtc_source=args.mtc_source, input_source=args.input,
+                       max_speed=args.max_speed, refresh_displays=args.refresh_displays,
+                       capture_rate=args.capture_rate)
     
     try:
         root.mainloop()
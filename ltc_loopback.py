@@ -0,0 +1,1979 @@
+#!/usr/bin/env python3
+"""
+Banc de test en boucle locale pour le LTC
+Générateur → canal simulé → décodeur, sans carte son et plus vite que le temps réel
+"""
+
+import argparse
+import asyncio
+import base64
+import bisect
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import wave
+from array import array
+
+import numpy as np
+
+from ltc_audio import ALSA_BUFFER, ALSA_PERIOD, FileSource, PipeSource, UDPSource
+from ltc_condition import DEFAULT_STAGES, InputConditioner, parse_stages
+from ltc_codec import (SAMPLE_RATE, LTCDecoder, LTCEncoder, LTCFrame,
+                       frames_per_day, frames_to_timecode, get_frame_rate,
+                       timecode_to_frames)
+from ltc_convert import (PULSE_THRESHOLD, Converter, PulseChaser, RateTransform,
+                         parse_offset)
+from ltc_display import (DisplayLayout, connector_key, parse_xrandr, profile_for,
+                         secondary_monitor)
+from ltc_drift import DriftAnalyzer
+from ltc_generator import BANK_BLOCK, EPOCH_WINDOW, GeneratorBank, LTCGenerator, PrerollCache
+from ltc_metrics import thread_wakeups
+from ltc_mtc import MTCOutput, UDPSink
+from ltc_power import IDLE_AFTER, IDLE_PERIOD, PowerPolicy
+from ltc_remote import RemoteDisplayServer
+from ltc_stripe import stripe
+from ltc_wav import BEXT_TIME_REFERENCE, WavLayout
+
+
+class Channel:
+    """Canal audio simulé : gain, bruit, filtrage, dérive d'horloge, inversion,
+    pertes, tension continue et ronflette secteur"""
+
+    def __init__(self, gain=1.0, noise=0.0, lowpass=None, highpass=None,
+                 rate_ratio=1.0, invert=False, drop_rate=0.0, dc=0.0, hum=0.0,
+                 hum_frequency=50.0, sample_rate=SAMPLE_RATE, seed=None):
+        self.gain = -gain if invert else gain
+        self.noise = noise * 32767
+        self.dc = dc * 32767
+        self.hum = hum * 32767
+        self.hum_step = 2 * np.pi * hum_frequency / sample_rate
+        self._hum_phase = 0.0
+        self.rate_ratio = rate_ratio
+        self.drop_rate = drop_rate
+        self.blocks_dropped = 0
+        self.rng = np.random.default_rng(seed)
+
+        # Passe-bas : FIR en sinus cardinal fenêtré
+        self._lowpass = None
+        if lowpass:
+            taps = np.arange(63) - 31
+            kernel = np.sinc(2 * lowpass / sample_rate * taps) * np.hamming(63)
+            self._lowpass = kernel / kernel.sum()
+            self._lowpass_tail = np.zeros(62)
+
+        # Passe-haut : soustraction d'une moyenne glissante (couplage AC)
+        self._highpass = int(sample_rate / highpass) if highpass else 0
+        if self._highpass:
+            self._highpass_history = np.zeros(self._highpass)
+
+        # Rééchantillonnage linéaire pour simuler un écart d'horloge
+        self._resample_next = 0.0
+        self._resample_prev = 0.0
+
+    def process(self, block):
+        """Traverse le canal ; retourne un bloc int16, éventuellement vide"""
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.blocks_dropped += 1
+            return np.zeros(0, dtype=np.int16)
+
+        x = block.astype(np.float64) * self.gain
+
+        if self._lowpass is not None:
+            padded = np.concatenate((self._lowpass_tail, x))
+            self._lowpass_tail = padded[-62:]
+            x = np.convolve(padded, self._lowpass, mode='valid')
+
+        if self._highpass:
+            padded = np.concatenate((self._highpass_history, x))
+            sums = np.cumsum(padded)
+            length = self._highpass
+            mean = (sums[length:] - sums[:-length]) / length
+            self._highpass_history = padded[-length:]
+            x = x - mean
+
+        if self.rate_ratio != 1.0:
+            x = self._resample(x)
+
+        if self.noise:
+            x = x + self.rng.normal(0.0, self.noise, len(x))
+
+        if self.hum:
+            # Ronflette : fondamentale et harmonique 3 (transformateur saturé)
+            phase = self._hum_phase + self.hum_step * np.arange(len(x))
+            self._hum_phase = (phase[-1] + self.hum_step) % (2 * np.pi) if len(x) else 0.0
+            x = x + self.hum * (np.sin(phase) + 0.3 * np.sin(3 * phase))
+
+        x = x + self.dc
+        return np.clip(x, -32768, 32767).astype(np.int16)
+
+    def _resample(self, x):
+        """Interpolation linéaire en continuité avec le bloc précédent"""
+        extended = np.concatenate(([self._resample_prev], x))
+        step = 1.0 / self.rate_ratio
+        positions = np.arange(self._resample_next, len(x), step)
+        if len(positions):
+            self._resample_next = positions[-1] + step - len(x)
+        else:
+            self._resample_next -= len(x)
+        self._resample_prev = x[-1]
+        return np.interp(positions, np.arange(len(extended)), extended)
+
+
+class LoopbackReport:
+    """Résultat d'un passage en boucle locale"""
+
+    def __init__(self):
+        self.frames_sent = 0
+        self.frames_ok = 0
+        self.frames_wrong = 0
+        self.blocks_dropped = 0
+        self.latencies_ms = []
+        self.audio_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    @property
+    def accuracy(self):
+        return self.frames_ok / self.frames_sent if self.frames_sent else 0.0
+
+    def latency_percentile(self, percent):
+        if not self.latencies_ms:
+            return float('nan')
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def summary(self):
+        """Résumé lisible du passage"""
+        speedup = self.audio_seconds / self.wall_seconds if self.wall_seconds else 0
+        return "\n".join([
+            f"Trames générées      : {self.frames_sent}",
+            f"Trames décodées      : {self.frames_ok} ({self.accuracy * 100:.3f} %)",
+            f"Trames erronées      : {self.frames_wrong}",
+            f"Blocs perdus         : {self.blocks_dropped}",
+            f"Latence (fin de trame → décodage) : "
+            f"médiane {self.latency_percentile(50):.1f} ms, "
+            f"p99 {self.latency_percentile(99):.1f} ms, "
+            f"max {self.latency_percentile(100):.1f} ms",
+            f"Durée simulée        : {self.audio_seconds:.1f} s en "
+            f"{self.wall_seconds:.2f} s ({speedup:.0f}x temps réel)",
+        ])
+
+
+class LoopbackHarness:
+    """Relie l'encodeur au décodeur à travers un canal simulé"""
+
+    def __init__(self, fps='25', start_timecode="00:00:00:00",
+                 sample_rate=SAMPLE_RATE, block_size=1024, channel=None,
+                 conditioner=None):
+        self.frame_rate = get_frame_rate(fps)
+        self.start_timecode = start_timecode
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.channel = channel or Channel(sample_rate=sample_rate)
+        self.conditioner = conditioner  # InputConditioner avant le décodeur
+
+    def run(self, duration):
+        """Génère `duration` secondes de timecode et mesure le décodage"""
+        rate = self.frame_rate
+        encoder = LTCEncoder(self.sample_rate, rate)
+        decoder = LTCDecoder(self.sample_rate, rate)
+        report = LoopbackReport()
+
+        start = timecode_to_frames(self.start_timecode, rate.base, rate.drop_frame)
+        per_day = frames_per_day(rate.base, rate.drop_frame)
+        total = int(duration * rate.rate)
+        samples_per_frame = encoder.samples_per_frame
+        self._last_index = -1
+
+        began = time.perf_counter()
+        buffer = array('h')
+        sent = 0
+        # Une trame de plus que mesuré : la dernière se termine sur la transition suivante
+        for index in range(total + 1):
+            tc = frames_to_timecode(start + index, rate.base, rate.drop_frame)
+            buffer.extend(encoder.encode_frame(
+                LTCFrame.from_timecode(tc, rate.drop_frame)))
+            while len(buffer) >= self.block_size:
+                block = np.frombuffer(buffer[:self.block_size], dtype=np.int16)
+                del buffer[:self.block_size]
+                sent += self.block_size
+                self._feed(decoder, block, sent, start, per_day, total,
+                           samples_per_frame, report)
+        if buffer:
+            sent += len(buffer)
+            self._feed(decoder, np.frombuffer(buffer, dtype=np.int16), sent,
+                       start, per_day, total, samples_per_frame, report)
+
+        report.wall_seconds = time.perf_counter() - began
+        report.frames_sent = total
+        report.audio_seconds = sent / self.sample_rate
+        report.blocks_dropped = self.channel.blocks_dropped
+        return report
+
+    def _feed(self, decoder, block, sent, start, per_day, total,
+              samples_per_frame, report):
+        """Fait passer un bloc dans le canal puis le décodeur"""
+        received = self.channel.process(block)
+        if self.conditioner:
+            received = self.conditioner.process(received)
+        if not len(received):
+            return
+        rate = self.frame_rate
+        for frame in decoder.decode(received):
+            number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+            index = (number - start) % per_day
+            if index == total:
+                continue
+            if index > total or index <= self._last_index:
+                report.frames_wrong += 1
+                continue
+            self._last_index = index
+            report.frames_ok += 1
+            frame_end = (index + 1) * samples_per_frame
+            report.latencies_ms.append((sent - frame_end) * 1000 / self.sample_rate)
+
+
+# Corpus dégradé du conditionnement d'entrée : (libellé, réglages du canal),
+# LTC à -6 dB pleine échelle avant le canal
+CONDITIONING_CORPUS = (
+    ("Propre", {}),
+    ("Faible (-52 dB), bruité", dict(gain=0.005, noise=0.0015)),
+    ("Tension continue", dict(gain=0.2, dc=0.3)),
+    ("Ronflette 50 Hz", dict(gain=0.1, hum=0.3)),
+    ("Bande 300 Hz - 3 kHz, bruit", dict(lowpass=3000, highpass=300, noise=0.1)),
+    ("Long câble", dict(gain=0.03, lowpass=2500, noise=0.004, hum=0.05, dc=0.02)),
+)
+
+
+def conditioning_run(duration=60.0, fps='25', stages=(DEFAULT_STAGES,),
+                     sample_rate=SAMPLE_RATE, block=1024, seed=None):
+    """Taux de décodage du corpus dégradé, sans puis avec conditionnement
+
+    Retourne, par situation : (libellé, taux brut, taux avec chacune des
+    chaînes `stages`) et le coût par bloc (µs) de la dernière chaîne.
+    """
+    results = []
+    cost = []
+    for label, settings in CONDITIONING_CORPUS:
+        rates = []
+        conditioners = [InputConditioner(sample_rate, fps, **parse_stages(text))
+                        for text in stages]
+        for conditioner in [None] + conditioners:
+            channel = Channel(sample_rate=sample_rate, seed=seed, **settings)
+            harness = LoopbackHarness(fps, "01:00:00:00", sample_rate, block, channel,
+                                      conditioner)
+            report = harness.run(duration)
+            rates.append(report.accuracy)
+        results.append((label, *rates))
+
+        # Coût seul, sur le même canal
+        channel = Channel(sample_rate=sample_rate, seed=seed, **settings)
+        conditioner = InputConditioner(sample_rate, fps, **parse_stages(stages[-1]))
+        blocks = [channel.process(np.zeros(block, dtype=np.int16)) for _ in range(50)]
+        began = time.perf_counter()
+        for received in blocks:
+            conditioner.process(received)
+        cost.append((time.perf_counter() - began) / len(blocks) * 1e6)
+    return results, float(np.median(cost))
+
+
+# Vitesses testées par défaut ; au-delà de 8x il faut capturer à 96 kHz
+# Balayage par défaut : jusqu'à ±8x à 48 kHz, ±10x seulement à 96 kHz
+# (--capture-rate 96000 du lecteur) ; échec sous SWEEP_MIN_ACCURACY
+DEFAULT_SPEEDS = (-8, -4, -2, -1, -0.5, -0.1, 0.1, 0.25, 0.5, 1, 1.5, 2, 4, 8)
+FAST_SPEEDS = (-10, 10)
+FAST_SAMPLE_RATE = 96000
+SWEEP_MIN_ACCURACY = 0.9
+
+
+def render_wav(path, speed=1.0, duration=4.0, fps='25',
+               start_timecode="01:00:00:00", sample_rate=SAMPLE_RATE,
+               end_speed=None):
+    """Écrit un WAV de LTC défilant à `speed` (négatif = en arrière)
+
+    Avec `end_speed`, la vitesse varie linéairement trame après trame
+    (rampe de shuttle). Retourne le nombre de trames mesurables.
+    """
+    rate = get_frame_rate(fps)
+    encoder = LTCEncoder(sample_rate, rate)
+    start = timecode_to_frames(start_timecode, rate.base, rate.drop_frame)
+    total = int(duration * rate.rate)
+    if end_speed is None:
+        end_speed = speed
+
+    # Une trame de garde de chaque côté fournit les transitions de clôture
+    pcm = array('h')
+    for index in range(-1, total + 1):
+        progress = min(max(index, 0), total - 1) / max(1, total - 1)
+        encoder.set_speed(abs(speed + (end_speed - speed) * progress))
+        tc = frames_to_timecode(start + index, rate.base, rate.drop_frame)
+        pcm.extend(encoder.encode_frame(LTCFrame.from_timecode(tc, rate.drop_frame)))
+    if speed < 0:
+        pcm.reverse()
+
+    with wave.open(path, 'wb') as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(sample_rate)
+        output.writeframes(pcm.tobytes())
+    return total
+
+
+def decode_wav(path, fps='25', block_size=1024):
+    """Décode un WAV mono 16 bits et retourne les trames lues"""
+    frames = []
+    with wave.open(path, 'rb') as source:
+        decoder = LTCDecoder(source.getframerate(), fps)
+        while True:
+            data = source.readframes(block_size)
+            if not data:
+                break
+            frames.extend(decoder.decode(data))
+    return frames
+
+
+def speed_sweep(speeds, fps='25', sample_rate=SAMPLE_RATE, duration=4.0,
+                directory=None, start_timecode="01:00:00:00"):
+    """Mesure le décodage de WAV synthétiques à plusieurs vitesses
+
+    Chaque vitesse est un nombre, ou un couple (début, fin) pour une rampe.
+    Retourne des tuples (libellé, trames, correctes, erreur de vitesse moyenne).
+    """
+    rate = get_frame_rate(fps)
+    start = timecode_to_frames(start_timecode, rate.base, rate.drop_frame)
+    per_day = frames_per_day(rate.base, rate.drop_frame)
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for speed in speeds:
+            first, last = speed if isinstance(speed, tuple) else (speed, speed)
+            label = f"{first:+g}x" if first == last else f"{first:+g}x→{last:+g}x"
+            path = os.path.join(directory or scratch, f"ltc_{label}.wav")
+            total = render_wav(path, first, duration, rate, start_timecode,
+                               sample_rate, last)
+
+            correct = 0
+            previous = None
+            errors = []
+            for frame in decode_wav(path, rate):
+                number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+                index = (number - start) % per_day
+                if index >= total or frame.reverse != (first < 0):
+                    continue
+                # Les trames doivent se suivre dans le sens de défilement
+                if previous is not None and (index <= previous) != (first < 0):
+                    continue
+                previous = index
+                correct += 1
+                progress = index / max(1, total - 1)
+                expected = abs(first + (last - first) * progress)
+                errors.append(abs(frame.speed - expected) / expected)
+
+            error = sum(errors) / len(errors) if errors else float('nan')
+            results.append((label, total, correct, error))
+    return results
+
+
+class SimulatedClock:
+    """Horloge injectable : temps monotone piloté par la simulation,
+    CLOCK_REALTIME avec sauts et glissements programmables"""
+
+    def __init__(self, realtime=43200.37, utc_offset=0):
+        self.mono = 1000.0
+        self.real_offset = realtime - self.mono
+        self.slew_ppm = 0.0
+        self._utc_offset = utc_offset
+
+    def advance(self, seconds):
+        self.mono += seconds
+        self.real_offset += seconds * self.slew_ppm * 1e-6
+
+    def step(self, seconds):
+        self.real_offset += seconds
+
+    def realtime(self):
+        return self.mono + self.real_offset
+
+    def monotonic(self):
+        return self.mono
+
+    def utc_offset(self, realtime):
+        return self._utc_offset
+
+
+def time_of_day_run(duration=600.0, fps='25', sample_rate=SAMPLE_RATE,
+                    steps=(), slew_ppm=0.0, audio_drift_ppm=20.0,
+                    jitter_ms=2.0, latency_error_ms=0.0, seed=None,
+                    resume_after=None):
+    """Simule la génération heure du jour face à une horloge système agitée
+
+    La sortie audio simulée consomme les échantillons à sa propre cadence
+    (dérive du quartz de la carte son) et rend la main à l'écriture avec une
+    gigue aléatoire. Le flux produit est décodé : l'écart vrai entre la
+    sortie de chaque trame et l'heure système qu'elle annonce est mesuré.
+    Avec `resume_after`, simule plutôt la reprise d'un timecode libre
+    sauvegardé `resume_after` secondes plus tôt (redémarrage à chaud).
+    Retourne (écarts vrais en ms, écarts annoncés en ms, générateur).
+    """
+    rng = np.random.default_rng(seed)
+    rate = get_frame_rate(fps)
+    clock = SimulatedClock()
+    queued = int(0.12 * sample_rate)      # Tube + tampon ALSA simulés
+    audio_rate = sample_rate * (1 + audio_drift_ppm * 1e-6)
+    generator = LTCGenerator(rate, sample_rate, clock,
+                             queued / sample_rate + latency_error_ms / 1000)
+    if resume_after is None:
+        generator.start_time_of_day()
+    else:
+        # Position sauvegardée : 10:00:00:00 sortait il y a `resume_after` s
+        saved = timecode_to_frames("10:00:00:00", rate.base, rate.drop_frame)
+        anchor = clock.monotonic() - resume_after
+        generator.resume(saved, clock.realtime() - resume_after)
+    decoder = LTCDecoder(sample_rate, rate)
+
+    pending_steps = sorted(steps)
+    epoch = clock.monotonic() + 0.05      # Début réel de la lecture
+    settle_until = clock.monotonic() + 3.0
+    end = clock.monotonic() + duration
+    true_offsets = []
+    reported = []
+    while clock.monotonic() < end:
+        elapsed = clock.monotonic() - (end - duration)
+        clock.slew_ppm = slew_ppm if duration / 3 < elapsed < 2 * duration / 3 else 0.0
+        while pending_steps and pending_steps[0][0] <= elapsed:
+            clock.step(pending_steps.pop(0)[1])
+            settle_until = clock.monotonic() + 3.0
+
+        chunk = generator.render()
+        written = generator.samples_written + len(chunk)
+        accepted = epoch + (written - queued) / audio_rate
+        wait = max(0.0, accepted - clock.monotonic()) + rng.exponential(jitter_ms / 1000)
+        clock.advance(wait)
+        generator.written(len(chunk))
+
+        for frame in decoder.decode(chunk):
+            if clock.monotonic() < settle_until:
+                continue
+            out_mono = epoch + frame.start_sample / audio_rate
+            number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+            if resume_after is None:
+                out_real = out_mono + clock.real_offset
+                error = (out_real % 86400 - number / rate.rate + 43200) % 86400 - 43200
+            else:
+                error = (saved - number) / rate.rate + out_mono - anchor
+            true_offsets.append(error * 1000)
+            reported.append(generator.offset_ms)
+    return true_offsets, reported, generator
+
+
+def parse_output(spec):
+    """'FPS[:DÉPART][+DÉCALAGE]' → (cadence, timecode ou None, décalage)
+
+    DÉPART est un timecode HH:MM:SS:FF ou 'jour' (heure du jour, défaut) ;
+    DÉCALAGE est en trames, éventuellement négatif (ex: 25:jour+-3).
+    """
+    spec, _, offset = spec.partition('+')
+    fps, _, start = spec.partition(':')
+    get_frame_rate(fps)
+    return fps, None if start in ('', 'jour') else start, int(offset or 0)
+
+
+def multi_output_run(outputs, duration=60.0, sample_rate=SAMPLE_RATE,
+                     block=BANK_BLOCK, audio_drift_ppm=20.0, jitter_ms=2.0, seed=None):
+    """Simule plusieurs générateurs sur les canaux d'une même sortie
+
+    `outputs` : (cadence, timecode de départ ou None pour l'heure du jour,
+    décalage en trames). Chaque canal du flux entrelacé est décodé à part :
+    trames consécutives pour un départ libre, écart vrai à l'heure système
+    (décalage compris) pour l'heure du jour. Retourne, par sortie,
+    (trames décodées, ruptures, écart vrai max en ms ou None) et le temps de
+    rendu par seconde de son (s).
+    """
+    rng = np.random.default_rng(seed)
+    clock = SimulatedClock()
+    queued = int(0.12 * sample_rate)
+    audio_rate = sample_rate * (1 + audio_drift_ppm * 1e-6)
+    bank = GeneratorBank(len(outputs), block)
+    bank.set_output_latency(queued / sample_rate)
+    decoders = []
+    for channel, (fps, start, offset) in enumerate(outputs):
+        generator = LTCGenerator(fps, sample_rate, clock, offset=offset)
+        if start is None:
+            generator.start_time_of_day()
+        else:
+            generator.start(start)
+        bank.attach(channel, generator)
+        decoders.append(LTCDecoder(sample_rate, fps))
+
+    channels = len(outputs)
+    epoch = clock.monotonic() + 0.05
+    settle_until = clock.monotonic() + 3.0
+    end = clock.monotonic() + duration
+    written = 0
+    rendering = 0.0
+    decoded = [0] * channels
+    breaks = [0] * channels
+    worst = [None] * channels
+    previous = [None] * channels
+    while clock.monotonic() < end:
+        began = time.perf_counter()
+        pcm = bank.render()
+        rendering += time.perf_counter() - began
+        written += block
+        accepted = epoch + (written - queued) / audio_rate
+        clock.advance(max(0.0, accepted - clock.monotonic())
+                      + rng.exponential(jitter_ms / 1000))
+        bank.written(block)
+
+        for channel, (fps, start, offset) in enumerate(outputs):
+            rate = get_frame_rate(fps)
+            per_day = frames_per_day(rate.base, rate.drop_frame)
+            for frame in decoders[channel].decode(pcm[channel::channels]):
+                number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+                if start is not None:
+                    if previous[channel] is not None and (
+                            number - previous[channel]) % per_day != 1:
+                        breaks[channel] += 1
+                    previous[channel] = number
+                elif clock.monotonic() >= settle_until:
+                    out_real = epoch + frame.start_sample / audio_rate + clock.real_offset
+                    error = ((out_real % 86400 + offset / rate.rate - number / rate.rate
+                              + 43200) % 86400 - 43200) * 1000
+                    worst[channel] = max(worst[channel] or 0.0, abs(error))
+                decoded[channel] += 1
+    return list(zip(decoded, breaks, worst)), rendering / duration
+
+
+PREROLL_BUFFER = 0.12       # Tampon de sortie simulé (tube + ALSA), en s
+APLAY_SPAWN = 0.05          # Lancement d'aplay et ouverture de la carte, en s (estimation)
+
+
+def preroll_run(cycles=30, fps='25', warm=True, sample_rate=SAMPLE_RATE,
+                block=BANK_BLOCK, audio_drift_ppm=20.0, jitter_ms=2.0, seed=None):
+    """Départs successifs sur une sortie : 2 s d'arrêt, départ (zéro,
+    timecode saisi, heure du jour à tour de rôle), 3 s de génération
+
+    `warm` : départs pré-rendus et aplay gardé ouvert pendant l'arrêt ;
+    sinon, comme avant : aplay relancé au départ (APLAY_SPAWN), la carte ne
+    jouant qu'une fois ALSA_BUFFER échantillons reçus (seuil de démarrage
+    d'aplay), trames encodées à la demande. Le coût réel de chaque rendu
+    avance l'horloge simulée. Retourne, par mode (timecode de départ ou
+    None pour l'heure du jour), les délais du départ à la file d'aplay et à
+    la sortie de la première trame (ms), le retard de réveil de l'écriture
+    qui a mis la première trame en file (ms), l'écart vrai des premières
+    trames décodées à l'heure système (ms), et le nombre de départs servis
+    par le pré-rendu.
+    """
+    rng = np.random.default_rng(seed)
+    clock = SimulatedClock()
+    rate = get_frame_rate(fps)
+    queued = int(PREROLL_BUFFER * sample_rate)
+    audio_rate = sample_rate * (1 + audio_drift_ppm * 1e-6)
+    bank = GeneratorBank(1, block, sample_rate, clock)
+    bank.set_output_latency(queued / sample_rate)
+    cache = PrerollCache(sample_rate) if warm else None
+    modes = ('00:00:00:00', '01:00:00:00', None)
+    if cache is not None:
+        for timecode in modes[:2]:
+            cache.prepare(rate, timecode_to_frames(timecode, rate.base, rate.drop_frame))
+    results = {mode: ([], [], [], []) for mode in modes}
+    hits = 0
+    sink = None         # Instant de sortie de l'échantillon 0, aplay ouvert
+    prepared = 0.0
+    woken = 0.0         # Retard de réveil de la dernière écriture (s)
+
+    def write():
+        nonlocal prepared, sink, woken
+        began = time.perf_counter()
+        pcm = bank.render()
+        clock.advance(time.perf_counter() - began)
+        if sink is None:
+            # aplay à peine lancé : écriture acceptée aussitôt, la carte
+            # démarre quand son tampon est plein
+            if bank.samples_written + block >= ALSA_BUFFER:
+                sink = clock.monotonic()
+            woken = 0.0
+        else:
+            accepted = sink + (bank.samples_written + block - queued) / audio_rate
+            woken = rng.exponential(jitter_ms / 1000)
+            clock.advance(max(0.0, accepted - clock.monotonic()) + woken)
+        bank.written(block)
+        if cache is not None and clock.monotonic() - prepared >= 1.0:
+            # Comme periodic_reports : l'heure du jour jusqu'au résumé suivant
+            prepared = clock.monotonic()
+            cache.prepare_time_of_day(rate, clock, 2.0)
+        return pcm
+
+    if warm:
+        # aplay déjà ouvert (sortie précédente) au premier départ
+        clock.advance(APLAY_SPAWN)
+        while sink is None:
+            write()
+    for cycle in range(cycles):
+        start = modes[cycle % len(modes)]
+        pause = clock.monotonic() + 2.0 + rng.uniform(0, block / sample_rate)
+        while sink is not None and clock.monotonic() < pause:
+            write()
+        clock.advance(max(0.0, pause - clock.monotonic()))
+
+        pressed = clock.monotonic()
+        generator = LTCGenerator(rate, sample_rate, clock, preroll=cache)
+        if start is None:
+            generator.start_time_of_day()
+        else:
+            generator.start(start)
+        bank.attach(0, generator)
+        if sink is None:
+            bank.reset()
+            clock.advance(APLAY_SPAWN)
+        decoder = LTCDecoder(sample_rate, rate)
+        base = queued_at = None
+        frames = []
+        while clock.monotonic() < pressed + 3.0:
+            before = bank.samples_written
+            pcm = write()
+            if base is None and generator.samples_rendered:
+                base = before
+            if base is not None:
+                frames.extend(decoder.decode(pcm))
+            if (queued_at is None and generator.first_frame_sample is not None
+                    and generator.samples_written > generator.first_frame_sample):
+                queued_at = clock.monotonic()
+                queued_late = woken
+        errors = []
+        for frame in frames[:25] if start is None else ():
+            number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+            out_real = sink + (base + frame.start_sample) / audio_rate + clock.real_offset
+            errors.append(((out_real % 86400 - number / rate.rate + 43200)
+                           % 86400 - 43200) * 1000)
+        first = sink + (base + generator.first_frame_sample) / audio_rate
+        bank.detach(0)
+        if not warm:
+            sink = None
+        hits += bool(generator.preroll_hit)
+        to_queue, to_output, late, error = results[start]
+        to_queue.append((queued_at - pressed) * 1000)
+        to_output.append((first - pressed) * 1000)
+        late.append(queued_late * 1000)
+        error.extend(errors)
+    return results, hits
+
+
+def preroll_identical(fps='25', sample_rate=SAMPLE_RATE, seconds=2.0, user_bits=0x12345678):
+    """Compare, pour chaque départ de preroll_run, `seconds` de sortie
+    servies par le cache de pré-rendu (reprise de l'encodage en direct
+    comprise) à celles d'un départ à froid, sur la même horloge simulée.
+    Retourne {départ: (trouvé dans le cache, échantillons identiques)}."""
+    rate = get_frame_rate(fps)
+    count = int(seconds * sample_rate)
+
+    def render(start, warm):
+        clock = SimulatedClock()
+        cache = PrerollCache(sample_rate) if warm else None
+        if cache is not None and start is None:
+            cache.prepare_time_of_day(rate, clock, seconds, user_bits=user_bits)
+        elif cache is not None:
+            cache.prepare(rate, timecode_to_frames(start, rate.base, rate.drop_frame),
+                          user_bits)
+        generator = LTCGenerator(rate, sample_rate, clock, user_bits=user_bits,
+                                 preroll=cache)
+        if start is None:
+            generator.start_time_of_day()
+        else:
+            generator.start(start)
+        pcm = array('h')
+        while len(pcm) < count:
+            pcm.extend(generator.render())
+        return pcm[:count], generator.preroll_hit
+
+    results = {}
+    for start in ('00:00:00:00', '01:00:00:00', None):
+        cold, _ = render(start, False)
+        warm, hit = render(start, True)
+        results[start] = (bool(hit), warm == cold)
+    return results
+
+
+class PulseEncoder:
+    """Train d'impulsions à la place du LTC : `pulses_per_frame` par trame
+
+    Chaque front montant est une rampe de deux échantillons qui franchit le
+    seuil de détection exactement à l'instant (fractionnaire) de l'impulsion.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, fps='25', pulses_per_frame=1,
+                 level=0.5, width=8):
+        self.samples_per_frame = sample_rate / get_frame_rate(fps).rate
+        self.pulses_per_frame = pulses_per_frame
+        self.level = level * 32767
+        self.width = width
+        self._phase = 0.0       # Position de la prochaine impulsion dans la trame
+
+    def encode_frame(self, frame):
+        count = int(self._phase + self.samples_per_frame) - int(self._phase)
+        out = np.zeros(count)
+        threshold = PULSE_THRESHOLD * 32767
+        start = int(self._phase)
+        for pulse in range(self.pulses_per_frame):
+            at = self._phase + pulse * self.samples_per_frame / self.pulses_per_frame - start
+            first = int(at) + 1
+            ramp = threshold + (np.arange(first, first + self.width) - at) * self.level / 2
+            end = min(first + self.width, count)
+            out[first:end] = np.minimum(ramp, self.level)[:end - first]
+        self._phase += self.samples_per_frame
+        self._phase -= start
+        return array('h', out.astype(np.int16).tobytes())
+
+
+CAPTURE_DELAY = 0.0005      # Lecture d'un bloc après son dernier échantillon (s)
+CHASE_SETTLE = 60.0         # Accrochage de --chase au plus (s)
+CHASE_MAX_BIAS = 0.1        # Écart de phase moyen toléré par --chase (ms)
+
+
+def convert_run(duration=60.0, input_fps='29.97df', output_fps='25', offset=0,
+                delay=0.0, jumps=(), input_drift_ppm=-40.0, audio_drift_ppm=20.0,
+                jitter_ms=2.0, block=ALSA_PERIOD, sample_rate=SAMPLE_RATE, seed=None,
+                chase=None, pulses_per_frame=None):
+    """Simule le re-striping d'une source LTC à sa propre horloge
+
+    La source (caméra dont le quartz dérive de `input_drift_ppm`) est
+    capturée par blocs, décodée, convertie puis régénérée vers une sortie
+    simulée comme pour l'heure du jour ; le flux produit est décodé à son
+    tour. `jumps` : (instant en s, saut en s) du timecode source.
+    Avec `chase` (numéro de la première trame sortie), la sortie poursuit la
+    source sans reprendre son timecode : seul l'écart de phase des trames
+    est mesuré. Avec `pulses_per_frame`, la source est un train d'impulsions
+    plutôt que du LTC (poursuite seulement).
+    Retourne (écarts de phase en ms, ruptures inattendues, convertisseur).
+    """
+    rng = np.random.default_rng(seed)
+    clock = SimulatedClock()
+    transform = RateTransform(input_fps, output_fps, offset)
+    in_rate = transform.input_rate
+    in_day = frames_per_day(in_rate.base, in_rate.drop_frame)
+    out_rate = transform.output_rate
+    out_day = transform.output_day
+
+    # Source et capture : un bloc est lu CAPTURE_DELAY après son dernier
+    # échantillon (conversion A/N, réveil), retard que la mesure ne voit pas
+    source = (PulseEncoder(sample_rate, in_rate, pulses_per_frame) if pulses_per_frame
+              else LTCEncoder(sample_rate, in_rate))
+    source_rate = sample_rate * (1 + input_drift_ppm * 1e-6)
+    source_epoch = clock.monotonic()
+    number = transform.input_number("10:00:00:00")
+    timeline = []                         # (instant de début sur le fil, numéro)
+    pending_jumps = sorted(jumps)
+    source_pcm = array('h')
+    generated = 0
+    captured = 0
+    capture_decoder = LTCDecoder(sample_rate, in_rate)
+
+    # Sortie simulée, comme time_of_day_run
+    queued = int(0.12 * sample_rate)
+    audio_rate = sample_rate * (1 + audio_drift_ppm * 1e-6)
+    generator = LTCGenerator(out_rate, sample_rate, clock, queued / sample_rate)
+    if pulses_per_frame:
+        converter = PulseChaser(generator, chase, pulses_per_frame, delay, sample_rate)
+    else:
+        converter = Converter(generator, transform, delay, sample_rate, chase)
+    output_decoder = LTCDecoder(sample_rate, out_rate)
+    out_epoch = clock.monotonic() + 0.05
+    written = 0
+    chunk = generator.render()
+    out_ready = out_epoch + (len(chunk) - queued) / audio_rate
+
+    start = clock.monotonic()
+    end = start + duration
+    frame_time = 1 / out_rate.rate
+    excluded = [(start, start + 3.0)]     # Accrochage initial
+    for at, _ in jumps:
+        # Trames à cheval sur le saut (qui tombe au début de la trame source
+        # suivante), et réaction si la sortie n'est pas assez retardée pour
+        # l'anticiper (tampon de sortie plus quelques trames)
+        excluded.append((start + at + delay - frame_time,
+                         start + at + delay + 1 / in_rate.rate + 2 * frame_time
+                         + max(0.0, 0.25 - delay)))
+    errors = []
+    breaks = 0
+    previous = None
+    while clock.monotonic() < end:
+        in_ready = source_epoch + (captured + block) / source_rate + CAPTURE_DELAY
+        if in_ready <= out_ready:
+            clock.advance(max(0.0, in_ready - clock.monotonic()))
+            while generated < captured + block:
+                began = source_epoch + generated / source_rate
+                while pending_jumps and pending_jumps[0][0] <= began - start:
+                    number += round(pending_jumps.pop(0)[1] * in_rate.rate)
+                timeline.append((began, number))
+                tc = frames_to_timecode(number % in_day, in_rate.base, in_rate.drop_frame)
+                samples = source.encode_frame(LTCFrame.from_timecode(tc, in_rate.drop_frame))
+                source_pcm.extend(samples)
+                generated += len(samples)
+                number += 1
+            data = source_pcm[:block]
+            del source_pcm[:block]
+            captured += block
+            if pulses_per_frame:
+                converter.feed_samples(data, clock.monotonic())
+                continue
+            frames = capture_decoder.decode(data)
+            converter.observe(capture_decoder.samples_decoded, clock.monotonic())
+            for frame in frames:
+                converter.feed(frame)
+            continue
+
+        clock.advance(max(0.0, out_ready - clock.monotonic()))
+        written += len(chunk)
+        generator.written(len(chunk))
+        for frame in output_decoder.decode(chunk):
+            out_time = out_epoch + frame.start_sample / audio_rate
+            out_number = timecode_to_frames(frame.timecode, out_rate.base, out_rate.drop_frame)
+            expected_next = previous is not None and (out_number - previous) % out_day == 1
+            previous = out_number
+            if any(first <= out_time <= last for first, last in excluded):
+                continue
+            if not expected_next:
+                breaks += 1
+            # Position de la source à l'instant de sortie, moins le retard voulu
+            wanted = out_time - delay
+            index = bisect.bisect_right(timeline, (wanted, float('inf'))) - 1
+            if index < 0:
+                continue
+            began, source_number = timeline[index]
+            position = transform.position(
+                source_number + (wanted - began) * source_rate / source.samples_per_frame)
+            if chase is not None:
+                # Poursuite : seule compte la phase, pas le numéro de trame
+                late = (position - out_number + 0.5) % 1 - 0.5
+            else:
+                late = (position - out_number + out_day / 2) % out_day - out_day / 2
+            errors.append(late / out_rate.rate * 1000)
+        chunk = generator.render()
+        out_ready = (max(clock.monotonic(), out_epoch + (written + len(chunk) - queued)
+                         / audio_rate) + rng.exponential(jitter_ms / 1000))
+    return errors, breaks, converter
+
+
+async def remote_client(port, receipts, connected):
+    """Client WebSocket minimal : note (instant, octets) de chaque message reçu"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    key = base64.b64encode(os.urandom(16))
+    writer.write(b"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                 b"Connection: Upgrade\r\nSec-WebSocket-Version: 13\r\n"
+                 b"Sec-WebSocket-Key: " + key + b"\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    first = True
+    try:
+        while True:
+            header = await reader.readexactly(2)
+            length = header[1] & 0x7f
+            if length == 126:
+                length, = struct.unpack('!H', await reader.readexactly(2))
+            await reader.readexactly(length)
+            if first:
+                first = False       # État complet envoyé à la connexion
+                connected()
+            else:
+                receipts.append((time.monotonic(), 2 + length))
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+def remote_fanout_run(clients, duration=10.0, fps='25'):
+    """Diffusion de l'affichage distant à `clients` clients WebSocket locaux
+
+    Le serveur tourne dans son propre thread, comme dans la boucle du
+    moteur, nourri à chaque trame par un lecteur simulé : lecture 1x, saut
+    d'une seconde toutes les 5 s, shuttle 2x une seconde sur dix, statut
+    changé toutes les 3 s. Retourne (instants d'envoi, réceptions par
+    client, temps CPU du thread serveur, clients coupés).
+    """
+    rate = get_frame_rate(fps)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(
+        RemoteDisplayServer(0, '127.0.0.1').start(), loop).result()
+
+    async def feed(sent):
+        cpu = time.thread_time()
+        start = time.monotonic()
+        position = 10 * 3600 * rate.base
+        for tick in range(int(duration * rate.rate)):
+            await asyncio.sleep(max(0.0, start + tick / rate.rate - time.monotonic()))
+            elapsed = tick / rate.rate
+            speed = 2.0 if 6 <= elapsed % 10 < 7 else 1.0
+            position += speed
+            if tick and tick % int(5 * rate.rate) == 0:
+                position += rate.base
+            before = time.monotonic()
+            if tick % int(3 * rate.rate) == 0:
+                if server.set_status(f"LECTURE LTC {tick // int(3 * rate.rate)}"):
+                    sent.append(before)
+            if server.update(position, rate, speed):
+                sent.append(before)
+        return time.thread_time() - cpu
+
+    async def run():
+        receipts = [[] for _ in range(clients)]
+        ready = asyncio.Event()
+        count = [0]
+
+        def connected():
+            count[0] += 1
+            if count[0] == clients:
+                ready.set()
+
+        tasks = [asyncio.ensure_future(remote_client(server.port, received, connected))
+                 for received in receipts]
+        await ready.wait()
+        sent = []
+        cpu = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(feed(sent), loop))
+        await asyncio.sleep(0.2)    # Derniers messages en route
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return sent, receipts, cpu
+
+    try:
+        sent, receipts, cpu = asyncio.run(run())
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    return sent, receipts, cpu, server.clients_dropped
+
+
+def mtc_run(duration=10.0, fps='25', jumps=(), drift_ppm=-40.0, jitter_ms=2.0,
+            block=BANK_BLOCK, sample_rate=SAMPLE_RATE, seed=None):
+    """Sortie MTC en temps réel vers un récepteur UDP local
+
+    Une source simulée (générateur ou lecteur, horloge à `drift_ppm`)
+    donne sa position à chaque bloc, datée à `jitter_ms` près, et saute
+    aux instants de `jumps` ; elle s'arrête à la fin. Le récepteur date
+    chaque message, reconstitue les timecodes des cycles de quarter-frames
+    et les compare à la source. Retourne un dict de mesures.
+    """
+    rate = get_frame_rate(fps)
+    day = frames_per_day(rate.base, rate.drop_frame)
+    speed = 1 + drift_ppm * 1e-6
+    rng = np.random.default_rng(seed)
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(0.2)
+    received = []
+
+    def receive():
+        while True:
+            try:
+                data = receiver.recv(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # Socket fermé
+            received.append((time.monotonic(), data))
+
+    listener = threading.Thread(target=receive, daemon=True)
+    listener.start()
+    output = MTCOutput(UDPSink(*receiver.getsockname())).start()
+
+    # Source : segments (instant de début, position à cet instant)
+    start = time.monotonic() + 0.1
+    segments = [(start, 10 * 3600 * rate.base + 7.5)]
+    pending = sorted(jumps)
+    period = block / sample_rate
+    tick = 0
+    while True:
+        at = start + tick * period
+        if at - start > duration:
+            break
+        time.sleep(max(0.0, at - time.monotonic()))
+        while pending and pending[0][0] <= at - start:
+            moment, jump = pending.pop(0)
+            moment += start
+            origin, position = segments[-1]
+            segments.append((moment, position + (moment - origin) * rate.rate * speed
+                             + round(jump * rate.rate)))
+        origin, position = segments[-1]
+        now = time.monotonic()
+        output.update((position + (now - origin) * rate.rate * speed) % day, rate,
+                      speed, now + rng.normal(0, jitter_ms / 1000))
+        tick += 1
+    output.freeze()
+    time.sleep(0.1)
+    output.stop()
+    receiver.close()
+    listener.join()
+
+    def ideal(number, arrival):
+        """Instant où la source commençait la trame `number` (segment en vigueur)"""
+        index = bisect.bisect_right([moment for moment, _ in segments], arrival) - 1
+        origin, position = segments[max(index, 0)]
+        return origin + ((number - position + day / 2) % day - day / 2) / (rate.rate * speed)
+
+    # Cycles complets (pièces 0 à 7 à la suite), full-frames et espacements
+    quarter = 1 / (4 * rate.rate * speed)
+    spacing, sync, cycles, full_frames = [], [], [], 0
+    pieces, previous = [], None
+    for arrival, data in received:
+        if data[0] == 0xF0:
+            full_frames += 1
+            pieces, previous = [], None
+            cycles.append(None)
+            continue
+        if previous is not None:
+            spacing.append((arrival - previous - quarter) * 1000)
+        previous = arrival
+        piece, nibble = data[1] >> 4, data[1] & 0x0F
+        if piece != len(pieces):
+            pieces = []
+            if piece:
+                continue
+        pieces.append((arrival, nibble))
+        if len(pieces) == 8:
+            nibbles = [value for _, value in pieces]
+            values = [nibbles[i] | nibbles[i + 1] << 4 for i in range(0, 8, 2)]
+            tc = f"{values[3] & 0x1F:02d}:{values[2]:02d}:{values[1]:02d}:{values[0]:02d}"
+            number = timecode_to_frames(tc, rate.base, rate.drop_frame)
+            sync.append((pieces[0][0] - ideal(number, pieces[0][0])) * 1000)
+            cycles.append(number)
+            pieces = []
+    breaks = sum(1 for a, b in zip(cycles, cycles[1:])
+                 if a is not None and b is not None and (b - a) % day != 2)
+    jitter = output.jitter.snapshot()
+    return {
+        'quarter_frames': output.quarter_frames,
+        'received': len(received),
+        'full_frames': full_frames,
+        'cycles': sum(1 for number in cycles if number is not None),
+        'breaks': breaks,
+        'late_ms': (jitter['0.5'], jitter['0.99'], max(output.jitter.values, default=0.0)),
+        'spacing_ms': (float(np.std(spacing)) if spacing else 0.0,
+                       max(map(abs, spacing), default=0.0)),
+        'sync_ms': (float(np.mean(sync)) if sync else 0.0,
+                    max(map(abs, sync), default=0.0)),
+        'late': output.late,
+        'dropped': output.sink.dropped,
+    }
+
+
+def drift_run(duration=600.0, fps='25', input_drift_ppm=-40.0, audio_drift_ppm=20.0,
+              master_ppm=5.0, offset_ms=12.0, block=1024, sample_rate=SAMPLE_RATE,
+              seed=None):
+    """Mesure la dérive d'une caméra en roue libre face à l'horloge maître
+
+    La caméra (quartz à `input_drift_ppm` de l'horloge monotone du Pi) est
+    capturée par une carte son à `audio_drift_ppm`, décodée et notée comme
+    dans l'interface ; l'horloge maître (CLOCK_REALTIME à `master_ppm`) est
+    notée chaque seconde. Retourne (analyseur, écart vrai final en ms, coût
+    moyen d'une observation en µs).
+    """
+    rate = get_frame_rate(fps)
+    rng = np.random.default_rng(seed)
+    encoder = LTCEncoder(sample_rate, rate)
+    decoder = LTCDecoder(sample_rate, rate)
+    channel = Channel(rate_ratio=(1 + audio_drift_ppm * 1e-6) / (1 + input_drift_ppm * 1e-6),
+                      sample_rate=sample_rate, seed=seed)
+    card_rate = sample_rate * (1 + audio_drift_ppm * 1e-6)
+    analyzer = DriftAnalyzer("Maître")
+
+    # Heures représentées à l'instant monotone 0 (premier échantillon)
+    number = timecode_to_frames("10:00:00:00", rate.base, rate.drop_frame)
+    camera_start = number / rate.rate
+    master_start = camera_start - offset_ms / 1000
+
+    pending = array('h')
+    next_master = 0.0
+    observations = 0
+    cost = 0.0
+    now = 0.0
+    while now < duration:
+        while len(pending) < block:
+            tc = frames_to_timecode(number, rate.base, rate.drop_frame)
+            pending.extend(encoder.encode_frame(LTCFrame.from_timecode(tc, rate.drop_frame)))
+            number += 1
+        received = channel.process(np.frombuffer(pending[:block], dtype=np.int16))
+        del pending[:block]
+        frames = decoder.decode(received)
+        # Bloc lu CAPTURE_DELAY après son dernier échantillon, comme convert_run
+        now = decoder.samples_decoded / card_rate + CAPTURE_DELAY
+
+        while next_master <= now:
+            began = time.perf_counter()
+            analyzer.observe("Maître", next_master + rng.normal(0.0, 20e-6),
+                             master_start + next_master * (1 + master_ppm * 1e-6))
+            cost += time.perf_counter() - began
+            observations += 1
+            next_master += 1.0
+        for frame in frames:
+            frame_number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+            began = time.perf_counter()
+            analyzer.observe("Caméra",
+                             now - (decoder.samples_decoded - frame.end_sample) / sample_rate,
+                             (frame_number + 1) / rate.rate, 1 / rate.rate)
+            cost += time.perf_counter() - began
+            observations += 1
+
+    true_offset = (offset_ms / 1000 + now * (input_drift_ppm - master_ppm) * 1e-6) * 1000
+    return analyzer, now, true_offset, cost / observations * 1e6
+
+
+class PacedCapture:
+    """Capture simulée, interface d'ArecordSource
+
+    Un thread (arecord, hors du moteur) écrit dans un tube une période ALSA
+    à la fois, au rythme réel ; `period` None vaut ALSA_PERIOD. Le PCM est
+    rejoué en boucle ; switch() le remplace à un instant donné, au milieu
+    d'une période si besoin.
+    """
+
+    def __init__(self, pcm, sample_rate=SAMPLE_RATE, period=None):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.period = period
+        self._switch = None         # (nouveau PCM, instant monotone)
+        self._stop = threading.Event()
+        self._thread = None
+        self._transport = None
+        self._reader = None
+
+    async def open(self):
+        read_fd, write_fd = os.pipe()
+        self._reader = asyncio.StreamReader()
+        self._transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(self._reader), os.fdopen(read_fd, 'rb', 0))
+        self._thread = threading.Thread(target=self._write, args=(write_fd,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _write(self, fd):
+        size = (self.period or ALSA_PERIOD) * 2
+        position = 0
+        deadline = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                deadline += size / 2 / self.sample_rate
+                self._stop.wait(max(0.0, deadline - time.monotonic()))
+                chunk = self.pcm[position:position + size]
+                switch = self._switch
+                if switch and switch[1] < deadline:
+                    # Échantillons capturés après l'instant du changement
+                    began = deadline - size / 2 / self.sample_rate
+                    split = min(size, 2 * max(0, round((switch[1] - began) * self.sample_rate)))
+                    chunk = chunk[:split] + switch[0][position + split:position + size]
+                    self.pcm, self._switch = switch[0], None
+                position = (position + size) % len(self.pcm)
+                os.write(fd, chunk)
+        except OSError:
+            pass  # Tube fermé par le lecteur
+        finally:
+            os.close(fd)
+
+    def switch(self, pcm, at):
+        """Remplace le PCM rejoué (même longueur) à l'instant monotone `at`"""
+        self._switch = (pcm, at)
+
+    async def read(self, size):
+        return await self._reader.read(size)
+
+    async def close(self):
+        self._stop.set()
+        await asyncio.to_thread(self._thread.join)
+        self._transport.close()
+
+
+# Seuils de --power : moteur sans signal en économie, et délai de la première
+# trame au retour du signal au-delà d'une période de capture et de deux
+# trames (mot de sync, puis trame complète)
+IDLE_MAX_WAKEUPS = 5.0      # Réveils du moteur par seconde
+IDLE_MAX_CPU = 0.5          # %
+RESUME_MARGIN = 50.0        # ms
+
+
+def looped_ltc(rate, sample_rate=SAMPLE_RATE, seconds=4):
+    """PCM S16_LE de `seconds` secondes de LTC depuis 00:00:00:00"""
+    encoder = LTCEncoder(sample_rate, rate)
+    pcm = array('h')
+    for number in range(int(seconds * rate.rate)):
+        tc = frames_to_timecode(number, rate.base, rate.drop_frame)
+        pcm.extend(encoder.encode_frame(LTCFrame.from_timecode(tc, rate.drop_frame)))
+    return pcm.tobytes()
+
+
+def power_run(duration=10.0, low_power=False, signal=False, display=False,
+              fps='25', sample_rate=SAMPLE_RATE):
+    """Réveils et CPU du moteur en lecture, selon le mode d'économie d'énergie
+
+    Reprend la boucle de capture de l'interface (période choisie par
+    PowerPolicy, trames lues transmises à Tk au plus une fois par intervalle
+    d'affichage) et la boucle des résumés périodiques. La capture reçoit du
+    silence, ou du LTC si `signal` ; `display` simule l'écran HDMI actif.
+    La mesure commence une fois la capture passée au ralenti. Retourne
+    (réveils du moteur par seconde, réveils de Tk par seconde, CPU du moteur
+    en %).
+    """
+    rate = get_frame_rate(fps)
+    pcm = looped_ltc(rate, sample_rate)
+    if not signal:
+        pcm = bytes(len(pcm))
+    policy = PowerPolicy(low_power)
+    policy.display_active = display
+    posts = [0]
+
+    async def capture(sources):
+        decoder = LTCDecoder(sample_rate, rate)
+        last_heard = time.monotonic()
+        last_post = 0.0
+        while True:
+            period = policy.capture_period(time.monotonic() - last_heard)
+            if not sources or period != sources[-1].period:
+                if sources:
+                    await sources[-1].close()
+                sources.append(PacedCapture(pcm, sample_rate, period))
+                decoder.reset()
+                await sources[-1].open()
+            data = await sources[-1].read(period * 2 if period else ALSA_PERIOD * 2)
+            if decoder.decode(data):
+                now = last_heard = time.monotonic()
+                if now - last_post >= policy.display_interval():
+                    last_post = now
+                    posts[0] += 1
+
+    async def reports():
+        while True:
+            posts[0] += 1
+            await asyncio.sleep(policy.report_interval())
+
+    async def run():
+        sources = []
+        tasks = [asyncio.ensure_future(capture(sources)), asyncio.ensure_future(reports())]
+        await asyncio.sleep(1.0 if signal else IDLE_AFTER + 1.0)
+        start = (time.monotonic(), thread_wakeups(), time.thread_time(), posts[0])
+        await asyncio.sleep(duration)
+        end = (time.monotonic(), thread_wakeups(), time.thread_time(), posts[0])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await sources[-1].close()
+        elapsed = end[0] - start[0]
+        return ((end[1] - start[1]) / elapsed, (end[3] - start[3]) / elapsed,
+                (end[2] - start[2]) / elapsed * 100)
+
+    return asyncio.run(run())
+
+
+def resume_run(trials=3, low_power=True, fps='25', sample_rate=SAMPLE_RATE, seed=None):
+    """Délai entre le retour du signal et la première trame décodée
+
+    Même boucle de capture que power_run : silence jusqu'au passage au
+    ralenti (en économie), puis le LTC revient à un instant tiré au hasard
+    dans la période ALSA en cours. Retourne les délais en ms, un par essai.
+    """
+    rate = get_frame_rate(fps)
+    ltc = looped_ltc(rate, sample_rate)
+    rng = np.random.default_rng(seed)
+    policy = PowerPolicy(low_power)
+
+    async def trial():
+        decoder = LTCDecoder(sample_rate, rate)
+        source = None
+        onset = None
+        began = last_heard = time.monotonic()
+        try:
+            while True:
+                period = policy.capture_period(time.monotonic() - last_heard)
+                if source is None or period != source.period:
+                    if source:
+                        await source.close()
+                    source = PacedCapture(bytes(len(ltc)), sample_rate, period)
+                    decoder.reset()
+                    await source.open()
+                data = await source.read(period * 2 if period else ALSA_PERIOD * 2)
+                now = time.monotonic()
+                if onset is None and now - began >= (IDLE_AFTER + 1.0 if low_power else 1.0):
+                    # Juste après une lecture : phase quelconque dans la période
+                    onset = now + rng.uniform(0, (period or ALSA_PERIOD) / sample_rate)
+                    source.switch(ltc, onset)
+                if decoder.decode(data) and onset is not None:
+                    return (now - onset) * 1000
+        finally:
+            if source:
+                await source.close()
+
+    return [asyncio.run(trial()) for _ in range(trials)]
+
+
+def write_bwf(path, duration, channels=8, bits=24, sample_rate=SAMPLE_RATE,
+              time_reference=0, seed=None, block=65536):
+    """WAV/BWF de bruit multicanal, chunk bext et chunk LIST après les données"""
+    rng = np.random.default_rng(seed)
+    frames = int(duration * sample_rate)
+    width = bits // 8
+    data_size = frames * channels * width
+    bext = bytearray(602)
+    struct.pack_into('<Q', bext, BEXT_TIME_REFERENCE, time_reference)
+    trailer = b'INFOISFT\x0e\x00\x00\x00ltc_loopback\x00\x00'
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sI4s', b'RIFF', 4 + 24 + 8 + len(bext) + 8 + data_size
+                            + 8 + len(trailer), b'WAVE'))
+        f.write(struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, channels, sample_rate,
+                            sample_rate * channels * width, channels * width, bits))
+        f.write(struct.pack('<4sI', b'bext', len(bext)) + bext)
+        f.write(struct.pack('<4sI', b'data', data_size))
+        for begin in range(0, frames, block):
+            count = min(block, frames - begin)
+            f.write(rng.integers(0, 256, count * channels * width, np.uint8).tobytes())
+        f.write(struct.pack('<4sI', b'LIST', len(trailer)) + trailer)
+
+
+def stripe_run(duration=600.0, fps='25', channels=8, bits=24, channel=None,
+               time_reference=None, sample_rate=SAMPLE_RATE, seed=None):
+    """Stripe un BWF de bruit dans un dossier temporaire et relit le résultat
+
+    `channel` (à partir de 0) au-delà du dernier canal ajoute une piste.
+    Retourne (trames relues, trames mal placées ou mal numérotées, canaux
+    d'origine identiques, chunks hors données identiques, vitesse en
+    multiple du temps réel).
+    """
+    rate = get_frame_rate(fps)
+    if time_reference is None:
+        # 10:00:00:00 plus 0,3 s : la première trame est coupée
+        time_reference = int((10 * 3600 + 0.3) * sample_rate)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source.wav')
+        destination = os.path.join(directory, 'striped.wav')
+        write_bwf(source, duration, channels, bits, sample_rate, time_reference, seed)
+        started = time.perf_counter()
+        stripe(source, destination, channel, fps)
+        speed = duration / (time.perf_counter() - started)
+
+        before, after = WavLayout(source), WavLayout(destination)
+        if channel is None:
+            channel = channels - 1
+        kept = [index for index in range(channels) if index != channel]
+        original, striped = before.audio(), after.audio()
+        identical = all(np.array_equal(original[begin:begin + 65536, kept],
+                                       striped[begin:begin + 65536, kept])
+                        for begin in range(0, before.frames, 65536))
+        chunks = True
+        with open(source, 'rb') as a, open(destination, 'rb') as b:
+            for (chunk_id, offset, length), (other_id, other_offset, other_length) in zip(
+                    before.chunks, after.chunks):
+                if chunk_id in (b'fmt ', b'data'):
+                    continue
+                a.seek(offset)
+                b.seek(other_offset)
+                chunks &= (chunk_id, a.read(length)) == (other_id, b.read(other_length))
+
+        # Relecture : les deux octets de poids fort du canal LTC
+        decoder = LTCDecoder(sample_rate, rate)
+        samples_per_frame = sample_rate / rate.rate
+        decoded = misplaced = 0
+        for begin in range(0, after.frames, 65536):
+            ltc = np.ascontiguousarray(striped[begin:begin + 65536, channel, -2:])
+            for frame in decoder.decode(ltc.tobytes()):
+                decoded += 1
+                end = time_reference + frame.end_sample
+                number = round(end / samples_per_frame) - 1
+                expected = frames_to_timecode(number % frames_per_day(rate.base, rate.drop_frame),
+                                              rate.base, rate.drop_frame)
+                if (frame.timecode != expected
+                        or abs(end - (number + 1) * samples_per_frame) > 2):
+                    misplaced += 1
+        del original, striped
+    return decoded, misplaced, identical, chunks, speed
+
+
+def feed_fifo(fd, data, block=4096):
+    """Écrit `data` dans un tube nommé déjà ouvert, puis le ferme"""
+    os.set_blocking(fd, True)
+    view = memoryview(data)
+    for begin in range(0, len(view), block):
+        os.write(fd, view[begin:begin + block])
+    os.close(fd)
+
+
+def feed_udp(port, data, rtp=False, block=960, sample_rate=SAMPLE_RATE):
+    """Envoie `data` (S16_LE) vers 127.0.0.1:`port` au rythme réel, un bloc
+    par datagramme ; en RTP, L16 gros-boutiste derrière un en-tête RTP"""
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    samples = np.frombuffer(data, '<i2')
+    started = time.monotonic()
+    for sequence, begin in enumerate(range(0, len(samples), block)):
+        chunk = samples[begin:begin + block]
+        payload = chunk.tobytes()
+        if rtp:
+            payload = struct.pack('!BBHII', 0x80, 96, sequence & 0xFFFF, begin,
+                                  0x4C54) + chunk.astype('>i2').tobytes()
+        time.sleep(max(0.0, started + begin / sample_rate - time.monotonic()))
+        sender.sendto(payload, ('127.0.0.1', port))
+    sender.close()
+
+
+async def measure_source(source, fps='25', feeder=None, samples=None, block=2048):
+    """Décode `source` jusqu'à sa fin (ou `samples` échantillons, ou une
+    seconde de silence) ; `feeder(source)` lancé dans un thread après
+    l'ouverture l'alimente. Retourne (trames, secondes d'audio, durée, CPU)."""
+    await source.open()
+    decoder = LTCDecoder(source.sample_rate, fps)
+    thread = None
+    if feeder:
+        thread = threading.Thread(target=feeder, args=(source,), daemon=True)
+        thread.start()
+    started, cpu = time.perf_counter(), time.process_time()
+    try:
+        while samples is None or decoder.samples_decoded < samples:
+            read = source.read(block)
+            try:
+                # Comme le lecteur : délai de garde pour les seules sources muettes
+                data = await (asyncio.wait_for(read, 1.0) if source.may_stall else read)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            decoder.decode(data)
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu
+    finally:
+        await source.close()
+    if thread:
+        thread.join()
+    return (decoder.frames_decoded, decoder.samples_decoded / source.sample_rate,
+            elapsed, cpu)
+
+
+def sources_run(duration=60.0, fps='25', realtime=5.0, sample_rate=SAMPLE_RATE,
+                seed=None):
+    """Lit le même LTC par chaque type de source du lecteur
+
+    Fichiers à vitesse maximale (WAV mono 16 bits, BWF 8 canaux 24 bits,
+    PCM brut), tube nommé alimenté par un thread, puis au rythme réel
+    pendant `realtime` secondes : WAV, UDP et RTP. Retourne une liste de
+    (libellé, trames attendues, trames, secondes d'audio, durée, CPU, temps réel).
+    """
+    rate = get_frame_rate(fps)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        mono = os.path.join(directory, 'ltc.wav')
+        short = os.path.join(directory, 'court.wav')
+        raw = os.path.join(directory, 'ltc.raw')
+        multichannel = os.path.join(directory, 'bwf.wav')
+        fifo = os.path.join(directory, 'ltc.fifo')
+        total = render_wav(mono, 1.0, duration, fps, sample_rate=sample_rate)
+        brief = render_wav(short, 1.0, realtime, fps, sample_rate=sample_rate)
+        with wave.open(mono, 'rb') as source:
+            pcm = source.readframes(source.getnframes())
+        with wave.open(short, 'rb') as source:
+            brief_pcm = source.readframes(source.getnframes())
+        with open(raw, 'wb') as f:
+            f.write(pcm)
+        write_bwf(multichannel, duration, 8, 24, sample_rate, seed=seed)
+        stripe(multichannel, fps=fps, start="01:00:00:00")
+        os.mkfifo(fifo)
+
+        def run(label, source, expected, is_realtime=False, feeder=None, samples=None):
+            frames, audio, elapsed, cpu = asyncio.run(
+                measure_source(source, fps, feeder, samples))
+            results.append((label, expected, frames, audio, elapsed, cpu, is_realtime))
+
+        run("WAV mono 16 bits", FileSource(mono, realtime=False), total)
+        run("BWF 8 canaux 24 bits", FileSource(multichannel, realtime=False, channel=7),
+            int(duration * rate.rate))
+        run("PCM brut", FileSource(raw, realtime=False), total)
+        # Le tube est ouvert en écriture avant la lecture : pas de fin de
+        # flux prématurée si le lecteur lit avant que l'écrivain soit là
+        writer = os.open(fifo, os.O_RDWR)
+        run("Tube nommé", PipeSource(fifo), total,
+            feeder=lambda source: feed_fifo(writer, pcm))
+        count = len(brief_pcm) // 2
+        run("WAV au rythme réel", FileSource(short), brief, True)
+        run("UDP", UDPSource(0, '127.0.0.1'), brief, True,
+            lambda source: feed_udp(source.port, brief_pcm, sample_rate=sample_rate),
+            count)
+        run("RTP", UDPSource(0, '127.0.0.1', rtp=True), brief, True,
+            lambda source: feed_udp(source.port, brief_pcm, True, sample_rate=sample_rate),
+            count)
+    return results
+
+
+# Plateaux d'écrans décrits par `xrandr --current` : (libellé, sorties DRM
+# branchées, sortie xrandr, écran HDMI attendu)
+XRANDR_CORPUS = [
+    ("Tactile + HDMI 1080p", ('DSI-1', 'HDMI-A-1'),
+     "Screen 0: minimum 320 x 200, current 2720 x 1080, maximum 8192 x 8192\n"
+     "DSI-1 connected primary 800x480+0+0 (normal left inverted right x axis y axis) "
+     "155mm x 86mm\n   800x480       60.00*+\n"
+     "HDMI-1 connected 1920x1080+800+0 (normal left inverted right x axis y axis) "
+     "521mm x 293mm\n   1920x1080     60.00*+  50.00    59.94\n"
+     "HDMI-2 disconnected (normal left inverted right x axis y axis)\n", 'HDMI-1'),
+    ("Tactile + HDMI 4K", ('DSI-1', 'HDMI-A-1'),
+     "DSI-1 connected primary 800x480+0+0 (normal) 155mm x 86mm\n"
+     "HDMI-1 connected 3840x2160+800+0 (normal) 708mm x 398mm\n", 'HDMI-1'),
+    ("HDMI 720p à gauche", ('DSI-1', 'HDMI-A-1'),
+     "HDMI-1 connected 1280x720+0+0 (normal) 0mm x 0mm\n"
+     "DSI-1 connected primary 800x480+1280+0 (normal) 155mm x 86mm\n", 'HDMI-1'),
+    ("Deux HDMI, sans principal", ('HDMI-A-1', 'HDMI-A-2'),
+     "HDMI-1 connected 1024x600+0+0 (normal) 154mm x 86mm\n"
+     "HDMI-2 connected 1366x768+1024+0 (normal) 410mm x 230mm\n", 'HDMI-2'),
+    ("HDMI branché mais éteint", ('DSI-1', 'HDMI-A-1'),
+     "DSI-1 connected primary 800x480+0+0 (normal) 155mm x 86mm\n"
+     "HDMI-1 connected (normal left inverted right x axis y axis)\n", None),
+    ("Écran tactile seul", ('DSI-1',),
+     "DSI-1 connected primary 800x480+0+0 (normal) 155mm x 86mm\n", None),
+]
+TIMECODE_WIDTH = 11 * 0.6    # « HH:MM:SS:FF » en Courier, en tailles de police
+
+
+def display_run(starts=100):
+    """Disposition des écrans de chaque plateau du corpus, lue à travers un
+    sysfs simulé : premier démarrage (xrandr interrogé), puis `starts`
+    démarrages avec les mêmes écrans. Retourne une liste de (libellé, écran
+    choisi, écran attendu, profil, largeur du timecode en fraction de
+    l'écran, appels à xrandr, durée moyenne d'une lecture en cache en ms)."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, 'displays.json')
+        for index, (label, connectors, text, expected) in enumerate(XRANDR_CORPUS):
+            drm = os.path.join(directory, f'drm{index}')
+            for number, connector in enumerate(connectors):
+                path = os.path.join(drm, f'card0-{connector}')
+                os.makedirs(path)
+                with open(os.path.join(path, 'status'), 'w') as f:
+                    f.write('connected\n')
+                with open(os.path.join(path, 'edid'), 'wb') as f:
+                    f.write(bytes([index, number]) * 64)
+            pattern = os.path.join(drm, 'card*-*')
+            layout = DisplayLayout(cache, query=lambda text=text: parse_xrandr(text),
+                                   key=lambda pattern=pattern: connector_key(pattern))
+            monitor = secondary_monitor(layout.monitors())
+            queries = layout.queries
+            started = time.perf_counter()
+            for _ in range(starts):
+                # Nouveau processus : seul le cache disque est partagé
+                restarted = DisplayLayout(cache, query=layout.query, key=layout.key)
+                restarted.monitors()
+                queries += restarted.queries
+            elapsed = (time.perf_counter() - started) / starts * 1000
+            width, height = (monitor.width, monitor.height) if monitor else (800, 600)
+            profile = profile_for(width, height)
+            fill = -profile.timecode_font[1] * TIMECODE_WIDTH / width
+            results.append((label, monitor, expected, profile, fill, queries, elapsed))
+    return results
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(
+        description="Boucle locale générateur LTC → canal simulé → décodeur")
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help="durée de timecode à générer, en secondes")
+    parser.add_argument('--fps', default='25',
+                        help="cadence : 24, 25, 29.97, 29.97df ou 30")
+    parser.add_argument('--start', default="00:00:00:00",
+                        help="timecode de départ HH:MM:SS:FF")
+    parser.add_argument('--sample-rate', type=int, default=SAMPLE_RATE)
+    parser.add_argument('--block', type=int, default=1024,
+                        help="taille des blocs audio en échantillons")
+    parser.add_argument('--gain', type=float, default=1.0)
+    parser.add_argument('--noise', type=float, default=0.0,
+                        help="écart-type du bruit blanc, relatif à la pleine échelle")
+    parser.add_argument('--lowpass', type=float, help="fréquence de coupure haute (Hz)")
+    parser.add_argument('--highpass', type=float, help="fréquence de coupure basse (Hz)")
+    parser.add_argument('--rate-ratio', type=float, default=1.0,
+                        help="rapport fréquence réception / émission (ex: 1.001)")
+    parser.add_argument('--invert', action='store_true', help="inverse la polarité")
+    parser.add_argument('--dc', type=float, default=0.0,
+                        help="tension continue ajoutée (fraction de la pleine échelle)")
+    parser.add_argument('--hum', type=float, default=0.0,
+                        help="ronflette secteur ajoutée (fraction de la pleine échelle)")
+    parser.add_argument('--hum-frequency', type=float, default=50.0, metavar='HZ')
+    parser.add_argument('--input-filter', metavar='ÉTAGES',
+                        help="conditionnement avant décodage, ex. dc,band,agc,hum50")
+    parser.add_argument('--condition-corpus', action='store_true',
+                        help="taux de décodage d'un corpus dégradé sans puis avec "
+                             "conditionnement (--input-filter, défaut dc,band,agc)")
+    parser.add_argument('--drop', type=float, default=0.0,
+                        help="probabilité de perte de chaque bloc")
+    parser.add_argument('--seed', type=int, help="graine du générateur aléatoire")
+    parser.add_argument('--min-accuracy', type=float, default=0.0,
+                        help="taux de trames correctes minimal (0-1) pour réussir")
+    parser.add_argument('--speed-sweep', type=float, nargs='*', metavar='SPEED',
+                        help="teste des WAV synthétiques à ces vitesses "
+                             "(négatives = arrière) au lieu de la boucle temps réel")
+    parser.add_argument('--wav-dir', help="conserve les WAV du balayage dans ce dossier")
+    parser.add_argument('--time-of-day', action='store_true',
+                        help="simule la génération heure du jour avec une horloge injectée")
+    parser.add_argument('--clock-step', action='append', default=[], metavar='T:S',
+                        help="saut de CLOCK_REALTIME de S secondes à T secondes")
+    parser.add_argument('--clock-slew', type=float, default=0.0, metavar='PPM',
+                        help="glissement de CLOCK_REALTIME pendant le tiers central")
+    parser.add_argument('--audio-drift', type=float, default=20.0, metavar='PPM',
+                        help="écart du quartz de la carte son simulée")
+    parser.add_argument('--jitter', type=float, default=2.0, metavar='MS',
+                        help="gigue moyenne du retour d'écriture")
+    parser.add_argument('--latency-error', type=float, default=0.0, metavar='MS',
+                        help="erreur d'estimation de la latence de sortie")
+    parser.add_argument('--max-offset', type=float, default=float('inf'), metavar='MS',
+                        help="écart vrai maximal toléré pour réussir (heure du jour)")
+    parser.add_argument('--resume-after', type=float, metavar='S',
+                        help="avec --time-of-day : simule la reprise d'un timecode libre "
+                             "sauvegardé S secondes plus tôt")
+    parser.add_argument('--output', action='append', type=parse_output, metavar='SPEC',
+                        help="sortie multicanal FPS[:HH:MM:SS:FF|:jour][+DÉCALAGE], "
+                             "une option par canal (ex: --output 25 --output 30:01:00:00:00)")
+    parser.add_argument('--convert', metavar='ENTRÉE:SORTIE',
+                        help="simule le re-striping d'une source à sa propre horloge "
+                             "(ex: 29.97df:25)")
+    parser.add_argument('--offset', default='0',
+                        help="avec --convert : décalage en trames ou timecode signé "
+                             "(+01:00:00:00)")
+    parser.add_argument('--convert-delay', type=float, default=0.0, metavar='S',
+                        help="avec --convert : retard volontaire de la sortie")
+    parser.add_argument('--jump', action='append', default=[], metavar='T:S',
+                        help="avec --convert : saut de S secondes du timecode source à T s")
+    parser.add_argument('--input-drift', type=float, default=-40.0, metavar='PPM',
+                        help="avec --convert : écart du quartz de la source")
+    parser.add_argument('--remote-clients', type=int, nargs='+', metavar='N',
+                        help="mesure la diffusion de l'affichage distant WebSocket à N "
+                             "clients locaux (ex: 1 10 50), 10 s au plus par mesure")
+    parser.add_argument('--mtc', action='store_true',
+                        help="sortie MTC en temps réel vers un récepteur UDP local, "
+                             "source à --input-drift avec sauts --jump, 20 s au plus")
+    parser.add_argument('--drift', action='store_true',
+                        help="mesure la dérive d'une caméra (--input-drift) face à "
+                             "l'horloge maître (--master-drift)")
+    parser.add_argument('--master-drift', type=float, default=5.0, metavar='PPM',
+                        help="avec --drift : écart de l'horloge maître à l'horloge du Pi")
+    parser.add_argument('--power', action='store_true',
+                        help="réveils et CPU de la lecture, mode normal puis économie "
+                             "d'énergie, 10 s au plus par mesure")
+    parser.add_argument('--chase', metavar='TIMECODE',
+                        help="poursuite : la sortie part de TIMECODE, calée sur une source "
+                             "à --input-drift (cadences de --convert, sinon --fps)")
+    parser.add_argument('--pulses', type=int, metavar='N',
+                        help="avec --chase : la source est un train de N impulsions par "
+                             "trame plutôt que du LTC")
+    parser.add_argument('--stripe', type=int, nargs='?', const=0, metavar='CANAL',
+                        help="stripe un BWF 8 canaux 24 bits de --duration secondes "
+                             "(canal 1 à 9, 9 ajoute une piste ; défaut : le dernier) "
+                             "puis le relit")
+    parser.add_argument('--displays', action='store_true',
+                        help="disposition des écrans : choix de l'écran HDMI, polices "
+                             "et lectures en cache sur un corpus de sorties xrandr")
+    parser.add_argument('--sources', action='store_true',
+                        help="lit --duration secondes de LTC par chaque source du lecteur "
+                             "(fichiers, tube nommé à vitesse maximale ; WAV, UDP, RTP "
+                             "au rythme réel, 5 s)")
+    parser.add_argument('--preroll', type=int, nargs='?', const=30, metavar='N',
+                        help="délai des départs : N départs (défaut 30) avant, puis "
+                             "avec pré-rendu et aplay gardé ouvert")
+    args = parser.parse_args()
+
+    if args.condition_corpus:
+        stages = ([args.input_filter] if args.input_filter
+                  else [DEFAULT_STAGES, DEFAULT_STAGES + ',hum50'])
+        results, cost = conditioning_run(min(args.duration, 60.0), args.fps, stages,
+                                         args.sample_rate, args.block, args.seed)
+        print(f"{'Situation':<30} {'Brut':>9}" + "".join(f"  {text:>18}" for text in stages))
+        for label, raw, *conditioned in results:
+            print(f"{label:<30} {raw * 100:>7.2f} %"
+                  + "".join(f"  {rate * 100:>16.2f} %" for rate in conditioned))
+        print(f"Coût ({stages[-1]}) : {cost:.0f} µs par bloc de {args.block} échantillons")
+        return 0 if all(max(conditioned) >= min(raw, 0.999)
+                        for label, raw, *conditioned in results) else 1
+
+    if args.displays:
+        print("Plateau                     Écran HDMI                  Police  Largeur  "
+              "xrandr  Cache")
+        failed = False
+        for label, monitor, expected, profile, fill, queries, elapsed in display_run():
+            chosen = monitor.name if monitor else None
+            failed |= chosen != expected or not 0.4 <= fill <= 0.95 or queries != 1
+            print(f"{label:<27} {str(monitor) if monitor else 'en fenêtre':<27} "
+                  f"{-profile.timecode_font[1]:>4} px  {fill * 100:>5.0f} %  "
+                  f"{queries:>6}  {elapsed:.3f} ms")
+        return 1 if failed else 0
+
+    if args.sources:
+        print("Source                 Trames (attendues)  Audio   Durée     Vitesse   CPU")
+        failed = False
+        for label, expected, frames, audio, elapsed, cpu, realtime in sources_run(
+                args.duration, args.fps, min(args.duration, 5.0), args.sample_rate,
+                args.seed):
+            speed = audio / elapsed
+            failed |= frames < expected - 2 or (realtime and abs(speed - 1) > 0.05)
+            print(f"{label:<22} {frames:>6} ({expected:>6})   {audio:>6.1f} s "
+                  f"{elapsed:>6.2f} s {speed:>8.1f}x  {cpu / elapsed * 100:>4.0f} %")
+        return 1 if failed else 0
+
+    if args.preroll:
+        # Promesses d'un départ pré-rendu, aplay ouvert : première trame en
+        # file à la fin de la période audio en cours, au retard de réveil de
+        # l'écriture près, et sortie derrière le tampon de sortie, plancher
+        # d'un aplay gardé ouvert ; une trame de plus en heure du jour,
+        # calée sur la frontière suivante
+        frame_ms = 1000 / get_frame_rate(args.fps).rate
+        period = args.block / args.sample_rate * 1000
+        buffer = PREROLL_BUFFER * 1000
+        failed = False
+        print("Départ        Version  En file (moy/max)   Sortie (moy/max)    "
+              "Écart 1res trames")
+        for label, warm in (("avant", False), ("après", True)):
+            results, hits = preroll_run(args.preroll, args.fps, warm, args.sample_rate,
+                                        args.block, args.audio_drift, args.jitter,
+                                        args.seed)
+            for start, (to_queue, to_output, late, errors) in results.items():
+                error = (f"{max(abs(e) for e in errors):.2f} ms" if errors
+                         else "-" if start else "non décodé")
+                print(f"{start or 'heure du jour':<13} {label:<8} "
+                      f"{np.mean(to_queue):>6.0f} /{max(to_queue):>5.0f} ms   "
+                      f"{np.mean(to_output):>6.0f} /{max(to_output):>5.0f} ms   {error}")
+                if warm:
+                    extra = frame_ms if start is None else 0.0
+                    failed |= any(queued - woken > period + extra + 0.5
+                                  for queued, woken in zip(to_queue, late))
+                    failed |= max(to_output) > buffer + extra + 0.5
+            print(f"{'':<13} {label:<8} pré-rendu : {hits}/{args.preroll} départs")
+            failed |= warm and hits < args.preroll
+        print(f"Avant                : lancement d'aplay ({APLAY_SPAWN * 1000:.0f} ms estimés) "
+              f"et remplissage de {ALSA_BUFFER} échantillons compris")
+        print(f"Promesse             : 1re trame en file en {period:.0f} ms plus le réveil "
+              f"de l'écriture, sortie en {buffer:.0f} ms, tampon de sortie (plancher) "
+              f"compris (+{frame_ms:.0f} ms en heure du jour)")
+        for start, (hit, identical) in preroll_identical(args.fps, args.sample_rate).items():
+            failed |= not hit or not identical
+            print(f"Pré-rendu/à froid    : {start or 'heure du jour':<13} "
+                  f"{'identiques' if identical else 'DIFFÉRENTS'}"
+                  f"{'' if hit else ' (pré-rendu non trouvé)'}")
+        return 1 if failed else 0
+
+    if args.stripe is not None:
+        decoded, misplaced, identical, chunks, speed = stripe_run(
+            args.duration, args.fps, channel=args.stripe - 1 if args.stripe else None,
+            sample_rate=args.sample_rate, seed=args.seed)
+        expected = int(args.duration * get_frame_rate(args.fps).rate)
+        print(f"Trames relues        : {decoded} (sur ~{expected})")
+        print(f"Trames mal placées   : {misplaced}")
+        print(f"Autres canaux        : {'identiques' if identical else 'MODIFIÉS'}")
+        print(f"Chunks hors données  : {'identiques' if chunks else 'MODIFIÉS'}")
+        print(f"Vitesse              : {speed:.0f}x temps réel")
+        return 0 if identical and chunks and not misplaced and decoded >= expected - 2 else 1
+
+    if args.power:
+        duration = min(args.duration, 10.0)
+        failed = False
+        print("Situation             Mode        Réveils moteur/s  Réveils Tk/s  CPU moteur")
+        for label, signal, display in (("Sans signal", False, False),
+                                       ("Signal, sans HDMI", True, False),
+                                       ("Signal, HDMI actif", True, True)):
+            for mode, low_power in (("normal", False), ("économie", True)):
+                wakeups, posts, cpu = power_run(duration, low_power, signal, display,
+                                                args.fps, args.sample_rate)
+                print(f"{label:<21} {mode:<10} {wakeups:>17.1f}  {posts:>12.1f}  "
+                      f"{cpu:>8.2f} %")
+                if low_power and not signal:
+                    failed |= wakeups > IDLE_MAX_WAKEUPS or cpu > IDLE_MAX_CPU
+        rate = get_frame_rate(args.fps)
+        for mode, low_power in (("normal", False), ("économie", True)):
+            delays = resume_run(3, low_power, args.fps, args.sample_rate, seed=args.seed)
+            period = IDLE_PERIOD if low_power else ALSA_PERIOD
+            limit = (period / args.sample_rate + 2 / rate.rate) * 1000 + RESUME_MARGIN
+            failed |= max(delays) > limit
+            print(f"Retour du signal, {mode:<9}: 1re trame en "
+                  f"{' / '.join(f'{delay:.0f}' for delay in delays)} ms "
+                  f"(limite {limit:.0f} ms)")
+        return 1 if failed else 0
+
+    if args.drift:
+        analyzer, end, true_offset, cost = drift_run(
+            args.duration, args.fps, args.input_drift, args.audio_drift, args.master_drift,
+            sample_rate=args.sample_rate, seed=args.seed)
+        camera, master = analyzer.tracks["Caméra"], analyzer.tracks["Maître"]
+        offset = analyzer.offset_ms("Caméra", "Maître", end)
+        relative = camera.drift_ppm() - master.drift_ppm()
+        true_relative = args.input_drift - args.master_drift
+        frame_time = 1 / get_frame_rate(args.fps).rate
+        print(f"Caméra               : {camera.drift_ppm():+.3f} ppm "
+              f"(vrai {args.input_drift:+.3f}), {camera.count} points")
+        print(f"Horloge maître       : {master.drift_ppm():+.3f} ppm "
+              f"(vrai {args.master_drift:+.3f}), {master.count} points")
+        print(f"Écart caméra/maître  : {offset:+.3f} ms (vrai {true_offset:+.3f})")
+        print(f"Une trame d'écart    : dans {frame_time / abs(relative * 1e-6) / 60:.1f} min "
+              f"(vrai {frame_time / abs(true_relative * 1e-6) / 60:.1f})")
+        print(f"Coût                 : {cost:.2f} µs par observation")
+        failed = (abs(camera.drift_ppm() - args.input_drift) > 1
+                  or abs(master.drift_ppm() - args.master_drift) > 1
+                  or abs(offset - true_offset) > args.max_offset)
+        return 1 if failed else 0
+
+    if args.mtc:
+        jumps = [tuple(map(float, jump.split(':'))) for jump in args.jump]
+        duration = min(args.duration, 20.0)
+        result = mtc_run(duration, args.fps, jumps or [(duration / 2, 60.0)],
+                         args.input_drift, args.jitter, seed=args.seed)
+        late, spacing, sync = result['late_ms'], result['spacing_ms'], result['sync_ms']
+        print(f"Quarter-frames       : {result['quarter_frames']} envoyés, "
+              f"{result['received'] - result['full_frames']} reçus")
+        print(f"Full-frames          : {result['full_frames']} (départ, sauts, arrêt)")
+        print(f"Cycles décodés       : {result['cycles']}, ruptures : {result['breaks']}")
+        print(f"Retard sur l'échéance: médian {late[0]:.3f} ms, p99 {late[1]:.3f} ms, "
+              f"max {late[2]:.3f} ms")
+        print(f"Espacement reçu      : écart-type {spacing[0]:.3f} ms, max {spacing[1]:.3f} ms")
+        print(f"Calage sur la source : moyen {sync[0]:+.3f} ms, max {sync[1]:.3f} ms")
+        print(f"Retards abandonnés   : {result['late']}, perdus : {result['dropped']}")
+        return 0 if not result['breaks'] and sync[1] <= args.max_offset else 1
+
+    if args.remote_clients:
+        duration = min(args.duration, 10.0)
+        print("Clients  Messages/s  Octets/s  Latence médiane     p99     max  CPU serveur")
+        failed = False
+        for clients in args.remote_clients:
+            sent, receipts, cpu, dropped = remote_fanout_run(clients, duration, args.fps)
+            latencies = sorted((received[0] - at) * 1000 for per_client in receipts
+                               for at, received in zip(sent, per_client))
+            received = sum(len(per_client) for per_client in receipts)
+            size = sum(length for per_client in receipts for _, length in per_client)
+            failed |= dropped > 0 or received != len(sent) * clients
+            print(f"{clients:>7}  {received / clients / duration:>10.2f}  "
+                  f"{size / clients / duration:>8.1f}  "
+                  f"{latencies[len(latencies) // 2]:>12.2f} ms "
+                  f"{latencies[int(len(latencies) * 0.99)]:>6.2f}  "
+                  f"{latencies[-1]:>6.2f}  {cpu / duration * 100:>9.2f} %")
+        print(f"(par client ; lecteur simulé à {get_frame_rate(args.fps).rate:.2f} trames/s)")
+        return 1 if failed else 0
+
+    if args.chase is not None:
+        input_fps, _, output_fps = (args.convert or args.fps).partition(':')
+        output_rate = get_frame_rate(output_fps or input_fps)
+        start = timecode_to_frames(args.chase, output_rate.base, output_rate.drop_frame)
+        errors, breaks, chaser = convert_run(
+            args.duration, input_fps, output_fps or input_fps, 0, args.convert_delay,
+            [tuple(map(float, jump.split(':'))) for jump in args.jump],
+            args.input_drift, args.audio_drift, args.jitter, seed=args.seed,
+            chase=start, pulses_per_frame=args.pulses)
+        # Après l'accrochage (apprentissage de l'écart d'horloge, CHASE_SETTLE
+        # ou la moitié de la mesure) : écart constant, moins les biais connus
+        # de la simulation, et variation autour de lui. Biais : latence de
+        # capture que la poursuite ne peut pas voir ; minimum de EPOCH_WINDOW
+        # gigues de sortie (en moyenne la gigue / EPOCH_WINDOW) ; capture
+        # cadencée par l'horloge de la source, qui, plus lente, vieillit le
+        # minimum glissant des instants de capture de EPOCH_WINDOW - 1 blocs
+        # (une vraie carte son ne dérive que de quelques ppm)
+        settled = errors[int(min(CHASE_SETTLE, args.duration / 2) * output_rate.rate):]
+        if not settled:
+            print(f"Aucune trame mesurée après l'accrochage ({len(errors)} en tout) : "
+                  f"allonger --duration", file=sys.stderr)
+            return 1
+        window = (EPOCH_WINDOW - 1) * ALSA_PERIOD / SAMPLE_RATE
+        bias = (CAPTURE_DELAY * 1000 - args.jitter / EPOCH_WINDOW
+                + min(0.0, args.input_drift) * 1e-6 * window * 1000)
+        mean = sum(settled) / len(settled) - bias
+        deviations = sorted(abs(error - bias - mean) for error in settled)
+        spread = deviations[-1]
+        samples_per_ms = args.sample_rate / 1000
+        true_ppm = ((1 + args.input_drift * 1e-6) / (1 + args.audio_drift * 1e-6) - 1) * 1e6
+        print(f"Trames mesurées      : {len(errors)}")
+        print(f"Écart de phase       : moyen {mean:+.3f} ms ({mean * samples_per_ms:+.1f} "
+              f"échantillons, biais simulé {bias:+.3f} ms déduit), "
+              f"toléré ±{CHASE_MAX_BIAS:.3f} ms")
+        print(f"Variation            : p99 {deviations[int(len(deviations) * 0.99)]:.3f} ms "
+              f"({deviations[int(len(deviations) * 0.99)] * samples_per_ms:.1f} échantillons), "
+              f"max {spread:.3f} ms ({spread * samples_per_ms:.1f} échantillons)")
+        print(f"Écart d'horloge      : {chaser.generator.trim * 1e6:+.2f} ppm "
+              f"appris (vrai {true_ppm:+.2f})")
+        print(f"Ruptures             : {breaks}, sortie en "
+              f"{chaser.generator.output_timecode()}")
+        if args.pulses:
+            print(f"Impulsions           : {chaser.pulses}, manquées {chaser.pulses_missed}")
+        failed = breaks or abs(mean) > CHASE_MAX_BIAS or spread > args.max_offset
+        return 1 if failed else 0
+
+    if args.convert:
+        input_fps, _, output_fps = args.convert.partition(':')
+        jumps = [tuple(map(float, jump.split(':'))) for jump in args.jump]
+        errors, breaks, converter = convert_run(
+            args.duration, input_fps, output_fps or '25',
+            parse_offset(args.offset, output_fps or '25'), args.convert_delay, jumps,
+            args.input_drift, args.audio_drift, args.jitter, seed=args.seed)
+        worst = max(map(abs, errors)) if errors else float('nan')
+        mean = sum(errors) / len(errors) if errors else float('nan')
+        reaction = converter.reaction.snapshot()
+        print(f"Trames mesurées      : {len(errors)}")
+        print(f"Écart de phase       : moyen {mean:+.3f} ms, max {worst:.3f} ms")
+        print(f"Latence annoncée     : {converter.latency_ms():+.3f} ms")
+        print(f"Ruptures inattendues : {breaks}")
+        print(f"Sauts suivis         : {converter.jumps}, réaction médiane "
+              f"{reaction['0.5'] if reaction['0.5'] is not None else float('nan'):.1f} ms")
+        return 0 if worst <= args.max_offset and not breaks else 1
+
+    if args.output:
+        results, cost = multi_output_run(args.output, args.duration, args.sample_rate,
+                                         seed=args.seed)
+        print("Canal  Sortie                 Trames  Ruptures  Écart max")
+        failed = False
+        for channel, ((fps, start, offset), (decoded, breaks, worst)) in enumerate(
+                zip(args.output, results), 1):
+            label = f"{fps} {start or 'jour'}{offset:+d}"
+            error = f"{worst:6.3f} ms" if worst is not None else "-"
+            print(f"{channel:<6} {label:<22} {decoded:>6}  {breaks:>8}  {error}")
+            failed |= breaks > 0 or (worst or 0.0) > args.max_offset
+        print(f"Rendu : {cost * 1000:.2f} ms par seconde de son "
+              f"({len(args.output)} canaux)")
+        return 1 if failed else 0
+
+    if args.time_of_day:
+        steps = [tuple(map(float, step.split(':'))) for step in args.clock_step]
+        true_offsets, reported, generator = time_of_day_run(
+            args.duration, args.fps, args.sample_rate, steps, args.clock_slew,
+            args.audio_drift, args.jitter, args.latency_error, args.seed,
+            args.resume_after)
+        worst = max(map(abs, true_offsets)) if true_offsets else float('nan')
+        mean = sum(true_offsets) / len(true_offsets) if true_offsets else float('nan')
+        print(f"Trames mesurées      : {len(true_offsets)}")
+        print(f"Écart vrai           : moyen {mean:+.3f} ms, max {worst:.3f} ms")
+        print(f"Dernier écart annoncé: {generator.offset_ms:+.3f} ms")
+        print(f"Sauts détectés       : {generator.clock_steps}, recalages : {generator.resyncs}")
+        return 0 if worst <= args.max_offset else 1
+
+    if args.speed_sweep is not None:
+        if args.speed_sweep:
+            passes = [(args.sample_rate, args.speed_sweep)]
+        else:
+            passes = [(args.sample_rate, list(DEFAULT_SPEEDS) + [(0.1, 8.0)]),  # + rampe
+                      (FAST_SAMPLE_RATE, FAST_SPEEDS)]
+        print("Vitesse        Capture  Trames  Décodées   Erreur vitesse")
+        worst = 1.0
+        for sample_rate, speeds in passes:
+            results = speed_sweep(speeds, args.fps, sample_rate,
+                                  min(args.duration, 4.0), args.wav_dir, args.start)
+            for label, total, correct, error in results:
+                accuracy = correct / total if total else 0.0
+                worst = min(worst, accuracy)
+                print(f"{label:<14} {sample_rate / 1000:>3g} kHz  {total:>6}  "
+                      f"{accuracy * 100:7.2f} %  {error * 100:8.3f} %")
+        return 0 if worst >= (args.min_accuracy or SWEEP_MIN_ACCURACY) else 1
+
+    channel = Channel(gain=args.gain, noise=args.noise, lowpass=args.lowpass,
+                      highpass=args.highpass, rate_ratio=args.rate_ratio,
+                      invert=args.invert, drop_rate=args.drop, dc=args.dc, hum=args.hum,
+                      hum_frequency=args.hum_frequency,
+                      sample_rate=args.sample_rate, seed=args.seed)
+    conditioner = None
+    if args.input_filter:
+        conditioner = InputConditioner(args.sample_rate, args.fps,
+                                       **parse_stages(args.input_filter))
+    harness = LoopbackHarness(args.fps, args.start, args.sample_rate,
+                              args.block, channel, conditioner)
+    report = harness.run(args.duration)
+    print(report.summary())
+    # Une trame fausse atteindrait cues, MTC et dérive : jamais tolérée
+    return 0 if report.accuracy >= args.min_accuracy and not report.frames_wrong else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Métriques de l'interface LTC pour la supervision à distance
+Compteurs mis à jour sans verrou par la boucle du moteur et par Tk, servis en
+format texte Prometheus (/metrics) et en JSON (/metrics.json) par un serveur
+HTTP asyncio qui ne fait que lire un instantané.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import resource
+import time
+from collections import deque
+
+from ltc_codec import timecode_to_frames
+
+LATENCY_WINDOW = 1000           # Mesures gardées par fenêtre de latence
+QUANTILES = (0.5, 0.9, 0.99)
+DROP_GAP_SECONDS = 1.0          # Au-delà, un trou est un saut et non une perte
+REQUEST_TIMEOUT = 5.0           # Lecture de la requête HTTP (s)
+
+
+class LatencyWindow:
+    """Dernières mesures de latence (ms), centiles calculés à la lecture"""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self.values = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0        # Somme de toutes les mesures (_sum Prometheus)
+
+    def add(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def snapshot(self):
+        values = sorted(self.values)
+        result = {'count': self.count, 'sum': self.total}
+        for quantile in QUANTILES:
+            result[str(quantile)] = (values[int(quantile * (len(values) - 1))]
+                                     if values else None)
+        return result
+
+
+def process_usage():
+    """Temps CPU (s) et mémoire résidente (octets) du processus"""
+    times = os.times()
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return times.user + times.system, rss
+
+
+def process_wakeups():
+    """Changements de contexte cumulés de tous les threads du processus
+
+    Chaque réveil d'un thread endormi (poll, sleep, tube) en compte un.
+    """
+    return sum(map(_context_switches, glob.glob('/proc/self/task/*/status')))
+
+
+def thread_wakeups():
+    """Changements de contexte cumulés du thread appelant"""
+    return _context_switches('/proc/thread-self/status')
+
+
+def _context_switches(path):
+    """Changements de contexte volontaires et forcés lus dans un fichier status"""
+    total = 0
+    try:
+        with open(path) as f:
+            for line in f:
+                if 'ctxt_switches' in line:
+                    total += int(line.split()[1])
+    except (OSError, ValueError):
+        pass  # Thread terminé entre-temps
+    return total
+
+
+class Metrics:
+    """Compteurs de l'interface
+
+    Chaque attribut n'a qu'un seul écrivain (boucle du moteur ou Tk) ;
+    snapshot() les recopie sans rien bloquer.
+    """
+
+    def __init__(self, frame_rate):
+        self.frame_rate = frame_rate
+        self.started = time.time()
+
+        # Lecture
+        self.reader_locked = False
+        self.timecode = None
+        self.speed = 0.0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.decode_latency = LatencyWindow()
+        self.ui_latency = LatencyWindow()
+        self.display_open = LatencyWindow()     # Activation HDMI → 1re image dessinée
+        self.backend_restarts = 0
+        self._last_number = None
+
+        # Génération : sortie audio (AplaySink) et générateur de chaque
+        # canal (None si silencieux)
+        self.generator_sink = None
+        self.generators = []
+        self.restart_to_output = None   # Redémarrage à chaud → première trame (s)
+        self.start_queued = LatencyWindow()     # Départ demandé → 1re trame dans aplay
+        self.start_output = LatencyWindow()     # ... → 1re trame hors de la carte son
+        self.preroll = None                     # PrerollCache des départs
+        self.mtc = None                         # MTCOutput (--mtc)
+
+        # Économie d'énergie
+        self.low_power = False
+        self.capture_idle = False       # Capture au ralenti, faute de signal
+
+    def observe_frame(self, frame):
+        """Trame décodée : verrouillage, timecode et trames perdues"""
+        rate = self.frame_rate
+        number = timecode_to_frames(frame.timecode, rate.base, rate.drop_frame)
+        last = self._last_number
+        if last is not None and not frame.reverse:
+            gap = number - last
+            if 1 < gap <= DROP_GAP_SECONDS * rate.rate:
+                self.frames_dropped += gap - 1
+        self._last_number = number
+        self.frames_decoded += 1
+        self.reader_locked = True
+        self.timecode = frame.timecode
+        self.speed = -frame.speed if frame.reverse else frame.speed
+
+    def signal_lost(self):
+        self.reader_locked = False
+        self._last_number = None
+
+    def snapshot(self):
+        """Copie cohérente des compteurs, à l'usage du serveur HTTP"""
+        cpu, rss = process_usage()
+        sink = self.generator_sink
+        outputs = []
+        for channel, generator in enumerate(list(self.generators), 1):
+            if generator is not None:
+                output_rate = generator.frame_rate
+                timecode = generator.output_timecode()
+                outputs.append({'channel': channel, 'timecode': timecode,
+                                'frame': timecode_to_frames(timecode, output_rate.base,
+                                                            output_rate.drop_frame)})
+        preroll = self.preroll
+        mtc = self.mtc
+        rate = self.frame_rate
+        timecode = self.timecode
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'frame_rate': rate.name,
+            'drop_frame': rate.drop_frame,
+            'reader': {
+                'locked': self.reader_locked,
+                'timecode': timecode,
+                'frame': (timecode_to_frames(timecode, rate.base, rate.drop_frame)
+                          if timecode else None),
+                'speed': self.speed,
+                'frames_decoded': self.frames_decoded,
+                'frames_dropped': self.frames_dropped,
+                'restarts': self.backend_restarts,
+            },
+            'latency_ms': {
+                'decode': self.decode_latency.snapshot(),
+                'ui': self.ui_latency.snapshot(),
+                'display_open': self.display_open.snapshot(),
+                'start_queued': self.start_queued.snapshot(),
+                'start_output': self.start_output.snapshot(),
+                'mtc_quarter_frame': (mtc.jitter if mtc else LatencyWindow()).snapshot(),
+            },
+            'generator': {
+                'running': sink is not None and bool(outputs),
+                'timecode': outputs[0]['timecode'] if outputs else None,
+                'outputs': outputs,
+                'buffer_fill': sink.buffer_fill() if sink else 0.0,
+                'underruns': sink.underruns if sink else 0,
+                'restart_to_output_seconds': self.restart_to_output,
+                'preroll': {
+                    'entries': len(preroll) if preroll is not None else 0,
+                    'bytes': preroll.size if preroll is not None else 0,
+                    'hits': preroll.hits if preroll is not None else 0,
+                    'misses': preroll.misses if preroll is not None else 0,
+                },
+            },
+            'mtc': {
+                'enabled': mtc is not None,
+                'running': mtc.running if mtc else False,
+                'quarter_frames': mtc.quarter_frames if mtc else 0,
+                'full_frames': mtc.full_frames if mtc else 0,
+                'late': mtc.late if mtc else 0,
+                'dropped': mtc.sink.dropped if mtc else 0,
+            },
+            'power': {
+                'low_power': self.low_power,
+                'capture_idle': self.capture_idle,
+            },
+            'process': {
+                'cpu_seconds': cpu,
+                'rss_bytes': rss,
+                'wakeups': process_wakeups(),
+            },
+        }
+
+
+def prometheus_text(snapshot):
+    """Instantané au format d'exposition texte Prometheus"""
+    reader = snapshot['reader']
+    generator = snapshot['generator']
+    lines = []
+
+    def metric(name, kind, help_text, value, labels=''):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name}{labels} {value}")
+
+    metric('ltc_reader_locked', 'gauge', "Signal LTC verrouillé (1) ou absent (0)",
+           int(reader['locked']))
+    # Position numérique plutôt qu'en étiquette : une série par timecode
+    # ferait grossir sans fin la base qui collecte
+    metric('ltc_reader_info', 'gauge', "Cadence lue", 1,
+           f'{{frame_rate="{snapshot["frame_rate"]}",'
+           f'drop_frame="{int(snapshot["drop_frame"])}"}}')
+    if reader['frame'] is not None:
+        metric('ltc_reader_frame_number', 'gauge',
+               "Dernière trame lue, numérotée depuis 00:00:00:00", reader['frame'])
+    metric('ltc_reader_speed', 'gauge', "Vitesse lue (négative en arrière)",
+           reader['speed'])
+    metric('ltc_frames_decoded_total', 'counter', "Trames décodées",
+           reader['frames_decoded'])
+    metric('ltc_frames_dropped_total', 'counter', "Trames manquantes dans le flux lu",
+           reader['frames_dropped'])
+    metric('ltc_backend_restarts_total', 'counter', "Redémarrages de la capture audio",
+           reader['restarts'])
+
+    for kind, window in snapshot['latency_ms'].items():
+        name = f'ltc_{kind}_latency_ms'
+        lines.append(f"# HELP {name} Latence {kind} en ms")
+        lines.append(f"# TYPE {name} summary")
+        for quantile in QUANTILES:
+            value = window[str(quantile)]
+            lines.append(f'{name}{{quantile="{quantile}"}} '
+                         f'{"NaN" if value is None else f"{value:.3f}"}')
+        lines.append(f"{name}_sum {window['sum']:.3f}")
+        lines.append(f"{name}_count {window['count']}")
+
+    metric('ltc_generator_running', 'gauge', "Génération en cours",
+           int(generator['running']))
+    if generator['outputs']:
+        lines.append("# HELP ltc_generator_output_frame Trame en cours de sortie par "
+                     "canal, numérotée depuis 00:00:00:00")
+        lines.append("# TYPE ltc_generator_output_frame gauge")
+        for output in generator['outputs']:
+            lines.append(f'ltc_generator_output_frame{{channel="{output["channel"]}"}} '
+                         f'{output["frame"]}')
+    metric('ltc_generator_buffer_fill_ratio', 'gauge', "Remplissage du tampon de sortie",
+           f"{generator['buffer_fill']:.3f}")
+    metric('ltc_generator_underruns_total', 'counter', "Sous-alimentations de la sortie",
+           generator['underruns'])
+    if generator['restart_to_output_seconds'] is not None:
+        metric('ltc_restart_to_output_seconds', 'gauge',
+               "Délai du lancement à la première trame reprise",
+               f"{generator['restart_to_output_seconds']:.3f}")
+    preroll = generator['preroll']
+    metric('ltc_preroll_bytes', 'gauge', "Mémoire des départs pré-rendus", preroll['bytes'])
+    metric('ltc_preroll_hits_total', 'counter', "Départs servis par le pré-rendu",
+           preroll['hits'])
+    metric('ltc_preroll_misses_total', 'counter', "Départs encodés faute de pré-rendu",
+           preroll['misses'])
+    mtc = snapshot['mtc']
+    if mtc['enabled']:
+        metric('ltc_mtc_running', 'gauge', "Quarter-frames MTC en cours d'émission",
+               int(mtc['running']))
+        metric('ltc_mtc_quarter_frames_total', 'counter', "Quarter-frames MTC envoyés",
+               mtc['quarter_frames'])
+        metric('ltc_mtc_full_frames_total', 'counter',
+               "Full-frames MTC envoyés (départs, sauts, arrêts)", mtc['full_frames'])
+        metric('ltc_mtc_late_total', 'counter',
+               "Cycles MTC repris faute d'avoir tenu l'échéance", mtc['late'])
+        metric('ltc_mtc_dropped_total', 'counter', "Messages MTC refusés par la sortie",
+               mtc['dropped'])
+    metric('ltc_low_power', 'gauge', "Mode économie d'énergie actif",
+           int(snapshot['power']['low_power']))
+    metric('ltc_capture_idle', 'gauge', "Capture au ralenti faute de signal",
+           int(snapshot['power']['capture_idle']))
+    metric('process_cpu_seconds_total', 'counter', "Temps CPU utilisateur et système",
+           f"{snapshot['process']['cpu_seconds']:.2f}")
+    metric('process_resident_memory_bytes', 'gauge', "Mémoire résidente",
+           snapshot['process']['rss_bytes'])
+    metric('process_wakeups_total', 'counter',
+           "Changements de contexte de tous les threads (réveils)",
+           snapshot['process']['wakeups'])
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serveur HTTP minimal des métriques, dans la boucle asyncio du moteur
+
+    La boucle ne fait qu'accepter et répondre : le relevé (lecture de /proc,
+    tri des fenêtres de latence) et sa mise en forme se font dans un thread,
+    sans retarder la capture ni le décodage.
+    """
+
+    def __init__(self, metrics, port, host='0.0.0.0'):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            while True:
+                line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            fields = request.decode('latin-1').split()
+            path = fields[1].split('?')[0] if len(fields) > 1 else ''
+            if path == '/metrics':
+                status = '200 OK'
+                body = await asyncio.to_thread(
+                    lambda: prometheus_text(self.metrics.snapshot()))
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif path == '/metrics.json':
+                status = '200 OK'
+                body = await asyncio.to_thread(
+                    lambda: json.dumps(self.metrics.snapshot()))
+                content_type = 'application/json'
+            else:
+                status = '404 Not Found'
+                body = 'Not Found\n'
+                content_type = 'text/plain'
+            data = body.encode('utf-8')
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n"
+                         .encode('latin-1') + data)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Sortie MIDI Timecode (MTC) tirée de la même horloge que le LTC
+Quarter-frames (quatre par trame, cycle de huit sur deux trames) et messages
+full-frame aux sauts et à l'arrêt, pour les séquenceurs et pupitres lumière
+qui suivent le MTC plutôt que le LTC. La position vient du lecteur ou d'un
+générateur, comme pour l'affichage distant ; un thread dédié envoie chaque
+quarter-frame à son échéance absolue, calculée depuis ce modèle, et mesure
+son retard sur l'échéance idéale.
+"""
+
+import math
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+
+from ltc_codec import frames_per_day, frames_to_timecode
+from ltc_metrics import LatencyWindow
+
+JUMP_TOLERANCE = 0.5      # Écart à la prédiction (trames) traité comme un saut
+SPEED_TOLERANCE = 0.01    # Écart de vitesse qui recale l'échéancier
+MIN_SPEED = 0.1           # En dessous (ou en arrière) : arrêt, full-frames seuls
+TRACKING = 0.1            # Part de l'écart corrigée à chaque position reçue
+STALE_AFTER = 0.5         # Sans position depuis (s) : arrêt des quarter-frames
+
+QUARTER_FRAME = 0xF1
+FULL_FRAME = bytes((0xF0, 0x7F, 0x7F, 0x01, 0x01))   # Tous appareils, MTC full-frame
+SYSEX_END = 0xF7
+
+
+def rate_code(rate):
+    """Code de cadence MTC : 0 = 24, 1 = 25, 2 = 29.97 drop-frame, 3 = 30
+
+    Le 29.97 non drop n'a pas de code propre : il passe pour du 30, comme
+    le font les consoles.
+    """
+    if rate.base == 24:
+        return 0
+    if rate.base == 25:
+        return 1
+    return 2 if rate.drop_frame else 3
+
+
+def timecode_fields(number, rate):
+    """(heures, minutes, secondes, trames) de la trame `number` depuis minuit"""
+    return tuple(map(int, re.split(r'[:;.]', frames_to_timecode(
+        number, rate.base, rate.drop_frame))))
+
+
+def quarter_frame(piece, fields, code):
+    """Message quarter-frame `piece` (0 à 7) du timecode `fields`"""
+    hours, minutes, seconds, frames = fields
+    value = (frames, seconds, minutes, (code << 5) | hours)[piece >> 1]
+    nibble = value >> 4 if piece & 1 else value & 0x0F
+    return bytes((QUARTER_FRAME, (piece << 4) | nibble))
+
+
+def full_frame(fields, code):
+    """Message full-frame (SysEx universel temps réel) du timecode `fields`"""
+    hours, minutes, seconds, frames = fields
+    return FULL_FRAME + bytes(((code << 5) | hours, minutes, seconds, frames, SYSEX_END))
+
+
+class RawMidiSink:
+    """Octets MIDI écrits dans un fichier : port MIDI brut (/dev/snd/midiC1D0,
+    /dev/midi1), tube nommé ou fichier ordinaire pour les essais
+
+    Écriture non bloquante : un message que le port ne peut pas prendre
+    est compté perdu plutôt que de retarder les suivants.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dropped = 0
+        self._fd = None
+
+    def open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_NONBLOCK, 0o644)
+        if os.path.isfile(self.path):
+            os.ftruncate(self._fd, 0)
+        return self
+
+    def write(self, message):
+        try:
+            os.write(self._fd, message)
+        except BlockingIOError:
+            self.dropped += 1
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __str__(self):
+        return self.path
+
+
+class SequencerSink(RawMidiSink):
+    """Port du séquenceur ALSA (logiciels, autres interfaces MIDI)
+
+    Le MTC est écrit dans le port brut d'une carte virtuelle snd-virmidi
+    (sudo modprobe snd-virmidi), dont le port séquenceur est relié à
+    `destination` (« 128:0 », « Ardour ») par aconnect.
+    """
+
+    def __init__(self, destination):
+        super().__init__(None)
+        self.destination = destination
+        self.port = None
+
+    def open(self):
+        card, client = find_virmidi()
+        self.path = f'/dev/snd/midiC{card}D0'
+        super().open()
+        self.port = f'{client}:0'
+        try:
+            subprocess.run(['aconnect', self.port, self.destination], check=True,
+                           capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            super().close()
+            raise OSError(f"aconnect {self.port} {self.destination} : "
+                          f"{e.stderr.strip() or e.returncode}") from e
+        return self
+
+    def close(self):
+        if self.port:
+            subprocess.run(['aconnect', '-d', self.port, self.destination],
+                           capture_output=True)
+            self.port = None
+        super().close()
+
+    def __str__(self):
+        return f"séquenceur → {self.destination}"
+
+
+def find_virmidi():
+    """(numéro de carte, client séquenceur) de la première carte snd-virmidi"""
+    try:
+        with open('/proc/asound/cards') as f:
+            cards = f.read()
+    except OSError as e:
+        raise OSError(f"ALSA indisponible : {e}") from e
+    match = re.search(r'^\s*(\d+)\s+\[.*?\]:\s+VirMIDI', cards, re.MULTILINE)
+    if not match:
+        raise OSError("pas de carte MIDI virtuelle (sudo modprobe snd-virmidi)")
+    card = int(match.group(1))
+    listing = subprocess.run(['aconnect', '-l'], capture_output=True, text=True).stdout
+    match = re.search(rf"^client (\d+): 'Virtual Raw MIDI {card}-0'", listing, re.MULTILINE)
+    if not match:
+        raise OSError(f"client séquenceur de la carte virtuelle {card} introuvable")
+    return card, int(match.group(1))
+
+
+class UDPSink:
+    """Un datagramme par message MIDI, pour les essais et les mesures à distance"""
+
+    def __init__(self, host, port):
+        self.address = (host, int(port))
+        self.dropped = 0
+        self.sock = None
+
+    def open(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        return self
+
+    def write(self, message):
+        try:
+            self.sock.sendto(message, self.address)
+        except (BlockingIOError, ConnectionRefusedError):
+            self.dropped += 1
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def __str__(self):
+        return f"udp:{self.address[0]}:{self.address[1]}"
+
+
+def make_sink(spec):
+    """Sortie MTC décrite par `spec` : « udp:HÔTE:PORT », « seq:DESTINATION »
+    ou chemin d'un port MIDI brut (ou d'un fichier)"""
+    kind, _, rest = spec.partition(':')
+    if kind == 'udp':
+        host, _, port = rest.rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError(f"Sortie MTC invalide : {spec} (udp:HÔTE:PORT)")
+        return UDPSink(host, port)
+    if kind == 'seq':
+        if not rest:
+            raise ValueError(f"Sortie MTC invalide : {spec} (seq:CLIENT:PORT)")
+        return SequencerSink(rest)
+    if not spec:
+        raise ValueError("Sortie MTC vide")
+    return RawMidiSink(spec)
+
+
+class MTCOutput:
+    """Émetteur MTC cadencé par une position de timecode
+
+    update() et freeze() s'appellent depuis la boucle du moteur ; le thread
+    d'émission lit le modèle (position à un instant monotone, vitesse,
+    cadence) et en déduit l'échéance de chaque quarter-frame. Les petites
+    corrections de position ne le réveillent pas : seuls un saut, un
+    changement de vitesse ou un arrêt l'interrompent.
+    """
+
+    def __init__(self, sink, clock=time.monotonic):
+        self.sink = sink
+        self.clock = clock
+        self.jitter = LatencyWindow()    # Retard de chaque quarter-frame sur l'idéal (ms)
+        self.quarter_frames = 0
+        self.full_frames = 0
+        self.locates = 0
+        self.late = 0                    # Cycles abandonnés, thread trop en retard
+        self.errors = 0
+        self.last_error = None
+        self.timecode = None             # Dernier timecode envoyé
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._model = None               # (position, instant, vitesse, cadence)
+        self._updated = None             # Instant de la dernière position reçue
+        self._locate = False             # Full-frame puis nouveau cycle
+        self._shown = None               # Trame du dernier full-frame à l'arrêt
+        self._next = None                # Prochain quart de trame (depuis minuit)
+        self._stopping = False
+        self._worker = None
+
+    @property
+    def running(self):
+        """Quarter-frames en cours d'émission"""
+        model = self._model
+        return model is not None and model[2] >= MIN_SPEED and self._next is not None
+
+    def start(self):
+        """Ouvre la sortie et démarre le thread d'émission"""
+        if self._worker is None:
+            self.sink.open()
+            self._worker = threading.Thread(target=self._run, name='ltc-mtc', daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self):
+        """Arrête le thread d'émission et ferme la sortie"""
+        if self._worker is not None:
+            self._stopping = True
+            self._wake.set()
+            self._worker.join()
+            self._worker = None
+            self.sink.close()
+
+    def update(self, position, rate, speed=1.0, mono=None):
+        """Position observée (trames depuis minuit) à l'instant monotone `mono`"""
+        now = self.clock()
+        if mono is None:
+            mono = now
+        day = frames_per_day(rate.base, rate.drop_frame)
+        with self._lock:
+            self._updated = now
+            model = self._model
+            if model is None or rate is not model[3]:
+                self._set(position % day, mono, speed, rate, locate=True)
+                return
+            anchor, at, anchor_speed, _ = model
+            predicted = anchor + (mono - at) * rate.rate * anchor_speed
+            error = (position - predicted + day / 2) % day - day / 2
+            if abs(error) > JUMP_TOLERANCE:
+                self._set(position % day, mono, speed, rate, locate=True)
+            elif (speed >= MIN_SPEED) != (anchor_speed >= MIN_SPEED):
+                self._set(predicted + error, mono, speed, rate, locate=True)
+            elif abs(speed - anchor_speed) > SPEED_TOLERANCE:
+                # Nouvelle vitesse : l'échéancier repart de ce point, sans saut
+                self._set(predicted + error, mono, speed, rate)
+            elif anchor_speed < MIN_SPEED:
+                # Arrêt ou marche arrière : un full-frame par trame affichée
+                self._model = (predicted + error, mono, speed, rate)
+                if math.floor(position) != self._shown:
+                    self._locate = True
+                    self._wake.set()
+            else:
+                # Lecture régulière : on suit l'horloge de la source en douceur
+                self._model = (predicted + TRACKING * error, mono, anchor_speed, rate)
+
+    def freeze(self):
+        """Source perdue ou arrêtée : fin des quarter-frames, full-frame de la
+        dernière position prévue"""
+        with self._lock:
+            model = self._model
+            if model is None or model[2] == 0:
+                return
+            position, at, speed, rate = model
+            self._set(position + (self.clock() - at) * rate.rate * speed,
+                      self.clock(), 0.0, rate, locate=True)
+
+    def _set(self, position, mono, speed, rate, locate=False):
+        self._model = (position, mono, speed, rate)
+        if locate:
+            self._locate = True
+        self._wake.set()
+
+    def _run(self):
+        cycle = None     # (trame paire, champs, code) du cycle en cours
+        while not self._stopping:
+            self._wake.clear()
+            with self._lock:
+                model, locate = self._model, self._locate
+                self._locate = False
+                if (model is not None and model[2] >= MIN_SPEED
+                        and self.clock() - self._updated > STALE_AFTER):
+                    # Plus de position : la source s'est arrêtée sans prévenir
+                    position, at, speed, rate = model
+                    model = (position + (self.clock() - at) * rate.rate * speed,
+                             self.clock(), 0.0, rate)
+                    self._model = model
+                    locate = True
+            if model is None:
+                self._wake.wait()
+                continue
+            position, at, speed, rate = model
+            day = frames_per_day(rate.base, rate.drop_frame)
+            if locate:
+                self._locate_at(position + (self.clock() - at) * rate.rate * speed,
+                                speed, rate, day)
+                cycle = None
+            if speed < MIN_SPEED or self._next is None:
+                self._next = None
+                self._wake.wait()
+                continue
+
+            # Échéance absolue du prochain quart de trame, d'après le modèle
+            deadline = at + (self._next / 4 - position) / (rate.rate * speed)
+            delay = deadline - self.clock()
+            if delay > 0 and self._wake.wait(delay):
+                continue    # Modèle changé : échéance à recalculer
+            late = self.clock() - deadline
+            if late > 1 / (rate.rate * speed):
+                # Plus d'une trame de retard : nouveau départ plutôt qu'une rafale
+                self.late += 1
+                with self._lock:
+                    self._locate = True
+                continue
+
+            number = self._next // 8 * 2
+            if cycle is None or cycle[0] != number:
+                cycle = (number, timecode_fields(number % day, rate), rate_code(rate))
+            self._send(quarter_frame(self._next % 8, cycle[1], cycle[2]))
+            self.quarter_frames += 1
+            self.jitter.add(late * 1000)
+            if self._next % 4 == 0:
+                self.timecode = frames_to_timecode(self._next // 4 % day,
+                                                   rate.base, rate.drop_frame)
+            self._next += 1
+
+    def _locate_at(self, position, speed, rate, day):
+        """Full-frame de la trame en cours ; en lecture, le cycle suivant
+        commence à la prochaine trame paire"""
+        number = math.floor(position)
+        self._send(full_frame(timecode_fields(number % day, rate), rate_code(rate)))
+        self.full_frames += 1
+        self.timecode = frames_to_timecode(number % day, rate.base, rate.drop_frame)
+        self._shown = number
+        if speed >= MIN_SPEED:
+            self.locates += 1
+            self._next = 8 * math.ceil(position / 2)
+        else:
+            self._next = None
+
+    def _send(self, message):
+        try:
+            self.sink.write(message)
+        except OSError as e:
+            self.errors += 1
+            self.last_error = str(e)
+
+    def summary(self):
+        """Résumé pour l'interface"""
+        if self._model is None:
+            return f"MTC → {self.sink} : en attente de timecode"
+        state = "en lecture" if self.running else "à l'arrêt"
+        text = f"MTC → {self.sink} : {state} {self.timecode or ''}".rstrip()
+        jitter = self.jitter.snapshot()
+        if jitter['0.5'] is not None:
+            text += (f", quarter-frames à +{jitter['0.5']:.2f} ms "
+                     f"(p99 +{jitter['0.99']:.2f} ms)")
+        dropped = self.sink.dropped
+        if self.late or dropped or self.errors:
+            text += f", {self.late} retards, {dropped} perdus, {self.errors} erreurs"
+        return text
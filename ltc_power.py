@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Mode économie d'énergie pour les installations sur batterie
+Choisit les cadences du moteur et de l'affichage selon ce qui se passe : sans
+signal, la capture passe à de longues périodes ALSA ; quand personne ne
+regarde chaque trame (pas d'écran HDMI), la fenêtre de contrôle est
+rafraîchie quelques fois par seconde ; les résumés (état des sorties,
+dérive) sont espacés. Hors de ce mode, les cadences restent celles d'origine.
+"""
+
+DISPLAY_INTERVAL = 0.0              # Fenêtre de contrôle : chaque trame lue
+LOW_POWER_DISPLAY_INTERVAL = 0.2    # En économie, sans écran HDMI : 5 fois par seconde
+REPORT_INTERVAL = 1.0               # État des sorties, dérive, mesures (s)
+LOW_POWER_REPORT_INTERVAL = 5.0
+IDLE_AFTER = 5.0                    # Sans trame depuis (s) : capture au ralenti
+IDLE_PERIOD = 16384                 # Période ALSA au ralenti (échantillons, ~340 ms)
+
+
+class PowerPolicy:
+    """Cadences selon le mode et l'activité
+
+    Modifié par Tk (booléens), lu sans verrou par la boucle du moteur.
+    """
+
+    def __init__(self, low_power=False):
+        self.low_power = low_power
+        self.display_active = False     # Un écran suit chaque trame (HDMI)
+
+    def display_interval(self):
+        """Intervalle minimal entre deux trames lues envoyées à Tk (s)"""
+        if self.low_power and not self.display_active:
+            return LOW_POWER_DISPLAY_INTERVAL
+        return DISPLAY_INTERVAL
+
+    def report_interval(self):
+        """Intervalle des résumés périodiques (s)"""
+        return LOW_POWER_REPORT_INTERVAL if self.low_power else REPORT_INTERVAL
+
+    def capture_period(self, silent_for):
+        """Période ALSA de la capture après `silent_for` secondes sans trame
+
+        None garde la période d'arecord, qui décode au plus tôt.
+        """
+        if self.low_power and silent_for >= IDLE_AFTER:
+            return IDLE_PERIOD
+        return None
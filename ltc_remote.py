@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Affichage du timecode à distance (tablettes, téléphones)
+Un serveur HTTP asyncio, dans la boucle du moteur, sert une page plein écran
+et lui pousse l'état du timecode par WebSocket. Seuls les changements que la
+page ne peut pas prévoir (saut, changement de vitesse ou de cadence, statut)
+sont envoyés, en binaire compact : la page interpole elle-même les trames.
+Un défilement régulier ne coûte qu'un message toutes les RESYNC_INTERVAL
+secondes par client, quel que soit le nombre de trames.
+"""
+
+import asyncio
+import base64
+import hashlib
+import struct
+import time
+
+from ltc_codec import frames_per_day
+
+RESYNC_INTERVAL = 2.0       # Recalage périodique des clients (s)
+JUMP_TOLERANCE = 0.5        # Écart à la prédiction (trames) qui déclenche un envoi
+SPEED_TOLERANCE = 0.01      # Écart de vitesse qui déclenche un envoi
+MAX_CLIENT_BUFFER = 65536   # Au-delà (octets en attente), le client trop lent est coupé
+MAX_CLIENT_FRAME = 4096     # Les clients n'envoient que des trames de contrôle
+REQUEST_TIMEOUT = 5.0       # Lecture de la requête HTTP (s)
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# Message binaire : un octet de présence puis les champs présents, dans cet
+# ordre, en petit-boutiste
+FIELD_POSITION = 0x01       # float64 : position (trames depuis minuit) à l'envoi
+FIELD_SPEED = 0x02          # float32 : vitesse (0 figé, négative en arrière)
+FIELD_RATE = 0x04           # uint8 base, uint8 drop-frame, float64 débit réel
+FIELD_STATUS = 0x08         # uint8 longueur puis texte UTF-8
+
+PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Timecode LTC</title>
+<style>
+html, body { margin: 0; height: 100%; background: #000; color: #0f0;
+             font-family: 'Courier New', monospace; }
+body { display: flex; flex-direction: column; align-items: center;
+       justify-content: center; user-select: none; }
+#tc { font-size: 15vw; font-weight: bold; }
+#status { font-size: 4vw; color: #fff; }
+.off #tc { color: #555; }
+</style>
+</head>
+<body class="off">
+<div id="tc">--:--:--:--</div>
+<div id="status">Connexion...</div>
+<script>
+// Modèle recopié du serveur : position à l'instant `at`, puis interpolation
+var state = {position: null, at: 0, speed: 0, base: 25, drop: false, rate: 25};
+var tc = document.getElementById('tc');
+var statusLine = document.getElementById('status');
+var shown = '';
+var decoder = new TextDecoder();
+
+function pad(n) { return (n < 10 ? '0' : '') + n; }
+
+function timecode(n) {
+  var base = state.base, drop = state.drop ? Math.floor(base / 15) : 0;
+  var day = drop ? 24 * 6 * (base * 600 - 9 * drop) : base * 86400;
+  n = ((n % day) + day) % day;
+  if (drop) {
+    var perMinute = base * 60 - drop, perTen = base * 600 - 9 * drop;
+    var tens = Math.floor(n / perTen), rest = n % perTen;
+    n += 9 * drop * tens;
+    if (rest > drop) n += drop * Math.floor((rest - drop) / perMinute);
+  }
+  return pad(Math.floor(n / (base * 3600)) % 24) + ':' + pad(Math.floor(n / (base * 60)) % 60)
+    + ':' + pad(Math.floor(n / base) % 60) + ':' + pad(n % base);
+}
+
+function current(now) {
+  return state.position + (now - state.at) / 1000 * state.rate * state.speed;
+}
+
+function receive(event) {
+  var view = new DataView(event.data), fields = view.getUint8(0), offset = 1;
+  if (fields & 1) {
+    state.position = view.getFloat64(offset, true);
+    state.at = performance.now();
+    offset += 8;
+  }
+  if (fields & 2) { state.speed = view.getFloat32(offset, true); offset += 4; }
+  if (fields & 4) {
+    state.base = view.getUint8(offset);
+    state.drop = view.getUint8(offset + 1) !== 0;
+    state.rate = view.getFloat64(offset + 2, true);
+    offset += 10;
+  }
+  if (fields & 8) {
+    var length = view.getUint8(offset);
+    statusLine.textContent = decoder.decode(new Uint8Array(event.data, offset + 1, length));
+  }
+}
+
+function draw() {
+  if (state.position !== null) {
+    var text = timecode(Math.floor(current(performance.now())));
+    if (text !== shown) { shown = text; tc.textContent = text; }
+  }
+  requestAnimationFrame(draw);
+}
+
+function connect() {
+  var scheme = location.protocol === 'https:' ? 'wss://' : 'ws://';
+  var socket = new WebSocket(scheme + location.host + '/ws');
+  socket.binaryType = 'arraybuffer';
+  socket.onopen = function () { document.body.className = ''; };
+  socket.onmessage = receive;
+  socket.onclose = function () {
+    // Figé sur la dernière position tant que la connexion est perdue
+    if (state.position !== null) {
+      var now = performance.now();
+      state.position = current(now);
+      state.at = now;
+    }
+    state.speed = 0;
+    document.body.className = 'off';
+    statusLine.textContent = 'Connexion perdue, nouvel essai...';
+    setTimeout(connect, 1000);
+  };
+}
+
+document.body.onclick = function () {
+  var page = document.documentElement;
+  if (page.requestFullscreen) page.requestFullscreen();
+};
+connect();
+requestAnimationFrame(draw);
+</script>
+</body>
+</html>
+"""
+
+
+def websocket_frame(payload, opcode=0x2):
+    """Trame WebSocket serveur (non masquée, non fragmentée)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class RemoteDisplayServer:
+    """Serveur de l'affichage distant, dans la boucle asyncio du moteur
+
+    update(), freeze() et set_status() s'appellent depuis cette même
+    boucle ; chaque message est encodé une seule fois pour tous les clients.
+    """
+
+    def __init__(self, port, host='0.0.0.0'):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.clients = set()
+        self.messages_sent = 0      # Messages diffusés (un par envoi, tous clients)
+        self.clients_dropped = 0
+        self.rate = None
+        self.speed = 0.0
+        self.status = ''
+        self.anchor = None          # (position, instant monotone) vus par les clients
+        self._day = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def update(self, position, rate, speed=1.0, mono=None):
+        """Position observée (trames depuis minuit) à l'instant monotone `mono`
+
+        N'envoie que ce que les clients ne peuvent pas prévoir ; retourne
+        True si un message est parti.
+        """
+        now = time.monotonic()
+        if rate is not self.rate:
+            self._day = frames_per_day(rate.base, rate.drop_frame)
+        if mono is not None:
+            position += (now - mono) * rate.rate * speed
+        position %= self._day
+
+        fields = 0
+        if rate is not self.rate:
+            fields |= FIELD_RATE | FIELD_SPEED | FIELD_POSITION
+        elif abs(speed - self.speed) > SPEED_TOLERANCE:
+            fields |= FIELD_SPEED | FIELD_POSITION
+        elif now - self.anchor[1] >= RESYNC_INTERVAL:
+            fields |= FIELD_POSITION
+        else:
+            day = self._day
+            error = (position - self._predict(now) + day / 2) % day - day / 2
+            if abs(error) > JUMP_TOLERANCE:
+                fields |= FIELD_POSITION
+        if not fields:
+            return False
+
+        self.rate = rate
+        if fields & FIELD_SPEED:
+            self.speed = speed
+        self.anchor = (position, now)
+        self._broadcast(self._message(fields))
+        return True
+
+    def freeze(self):
+        """Signal perdu : les clients s'arrêtent sur la position prévue"""
+        if self.anchor is not None and self.speed:
+            self.update(self._predict(time.monotonic()), self.rate, 0.0)
+
+    def set_status(self, text):
+        """Ligne de statut sous le timecode ; envoyée seulement si elle change"""
+        if text == self.status:
+            return False
+        self.status = text
+        self._broadcast(self._message(FIELD_STATUS))
+        return True
+
+    def _predict(self, now):
+        position, at = self.anchor
+        return (position + (now - at) * self.rate.rate * self.speed) % self._day
+
+    def _message(self, fields):
+        if self.anchor is None:
+            fields &= ~(FIELD_POSITION | FIELD_SPEED | FIELD_RATE)
+        payload = bytearray([fields])
+        if fields & FIELD_POSITION:
+            payload += struct.pack('<d', self._predict(time.monotonic()))
+        if fields & FIELD_SPEED:
+            payload += struct.pack('<f', self.speed)
+        if fields & FIELD_RATE:
+            rate = self.rate
+            payload += struct.pack('<BBd', rate.base, rate.drop_frame, rate.rate)
+        if fields & FIELD_STATUS:
+            status = self.status.encode('utf-8')[:255]
+            payload += bytes([len(status)]) + status
+        return websocket_frame(bytes(payload))
+
+    def _broadcast(self, data):
+        self.messages_sent += 1
+        for writer in list(self.clients):
+            transport = writer.transport
+            if transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                # Réseau saturé : ce client rattrapera en se reconnectant
+                self.clients.discard(writer)
+                self.clients_dropped += 1
+                transport.abort()
+                continue
+            writer.write(data)
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            fields = request.decode('latin-1').split()
+            path = fields[1].split('?')[0] if len(fields) > 1 else ''
+            if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                await self._serve_client(reader, writer, headers)
+                return
+            if path in ('/', '/index.html'):
+                status = '200 OK'
+                body = PAGE
+                content_type = 'text/html; charset=utf-8'
+            else:
+                status = '404 Not Found'
+                body = 'Not Found\n'
+                content_type = 'text/plain'
+            data = body.encode('utf-8')
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n"
+                         .encode('latin-1') + data)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_client(self, reader, writer, headers):
+        """Poignée de main WebSocket, état complet, puis contrôle jusqu'à la fermeture"""
+        key = headers.get('sec-websocket-key', '').encode('latin-1')
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n")
+                     .encode('latin-1'))
+        writer.write(self._message(FIELD_POSITION | FIELD_SPEED | FIELD_RATE | FIELD_STATUS))
+        self.clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(2)
+                opcode = header[0] & 0x0f
+                length = header[1] & 0x7f
+                if length == 126:
+                    length, = struct.unpack('!H', await reader.readexactly(2))
+                elif length == 127:
+                    length, = struct.unpack('!Q', await reader.readexactly(8))
+                if length > MAX_CLIENT_FRAME:
+                    break
+                mask = await reader.readexactly(4) if header[1] & 0x80 else bytes(4)
+                payload = bytes(byte ^ mask[i % 4] for i, byte
+                                in enumerate(await reader.readexactly(length)))
+                if opcode == 0x8:
+                    writer.write(websocket_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(websocket_frame(payload, 0xA))
+        finally:
+            self.clients.discard(writer)
+
+    async def close(self):
+        self.server.close()
+        for writer in list(self.clients):
+            writer.transport.abort()
+        self.clients.clear()
+        await self.server.wait_closed()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+État persistant de l'interface LTC pour le redémarrage à chaud
+Petit fichier JSON réécrit de façon atomique (fichier temporaire, fsync,
+rename), au plus une fois par intervalle.
+"""
+
+import json
+import os
+import time
+
+STATE_PATH = os.path.expanduser('~/.config/ltc-interface/state.json')
+SAVE_INTERVAL = 1.0   # Écart minimal entre deux écritures (s)
+HEARTBEAT = 10.0      # Rafraîchissement de la position d'un timecode libre (s)
+
+
+def process_uptime():
+    """Secondes écoulées depuis la création du processus, ou None"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Le nom du programme (2e champ) peut contenir des espaces
+            fields = f.read().rsplit(')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, IndexError, ValueError, AttributeError):
+        return None
+
+
+class StateStore:
+    """Dictionnaire d'état sauvegardé sur disque
+
+    update() modifie l'état en mémoire ; save() l'écrit si quelque chose a
+    changé et si la dernière écriture date d'au moins `interval` secondes.
+    L'appelant le rappelle périodiquement pour vider les changements retenus.
+    """
+
+    def __init__(self, path=STATE_PATH, interval=SAVE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.state = {}
+        self.writes = 0
+        self._dirty = False
+        self._last_write = 0.0
+
+    def load(self):
+        """Relit l'état sauvegardé ; {} si absent ou illisible"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.state = state if isinstance(state, dict) else {}
+        return dict(self.state)
+
+    def update(self, **fields):
+        """Modifie l'état et tente une écriture"""
+        for key, value in fields.items():
+            if self.state.get(key) != value:
+                self.state[key] = value
+                self._dirty = True
+        self.save()
+
+    def save(self, force=False):
+        """Écrit l'état s'il a changé ; True si le fichier a été réécrit"""
+        now = time.monotonic()
+        if not self._dirty or (not force and now - self._last_write < self.interval):
+            return False
+        directory = os.path.dirname(self.path)
+        temporary = self.path + '.tmp'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+
+            # Le renommage lui-même doit survivre à une coupure de courant
+            descriptor = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+        except OSError as e:
+            self._last_write = now
+            print(f"Impossible de sauvegarder l'état: {e}")
+            return False
+        self._dirty = False
+        self._last_write = now
+        self.writes += 1
+        return True
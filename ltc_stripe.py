@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Striping LTC hors ligne dans des fichiers WAV/BWF existants
+Rend le LTC de toute la durée d'un fichier avec l'encodeur en processus, à
+partir de la référence temporelle BWF (bext), et l'écrit dans un canal choisi
+(remplacé, ou ajouté après les autres). Le fichier est traité bloc par bloc
+par projection mémoire : les autres canaux sont recopiés tels quels et aucun
+fichier n'est chargé en entier. Un lot de fichiers est réparti sur un pool de
+processus.
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ltc_codec import (BGF_UNSPECIFIED, BITS_PER_FRAME, LTCFrame, frames_per_day,
+                       frames_to_timecode, get_frame_rate, parse_user_bits,
+                       timecode_to_frames)
+from ltc_wav import WavLayout
+
+STRIPE_BLOCK = 65536      # Échantillons par canal et par bloc (~1,4 s à 48 kHz)
+COPY_CHUNK = 1 << 20      # Recopie des chunks hors données (octets)
+
+
+class StripeEncoder:
+    """LTC continu rendu par blocs, aligné sur une position en échantillons
+
+    Même signal que LTCEncoder (biphase mark, demi-cellules aux frontières
+    entières de la position fractionnaire), mais une salve de trames est
+    rendue d'un coup par NumPy. `start_sample` est la position du premier
+    échantillon depuis minuit (la référence temporelle BWF) : la trame en
+    cours à cet instant est rendue puis coupée, les suivantes tombent sur
+    leurs frontières exactes.
+    """
+
+    def __init__(self, fps, sample_rate, start_sample=0, user_bits=0,
+                 bgf=BGF_UNSPECIFIED, amplitude=0.5):
+        self.frame_rate = rate = get_frame_rate(fps)
+        self.user_bits = user_bits
+        self.bgf = bgf
+        self.level = int(32767 * amplitude)
+        self.day = frames_per_day(rate.base, rate.drop_frame)
+        self.samples_per_frame = sample_rate / rate.rate
+        self.frame_number = int(start_sample // self.samples_per_frame)
+        self.first_timecode = frames_to_timecode(self.frame_number % self.day,
+                                                 rate.base, rate.drop_frame)
+        self._half_cell = self.samples_per_frame / BITS_PER_FRAME / 2
+        self._half_cells = 0          # Demi-cellules rendues depuis la première trame
+        self._polarity = 1
+        self._skip = round(start_sample - self.frame_number * self.samples_per_frame)
+        self._pending = np.zeros(0, np.int16)
+
+    def render(self, count):
+        """`count` échantillons suivants, en int16"""
+        missing = count + self._skip - len(self._pending)
+        if missing > 0:
+            frames = int(missing / self.samples_per_frame) + 1
+            self._pending = np.concatenate((self._pending, self._encode(frames)))
+        block = self._pending[self._skip:self._skip + count]
+        self._pending = self._pending[self._skip + count:]
+        self._skip = 0
+        return block
+
+    def _encode(self, count):
+        """`count` trames suivantes"""
+        rate = self.frame_rate
+        words = b''.join(
+            LTCFrame.from_timecode(
+                frames_to_timecode(number % self.day, rate.base, rate.drop_frame),
+                rate.drop_frame, self.user_bits, self.bgf).to_bits(rate.base).to_bytes(10, 'little')
+            for number in range(self.frame_number, self.frame_number + count))
+        self.frame_number += count
+        bits = np.unpackbits(np.frombuffer(words, np.uint8), bitorder='little')
+
+        # Inversion en début de chaque cellule, plus une au milieu des 1
+        flips = np.ones(2 * len(bits), np.int8)
+        flips[1::2] = bits
+        levels = np.where(np.cumsum(flips) & 1, -self._polarity, self._polarity)
+        self._polarity = int(levels[-1])
+
+        edges = np.floor((self._half_cells + np.arange(len(flips) + 1)) * self._half_cell)
+        self._half_cells += len(flips)
+        return np.repeat((levels * self.level).astype(np.int16),
+                         np.diff(edges.astype(np.int64)))
+
+
+def to_samples(ltc, bits, is_float):
+    """Échantillons int16 au format du fichier, en octets (échantillons, largeur)"""
+    if is_float:
+        converted = (ltc / 32768).astype('<f4')
+    elif bits == 16:
+        converted = ltc.astype('<i2')
+    else:
+        converted = ltc.astype('<i4') << 16
+        if bits == 24:
+            return converted.view(np.uint8).reshape(-1, 4)[:, 1:]
+    return converted.view(np.uint8).reshape(-1, bits // 8)
+
+
+def _write_header(layout, out, channels):
+    """Recopie les chunks précédant les données, format mis à jour ; retourne
+    la position des données dans la sortie"""
+    added = channels - layout.channels
+    data_size = layout.frames * layout.block_align // layout.channels * channels
+    if data_size > 0xFFFFFFFF - 4096:
+        raise ValueError(f"{layout.path} : sortie au-delà de 4 Go (RF64 non géré)")
+    total = 4
+    with open(layout.path, 'rb') as f:
+        out.seek(12)
+        for chunk_id, offset, length in layout.chunks:
+            if chunk_id == b'data':
+                out.write(struct.pack('<4sI', b'data', data_size))
+                data_offset = out.tell()
+                out.seek(data_size + (data_size & 1), os.SEEK_CUR)
+                total += 8 + data_size + (data_size & 1)
+                continue
+            out.write(struct.pack('<4sI', chunk_id, length))
+            if chunk_id == b'fmt ' and added:
+                fmt = bytearray(layout.fmt)
+                block_align = layout.block_align // layout.channels * channels
+                struct.pack_into('<H', fmt, 2, channels)
+                struct.pack_into('<IH', fmt, 8, block_align * layout.sample_rate, block_align)
+                out.write(fmt)
+            else:
+                f.seek(offset)
+                remaining = length + (length & 1)
+                while remaining:
+                    piece = f.read(min(remaining, COPY_CHUNK))
+                    if not piece:
+                        raise ValueError(f"{layout.path} : chunk {chunk_id!r} tronqué")
+                    out.write(piece)
+                    remaining -= len(piece)
+            total += 8 + length + (length & 1)
+        out.seek(0)
+        out.write(struct.pack('<4sI4s', b'RIFF', total, b'WAVE'))
+    return data_offset, total + 8
+
+
+def stripe(source, destination=None, channel=None, fps='25', start=None,
+           user_bits=0, bgf=BGF_UNSPECIFIED, amplitude=0.5, block=STRIPE_BLOCK):
+    """Écrit le LTC de toute la durée de `source` dans le canal `channel`
+
+    `channel` (à partir de 0) au-delà du dernier canal ajoute une piste ;
+    None remplace le dernier canal. Sans `destination`, le canal est remplacé
+    en place. Le LTC part de la référence temporelle BWF, ou de `start`
+    (timecode) s'il est donné ou si le fichier n'en a pas. Retourne
+    (premier timecode, durée du fichier en secondes).
+    """
+    layout = WavLayout(source)
+    channels = layout.channels
+    if channel is None:
+        channel = channels - 1
+    if channel < 0:
+        raise ValueError(f"{source} : canal {channel + 1} invalide (à partir de 1)")
+    if channel > channels:
+        raise ValueError(f"{source} : canal {channel + 1} au-delà de {channels + 1}")
+    if channel == channels:
+        channels += 1
+        if destination is None:
+            raise ValueError(f"{source} : l'ajout d'un canal demande un fichier de sortie")
+
+    rate = get_frame_rate(fps)
+    if start is not None or layout.time_reference is None:
+        number = timecode_to_frames(start or "00:00:00:00", rate.base, rate.drop_frame)
+        start_sample = number * layout.sample_rate / rate.rate
+    else:
+        start_sample = layout.time_reference
+    encoder = StripeEncoder(fps, layout.sample_rate, start_sample, user_bits, bgf, amplitude)
+
+    if destination is not None and os.path.exists(destination) \
+            and os.path.samefile(source, destination):
+        raise ValueError(f"{source} : la sortie écraserait la source (voir --in-place)")
+    if destination is None:
+        output = layout.audio('r+')
+        audio = None
+    else:
+        with open(destination, 'wb') as out:
+            data_offset, size = _write_header(layout, out, channels)
+            out.truncate(size)
+        output = np.memmap(destination, np.uint8, 'r+', data_offset,
+                           (layout.frames, channels, layout.bits // 8))
+        audio = layout.audio()
+
+    for begin in range(0, layout.frames, block):
+        end = min(begin + block, layout.frames)
+        if audio is not None:
+            # Canaux d'origine recopiés tels quels, octet pour octet
+            output[begin:end, :layout.channels] = audio[begin:end]
+        output[begin:end, channel] = to_samples(encoder.render(end - begin),
+                                                layout.bits, layout.float)
+    output.flush()
+    del output, audio
+    return encoder.first_timecode, layout.frames / layout.sample_rate
+
+
+def _stripe_job(job):
+    """Tâche du pool : (source, destination, options) → résultat ou erreur"""
+    source, destination, options = job
+    started = time.perf_counter()
+    try:
+        timecode, duration = stripe(source, destination, **options)
+    except (OSError, ValueError) as e:
+        return source, None, str(e)
+    return source, (timecode, duration, time.perf_counter() - started), None
+
+
+def stripe_files(jobs, workers=None):
+    """Traite un lot de (source, destination, options) sur un pool de processus
+
+    Les résultats arrivent dans l'ordre du lot : (source, (premier timecode,
+    durée, temps de calcul) ou None, message d'erreur ou None).
+    """
+    jobs = list(jobs)
+    if len(jobs) == 1 or workers == 1:
+        yield from map(_stripe_job, jobs)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(_stripe_job, jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ajoute ou remplace une piste LTC dans des fichiers WAV/BWF")
+    parser.add_argument('files', nargs='+', help="Fichiers WAV/BWF multicanaux")
+    parser.add_argument('--channel', type=int,
+                        help="Canal LTC (à partir de 1) ; nombre de canaux + 1 pour "
+                             "ajouter une piste (défaut : dernier canal)")
+    parser.add_argument('--fps', default='25', help="Cadence (24, 25, 29.97, 29.97df, 30)")
+    parser.add_argument('--start', help="Timecode de départ, à la place de la "
+                                        "référence temporelle BWF")
+    parser.add_argument('--user-bits', help="Bits utilisateur (voir --user-bits-mode)")
+    parser.add_argument('--user-bits-mode', default='hex', choices=('hex', 'date', 'chars'))
+    parser.add_argument('--amplitude', type=float, default=0.5,
+                        help="Niveau crête (1.0 = pleine échelle)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output-dir', help="Écrit les fichiers modifiés dans ce dossier")
+    target.add_argument('--in-place', action='store_true',
+                        help="Remplace le canal directement dans les fichiers")
+    parser.add_argument('--jobs', type=int, help="Processus en parallèle (défaut : un par cœur)")
+    args = parser.parse_args()
+    if args.channel is not None and args.channel < 1:
+        parser.error("--channel : canal à partir de 1")
+
+    user_bits, bgf = 0, BGF_UNSPECIFIED
+    if args.user_bits:
+        user_bits, bgf = parse_user_bits(args.user_bits, args.user_bits_mode)
+    options = {'channel': None if args.channel is None else args.channel - 1, 'fps': args.fps,
+               'start': args.start, 'user_bits': user_bits, 'bgf': bgf,
+               'amplitude': args.amplitude}
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(path, os.path.join(args.output_dir, os.path.basename(path))
+             if args.output_dir else None, options) for path in args.files]
+
+    started = time.perf_counter()
+    audio = 0.0
+    failed = 0
+    for path, result, error in stripe_files(jobs, args.jobs):
+        if error:
+            failed += 1
+            print(f"ÉCHEC  {error}", file=sys.stderr)
+            continue
+        timecode, duration, elapsed = result
+        audio += duration
+        print(f"{path} : {timecode}, {duration:.1f} s en {elapsed:.2f} s "
+              f"({duration / max(elapsed, 1e-9):.0f}x temps réel)")
+    elapsed = time.perf_counter() - started
+    if len(jobs) > 1:
+        print(f"Total : {audio:.1f} s de son en {elapsed:.2f} s "
+              f"({audio / max(elapsed, 1e-9):.0f}x temps réel)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Traçage à la demande des étapes du pipeline LTC
+Spans début/fin rangés dans un tampon circulaire préalloué, exportés au format
+JSON Chrome/Perfetto (chrome://tracing, ui.perfetto.dev). Désactivé, un span
+coûte un appel de méthode qui retourne immédiatement.
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+
+TRACE_CAPACITY = 65536  # Spans gardés (les plus anciens sont écrasés)
+TRACE_PATH = '/tmp/ltc-trace-%Y%m%d-%H%M%S.json'
+
+# Étapes du pipeline, dans l'ordre où elles apparaissent
+STAGES = ('capture', 'decode', 'dispatch', 'tk_callback', 'display_render',
+          'generator_render', 'sink_write')
+
+
+class Tracer:
+    """Enregistreur de spans à coût quasi nul quand il est arrêté
+
+        started = TRACER.begin()
+        ...
+        TRACER.end('decode', started)
+    """
+
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.capacity = capacity
+        self.enabled = False
+        self._names = {name: index for index, name in enumerate(STAGES)}
+        self._starts = array('d', bytes(8 * capacity))
+        self._durations = array('d', bytes(8 * capacity))
+        self._stages = array('H', bytes(2 * capacity))
+        self._threads = array('Q', bytes(8 * capacity))
+        self._lock = threading.Lock()   # Spans de plusieurs threads
+        self._recorded = 0
+        self._origin = 0.0
+
+    def start(self):
+        """Vide le tampon et commence l'enregistrement"""
+        with self._lock:
+            self._recorded = 0
+            self._origin = time.perf_counter()
+            self.enabled = True
+
+    def stop(self):
+        """Arrête l'enregistrement ; le contenu reste exportable"""
+        self.enabled = False
+
+    def begin(self):
+        """Instant de début d'un span, ou None si le traçage est arrêté"""
+        if self.enabled:
+            return time.perf_counter()
+        return None
+
+    def end(self, stage, started):
+        """Enregistre le span `stage` commencé à `started`"""
+        if started is None or not self.enabled:
+            return
+        duration = time.perf_counter() - started
+        with self._lock:
+            # Case et compteur ensemble : events() ne voit que des spans
+            # complets, et start() ne peut pas croiser une écriture
+            index = self._recorded
+            slot = index % self.capacity
+            self._starts[slot] = started
+            self._durations[slot] = duration
+            self._stages[slot] = self._names[stage]
+            self._threads[slot] = threading.get_ident()
+            self._recorded = index + 1
+
+    def events(self):
+        """Événements Chrome trace du contenu du tampon, du plus ancien au plus récent"""
+        pid = os.getpid()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident,
+                   'args': {'name': name}} for ident, name in names.items()]
+        with self._lock:
+            # Copie rapide : les spans continuent pendant la conversion
+            recorded, origin = self._recorded, self._origin
+            starts, durations = self._starts[:], self._durations[:]
+            stages, threads = self._stages[:], self._threads[:]
+        for index in range(max(0, recorded - self.capacity), recorded):
+            slot = index % self.capacity
+            events.append({
+                'name': STAGES[stages[slot]],
+                'ph': 'X',
+                'ts': (starts[slot] - origin) * 1e6,
+                'dur': durations[slot] * 1e6,
+                'pid': pid,
+                'tid': threads[slot],
+            })
+        return events
+
+    def dump(self, path=TRACE_PATH):
+        """Écrit la trace JSON ; `path` peut contenir des champs strftime"""
+        path = time.strftime(path)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+# Enregistreur partagé par l'interface, le générateur et la sortie audio
+TRACER = Tracer()
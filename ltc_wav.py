@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Structure des fichiers WAV/BWF
+Lecture des en-têtes RIFF (format, chunks, référence temporelle bext) sans
+charger les données audio, projetées en mémoire à la demande. Partagée par
+les sources du lecteur et le striping hors ligne.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Position de TimeReference dans le chunk bext : Description (256),
+# Originator (32), OriginatorReference (32), OriginationDate (10),
+# OriginationTime (8)
+BEXT_TIME_REFERENCE = 338
+
+
+class WavLayout:
+    """Structure d'un fichier WAV : format et position de chaque chunk
+
+    `chunks` liste (identifiant, position du contenu, taille) dans l'ordre
+    du fichier ; seuls les en-têtes sont lus, jamais les données audio.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.chunks = []
+        self.fmt = None
+        self.time_reference = None
+        with open(path, 'rb') as f:
+            riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave != b'WAVE':
+                raise ValueError(f"{path} : fichier RIFF/WAVE attendu (RF64 non géré)")
+            size = os.fstat(f.fileno()).st_size
+            position = 12
+            while position + 8 <= size:
+                f.seek(position)
+                chunk_id, length = struct.unpack('<4sI', f.read(8))
+                self.chunks.append((chunk_id, position + 8, length))
+                if chunk_id == b'fmt ':
+                    self.fmt = f.read(length)
+                elif chunk_id == b'bext' and length >= BEXT_TIME_REFERENCE + 8:
+                    f.seek(position + 8 + BEXT_TIME_REFERENCE)
+                    self.time_reference = struct.unpack('<Q', f.read(8))[0]
+                position += 8 + length + (length & 1)
+        if self.fmt is None or self.data is None:
+            raise ValueError(f"{path} : chunk fmt ou data manquant")
+
+        tag, self.channels, self.sample_rate, _, self.block_align, self.bits = \
+            struct.unpack('<HHIIHH', self.fmt[:16])
+        if tag == WAVE_FORMAT_EXTENSIBLE and len(self.fmt) >= 26:
+            tag = struct.unpack('<H', self.fmt[24:26])[0]  # Sous-format (GUID)
+        self.float = tag == WAVE_FORMAT_IEEE_FLOAT
+        if not ((tag == WAVE_FORMAT_PCM and self.bits in (16, 24, 32))
+                or (self.float and self.bits == 32)):
+            raise ValueError(f"{path} : format non géré (code {tag:#06x}, "
+                             f"{self.bits} bits) ; PCM 16/24/32 bits ou flottant 32 bits")
+
+    @property
+    def data(self):
+        """(position, taille) des données audio"""
+        for chunk_id, offset, length in self.chunks:
+            if chunk_id == b'data':
+                return offset, length
+        return None
+
+    @property
+    def frames(self):
+        """Nombre d'échantillons par canal"""
+        return self.data[1] // self.block_align
+
+    def audio(self, mode='r'):
+        """Vue mémoire des données (échantillons, canaux, octets par échantillon)"""
+        return np.memmap(self.path, np.uint8, mode, self.data[0],
+                         (self.frames, self.channels, self.bits // 8))